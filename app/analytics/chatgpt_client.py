@@ -1,70 +1,103 @@
 import openai
+import random
+import time
 from app.common.logger import get_logger
-from app.config import OPENAI_API_KEY
-from openai import OpenAI
+from app.common.metrics import get_metrics
+from app.common.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_STREAM, OPENAI_TIMEOUT_SECONDS, OPENAI_DEADLINE_SECONDS,
+    OPENAI_MAX_RETRIES, OPENAI_RETRY_BASE_DELAY, OPENAI_RETRY_MAX_DELAY,
+    OPENAI_CIRCUIT_FAILURES, OPENAI_CIRCUIT_RESET_SECONDS
+)
+from openai import OpenAI, APIConnectionError, InternalServerError, RateLimitError
+from .prompt_builder import PromptBuilder
 import datetime
 
 logger = get_logger(__name__)
 
+REPORT_TITLES = {
+    'daily': 'Daily Office Usage',
+    'weekly': 'Weekly Office Usage',
+    'monthly': 'Monthly Office Usage'
+}
+
+# How each report mode refers to its period; monthly reports cover the previous calendar month
+REPORT_WORDING = {
+    'daily': {'period': "today's", 'span': "today", 'previous': "the previous day", 'earlier': "previous days"},
+    'weekly': {'period': "this week's", 'span': "this week", 'previous': "the previous week",
+               'earlier': "previous weeks"},
+    'monthly': {'period': "last month's", 'span': "last month", 'previous': "the month before",
+                'earlier': "previous months"},
+}
+
+# Report structure requested from the model, filled in per mode
+REPORT_TEMPLATE = """
+<h1>{title} Report</h1>
+
+<h2>Summary</h2>
+<p>Provide a brief overview of {period} office usage, including the total number of employees who entered and exited, peak hours, and any notable changes from {previous}.</p>
+
+<h2>RFID Data</h2>
+<ul>
+    <li>How many entrances were made to the office {span}?</li>
+    <li>Peak Activity Time</li>
+    <li>Low Activity Time</li>
+</ul>
+<h2>Image Processing Data</h2>
+<ul>
+    <li>How many entrances were made to the office {span}?</li>
+    <li>Peak Activity Time</li>
+    <li>Low Activity Time</li>
+</ul>
+
+<h2>Key Highlights</h2>
+<ul>
+    <li>List the most important events, including attendance peaks, unusual office usage patterns, or key personnel movements.</li>
+    <li>Mention if any new employees or visitors were detected.</li>
+    <li>Highlight anything you find meaningful for a manager.</li>
+</ul>
+
+<h2>Data Analysis & Trends</h2>
+<p>Analyze the data to identify trends. Discuss whether office occupancy has increased or decreased compared to {earlier}. Mention any significant patterns such as extended stays, irregular entry/exit patterns, or clustering of personnel.</p>
+
+<h2>Conclusion & Recommendations</h2>
+<p>Provide a professional conclusion, summarizing insights gained from the data. Offer recommendations such as optimizing office usage hours, security improvements, or policy changes based on observed patterns.</p>
+
+<p><i>This report is automatically generated using AI-based data analysis for Feriştah Dalkılıç.</i></p>
+"""
+
+# Transient failures worth another attempt, APITimeoutError is an APIConnectionError
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
 class ChatGPTClient:
-    def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, base_url=OPENAI_BASE_URL, stream=OPENAI_STREAM, timeout=OPENAI_TIMEOUT_SECONDS,
+                 deadline=OPENAI_DEADLINE_SECONDS, max_retries=OPENAI_MAX_RETRIES):
+        # The SDK's own retries are off, _complete retries with jitter within the deadline
+        self.client = OpenAI(api_key=OPENAI_API_KEY, base_url=base_url, timeout=timeout, max_retries=0)
+        self.stream = stream
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker('openai', OPENAI_CIRCUIT_FAILURES, OPENAI_CIRCUIT_RESET_SECONDS)
+        self.prompt_builder = PromptBuilder()
         logger.info("ChatGPT client initialized")
 
     def analyze_usage_patterns(self, data):
         """Sends data to OpenAI ChatGPT for analysis"""
         try:
             prompt = self._format_data_for_analysis(data)
+            mode = data.get('mode', 'daily')
+            title = REPORT_TITLES[mode]
 
-            response = self.client.chat.completions.create( 
-                model="gpt-3.5-turbo",
+            analysis = self._complete(
                 messages=[
-                    {"role": "system", "content": "You are an expert data assistant. Prepare a professional 'Daily Office Usage' report based on the provided data. The report should be structured in HTML format and include:"},
-                    {"role": "system", "content": 
-                        """
-                        <h1>Daily Office Usage Report</h1>
-
-                        <h2>Summary</h2>
-                        <p>Provide a brief overview of today's office usage, including the total number of employees who entered and exited, peak hours, and any notable changes from the previous day.</p>
-
-                        <h2>RFID Data</h2>
-                        <ul>
-                            <li>How many enterance is made to the office today?</li>
-                            <li>Peak Activity Time</li>
-                            <li>Low Activity Time</li>
-                        </ul>
-                        <h2>Image Processing Data</h2>
-                        <ul>
-                            <li>How many enterance is made to the office today?</li>
-                            <li>Peak Activity Time</li>
-                            <li>Low Activity Time</li>
-                        </ul>
-                        
-
-                        <h2>Key Highlights</h2>
-                        <ul>
-                            <li>List the most important events, including attendance peaks, unusual office usage patterns, or key personnel movements.</li>
-                            <li>Mention if any new employees or visitors were detected.</li>
-                            <li>Highlight anything you find meaningful for a manager.</li>
-                        </ul>
-                        
-
-                        <h2>Data Analysis & Trends</h2>
-                        <p>Analyze the data to identify trends. Discuss whether office occupancy has increased or decreased compared to previous days. Mention any significant patterns such as extended stays, irregular entry/exit patterns, or clustering of personnel.</p>
-
-                        <h2>Conclusion & Recommendations</h2>
-                        <p>Provide a professional conclusion, summarizing insights gained from the data. Offer recommendations such as optimizing office usage hours, security improvements, or policy changes based on observed patterns.</p>
-
-                        <p><i>This report is automatically generated using AI-based data analysis for Feriştah Dalkılıç.</i></p>
-                        """
-                    },
+                    {"role": "system", "content": f"You are an expert data assistant. Prepare a professional '{title}' report based on the provided data. The report should be structured in HTML format and include:"},
+                    {"role": "system", "content": REPORT_TEMPLATE.format(title=title, **REPORT_WORDING[mode])},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
                 max_tokens=1500
             )
-
-            analysis = response.choices[0].message.content  # Updated response handling
             return analysis
 
         except Exception as e:
@@ -72,34 +105,9 @@ class ChatGPTClient:
             raise
 
     def _format_data_for_analysis(self, data):
-        """Formats the data into a prompt for ChatGPT"""
+        """Formats the data into a prompt for ChatGPT, within PROMPT_TOKEN_BUDGET"""
         try:
-            # Extract correct parts
-            image_data = data.get("image_data", {}).get("detailed_records", [])
-            rfid_data = data.get("rfid_data", {}).get("detailed_records", [])
-
-            if not isinstance(image_data, list) or not isinstance(rfid_data, list):
-                raise ValueError(f"Invalid data format! image_data={type(image_data)}, rfid_data={type(rfid_data)}")
-
-            prompt = "Please analyze the following facility usage data:\n\n"
-
-            # Format image processing data
-            prompt += "Image Processing Data:\n"
-            for record in image_data:
-                if not isinstance(record, dict):  # Ensure it's a dictionary
-                    raise ValueError(f"Expected dict in image_data but got {type(record)}: {record}")
-                prompt += f"- Timestamp: {record['timestamp']}, Persons detected: {record['person_count']}\n"
-
-            # Format RFID data
-            prompt += "\nRFID Access Data:\n"
-            for record in rfid_data:
-                if not isinstance(record, dict):  # Ensure it's a dictionary
-                    raise ValueError(f"Expected dict in rfid_data but got {type(record)}: {record}")
-                event_type = "entry" if record["is_entry"] else "exit"
-                prompt += f"- Card ID: {record['card_id']}, {event_type} at {record['timestamp']}\n"
-
-            prompt += "\nPlease provide a detailed analysis of usage patterns, trends, and any notable observations."
-            return prompt
+            return self.prompt_builder.build(data)
 
         except Exception as e:
             logger.error(f"Error formatting data for analysis: {str(e)}")
@@ -121,8 +129,7 @@ class ChatGPTClient:
     def generate_html_report(self, prompt):
         """Generate HTML report using ChatGPT"""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            return self._complete(
                 messages=[
                     {"role": "system", "content": "You are a security report generator. Generate detailed HTML reports with professional styling."},
                     {"role": "user", "content": prompt}
@@ -131,8 +138,68 @@ class ChatGPTClient:
                 max_tokens=2000
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"Error generating report with ChatGPT: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def _complete(self, messages, temperature, max_tokens):
+        """
+        Runs a chat completion behind the circuit breaker. Transient failures are
+        retried after a random delay of up to base * 2^attempt seconds, as long
+        as the whole call stays within the deadline.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("OpenAI circuit is open, using the fallback report")
+
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                content = self._request(messages, temperature, max_tokens, deadline)
+            except RETRYABLE_ERRORS as e:
+                delay = random.uniform(0, min(OPENAI_RETRY_MAX_DELAY, OPENAI_RETRY_BASE_DELAY * 2 ** attempt))
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self._record_failure()
+                    raise
+                attempt += 1
+                get_metrics().increment("openai.retries")
+                logger.warning(f"OpenAI request failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._record_failure()
+                raise
+            get_metrics().observe("openai.request_seconds", time.monotonic() - start)
+            self.breaker.record_success()
+            return content
+
+    def _request(self, messages, temperature, max_tokens, deadline):
+        # No single read may wait past the deadline
+        timeout = max(min(self.timeout, deadline - time.monotonic()), 0.1)
+        response = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=self.stream,
+            timeout=timeout
+        )
+        if not self.stream:
+            return response.choices[0].message.content
+
+        # Streamed, so a slow answer is bounded by the read timeout between chunks
+        parts = []
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"OpenAI response not complete within {self.deadline}s")
+        finally:
+            response.close()
+        return "".join(parts)
+
+    def _record_failure(self):
+        get_metrics().increment("openai.failures")
+        self.breaker.record_failure()
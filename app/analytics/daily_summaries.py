@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from sqlalchemy import distinct, func
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.models.daily_summary import DailySummary
+from app.models.rfid_record import RFIDRecord
+from .rollups import day_bucket
+
+logger = get_logger(__name__)
+
+SUMMARY_FIELDS = (
+    'detections', 'total_persons', 'max_persons', 'peak_hour', 'entries', 'exits', 'unique_cards'
+)
+
+class DailySummaryCache:
+    """
+    Per-day totals for multi-day reports, kept in the daily_summaries table.
+    A date range is read back with one query. Missing finished days are built
+    once from the hourly rollups and stored; today is always built fresh.
+    OccupancyRollup drops a day's row when late records change its hours.
+    """
+
+    def __init__(self, db, rollups):
+        self.db = db
+        self.rollups = rollups
+
+    def summaries(self, first_date, last_date, today=None):
+        """Returns one summary dict per day from first_date to last_date inclusive"""
+        today = today or datetime.now().date()
+        try:
+            with self.db.session_scope() as session:
+                cached = {
+                    summary.date: _summary_dict(summary)
+                    for summary in session.query(DailySummary).filter(
+                        DailySummary.date >= first_date, DailySummary.date <= last_date
+                    ).all()
+                }
+
+            dates = _date_range(first_date, last_date)
+            missing = [day for day in dates if day not in cached]
+            if missing:
+                computed = self._compute(missing[0], missing[-1])
+                cached.update((day, computed[day]) for day in missing)
+                self._store([computed[day] for day in missing if day < today])
+
+            get_metrics().increment("daily_summaries.hits", len(dates) - len(missing))
+            get_metrics().increment("daily_summaries.misses", len(missing))
+            return [cached[day] for day in dates]
+        except Exception as e:
+            logger.error(f"Error fetching daily summaries: {str(e)}")
+            raise
+
+    def _compute(self, first_date, last_date):
+        """Builds the summaries of a date range from the hourly rollups"""
+        summaries = {}
+        for totals in self.rollups.daily_trend(first_date, last_date):
+            summaries[datetime.fromisoformat(totals['date']).date()] = dict(totals, unique_cards=0)
+
+        # Distinct cards do not add up across hours, so they are counted per day from the records
+        start = datetime.combine(first_date, datetime.min.time())
+        end = datetime.combine(last_date + timedelta(days=1), datetime.min.time())
+        day = day_bucket(RFIDRecord.timestamp).label('day')
+        with self.db.session_scope() as session:
+            rows = session.query(day, func.count(distinct(RFIDRecord.card_id))).filter(
+                RFIDRecord.timestamp >= start, RFIDRecord.timestamp < end
+            ).group_by(day).all()
+        for day_start, unique_cards in rows:
+            summaries[day_start.date()]['unique_cards'] = unique_cards
+        return summaries
+
+    def _store(self, summaries):
+        if not summaries:
+            return
+        now = datetime.now()
+        with self.db.session_scope() as session:
+            for summary in summaries:
+                # merge, in case another process stored the same day meanwhile
+                session.merge(DailySummary(
+                    date=datetime.fromisoformat(summary['date']).date(),
+                    computed_at=now,
+                    **{field: summary[field] for field in SUMMARY_FIELDS}
+                ))
+        logger.info(f"Cached daily summaries for {len(summaries)} days")
+
+
+def _summary_dict(summary):
+    detections = summary.detections
+    return dict(
+        {field: getattr(summary, field) for field in SUMMARY_FIELDS},
+        date=summary.date.isoformat(),
+        average_persons=summary.total_persons / detections if detections > 0 else 0
+    )
+
+def _date_range(first_date, last_date):
+    return [first_date + timedelta(days=i) for i in range((last_date - first_date).days + 1)]
@@ -19,13 +19,13 @@ class EmailNotifier:
         self.recipient = REPORT_RECIPIENT
         logger.info("Email notifier initialized")
 
-    def send_report(self, html_content):
-        """Send HTML report via email"""
+    def send_report(self, html_content, kind='daily'):
+        """Send HTML report via email, kind is the report mode shown in the subject"""
         try:
             msg = MIMEMultipart('alternative')
             msg['From'] = SMTP_USERNAME
             msg['To'] = REPORT_RECIPIENT
-            msg['Subject'] = f"Daily Office Usage Report - {datetime.now().date()}"
+            msg['Subject'] = f"{kind.capitalize()} Office Usage Report - {datetime.now().date()}"
 
             # Attach HTML content
             msg.attach(MIMEText(html_content, 'html'))
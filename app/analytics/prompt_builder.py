@@ -0,0 +1,202 @@
+from datetime import datetime
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import PROMPT_TOKEN_BUDGET
+
+try:
+    import tiktoken
+except ImportError:  # Optional, token counts fall back to an estimate from the length
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+class PromptBuilder:
+    """
+    Builds the analysis prompt from report data within a token budget.
+    Records are summarized into hourly buckets and runs of equal counts, and
+    sections are added in priority order, truncating the lowest priority
+    details first, so the prompt stays the same size however much data a
+    day holds.
+    """
+    CHARS_PER_TOKEN = 4
+    INTRO = "Please analyze the following facility usage data:"
+    CLOSING = "\nPlease provide a detailed analysis of usage patterns, trends, and any notable observations."
+
+    def __init__(self, token_budget=PROMPT_TOKEN_BUDGET, model="gpt-3.5-turbo"):
+        self.token_budget = token_budget
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                logger.warning(f"No tokenizer for {model}, estimating tokens: {str(e)}")
+
+    def count_tokens(self, text):
+        """Counts tokens with tiktoken when installed, otherwise estimates them from the length"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return -(-len(text) // self.CHARS_PER_TOKEN)
+
+    def build(self, data):
+        """Returns the prompt for data, at most token_budget tokens long"""
+        image_data = data.get("image_data") or {}
+        rfid_data = data.get("rfid_data") or {}
+        image_records = self._records(image_data, "image_data")
+        rfid_records = self._records(rfid_data, "rfid_data")
+
+        intro = [self.INTRO]
+        if data.get('mode', 'daily') != 'daily':
+            intro.append(f"This is a {data['mode']} report for {data['period_start']} to {data['period_end']}, "
+                         f"cover the whole period and compare it with the days before it.")
+
+        # Highest priority first, later sections are truncated when the budget runs out
+        sections = [
+            ("Totals", self._totals(image_data, rfid_data)),
+            ("Hourly Activity", self._hourly(image_data, rfid_data)),
+            ("Daily Summaries", self._daily_summaries(data.get("daily_summaries", []))),
+            ("Cards", self._cards(rfid_records)),
+            ("Person Count Timeline (runs of equal counts)", self._timeline(image_records)),
+            ("RFID Events", self._events(rfid_records)),
+        ]
+
+        lines = list(intro)
+        used = sum(self._line_tokens(line) for line in lines + [self.CLOSING])
+        omitted = 0
+        for title, section in sections:
+            if omitted:
+                # A higher priority section was already truncated, skip the rest
+                omitted += len(section)
+                continue
+            if not section:
+                continue
+            kept, tokens, left_out = self._fit(f"\n{title}:", section, self.token_budget - used)
+            lines.extend(kept)
+            used += tokens
+            omitted += left_out
+        lines.append(self.CLOSING)
+        prompt = "\n".join(lines)
+
+        tokens = self.count_tokens(prompt)
+        metrics = get_metrics()
+        metrics.observe("prompt.tokens", tokens)
+        metrics.observe("prompt.chars", len(prompt))
+        if omitted:
+            metrics.increment("prompt.lines_omitted", omitted)
+        method = "tiktoken" if self._encoding is not None else "estimated"
+        logger.info(f"Built prompt of {tokens} tokens ({method}), {len(prompt)} chars, "
+                    f"{omitted} lines omitted for a budget of {self.token_budget}")
+        return prompt
+
+    def _line_tokens(self, line):
+        # Counted with the newline that joins it to the next line
+        return self.count_tokens(line + "\n")
+
+    def _fit(self, header, section, budget):
+        """Returns the header and section lines that fit in budget, their tokens and how many lines were left out"""
+        costs = [self._line_tokens(line) for line in section]
+        used = self._line_tokens(header)
+        if used + sum(costs) <= budget:
+            return [header] + section, used + sum(costs), 0
+
+        # Keep room for the note saying how much was left out
+        note_tokens = self._line_tokens(f"- ... {len(section)} more lines omitted")
+        if used + note_tokens > budget:
+            return [], 0, len(section)
+        kept = [header]
+        for line, tokens in zip(section, costs):
+            if used + tokens + note_tokens > budget:
+                break
+            kept.append(line)
+            used += tokens
+        left_out = len(section) - (len(kept) - 1)
+        kept.append(f"- ... {left_out} more lines omitted")
+        return kept, used + note_tokens, left_out
+
+    def _records(self, section, name):
+        records = section.get("detailed_records", [])
+        if not isinstance(records, list):
+            raise ValueError(f"Invalid data format! {name}={type(records)}")
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected dict in {name} but got {type(record)}: {record}")
+        return records
+
+    def _totals(self, image_data, rfid_data):
+        lines = []
+        if image_data:
+            lines.append(f"- Detections: {image_data['total_detections']}, persons: {image_data['total_persons']}, "
+                         f"average per detection: {image_data['average_persons']:.2f}")
+        if rfid_data:
+            lines.append(f"- RFID events: {rfid_data['total_events']}, entries: {rfid_data['total_entries']}, "
+                         f"exits: {rfid_data['total_exits']}, unique cards: {rfid_data['unique_cards']}")
+        return lines
+
+    def _hourly(self, image_data, rfid_data):
+        """One line per hour, consecutive hours with identical figures share a line"""
+        image_hours = image_data.get("hourly_stats", {})
+        rfid_hours = rfid_data.get("hourly_stats", {})
+        runs = []
+        for hour in sorted(set(image_hours) | set(rfid_hours)):
+            image = image_hours.get(hour, {})
+            rfid = rfid_hours.get(hour, {})
+            figures = (
+                f"{image.get('detections', 0)} detections, "
+                f"{image.get('total_persons', 0)} persons (max {image.get('max_persons', 0)}), "
+                f"{rfid.get('entries', 0)} entries, {rfid.get('exits', 0)} exits"
+            )
+            if runs and runs[-1][2] == figures and runs[-1][1] == hour - 1:
+                runs[-1][1] = hour
+            else:
+                runs.append([hour, hour, figures])
+        return [
+            f"- {first:02d}:00: {figures}" if first == last
+            else f"- {first:02d}:00-{last:02d}:59: {figures} each hour"
+            for first, last, figures in runs
+        ]
+
+    def _daily_summaries(self, daily_summaries):
+        lines = []
+        for day in daily_summaries:
+            peak = f"{day['peak_hour']:02d}:00" if day['peak_hour'] is not None else "none"
+            lines.append(f"- {day['date']}: {day['detections']} detections, {day['total_persons']} persons "
+                         f"(max {day['max_persons']}, peak {peak}), {day['entries']} entries, "
+                         f"{day['exits']} exits, {day['unique_cards']} unique cards")
+        return lines
+
+    def _cards(self, rfid_records):
+        cards = {}
+        for record in rfid_records:
+            card = cards.setdefault(record['card_id'], {'entries': 0, 'exits': 0, 'first': None, 'last': None})
+            card['entries' if record['is_entry'] else 'exits'] += 1
+            card['first'] = card['first'] or record['timestamp']
+            card['last'] = record['timestamp']
+        return [
+            f"- Card {card_id}: {card['entries']} entries, {card['exits']} exits, "
+            f"first {_clock(card['first'])}, last {_clock(card['last'])}"
+            for card_id, card in cards.items()
+        ]
+
+    def _timeline(self, image_records):
+        """Run-length encodes consecutive detections with the same person count"""
+        runs = []
+        for record in image_records:
+            if runs and runs[-1][2] == record['person_count']:
+                runs[-1][1] = record['timestamp']
+                runs[-1][3] += 1
+            else:
+                runs.append([record['timestamp'], record['timestamp'], record['person_count'], 1])
+        lines = []
+        for start, end, count, detections in runs:
+            span = _clock(start) if detections == 1 else f"{_clock(start)}-{_clock(end)}"
+            lines.append(f"- {span}: {count} persons ({detections} detections)")
+        return lines
+
+    def _events(self, rfid_records):
+        return [
+            f"- {_clock(record['timestamp'])} card {record['card_id']} {'entry' if record['is_entry'] else 'exit'}"
+            for record in rfid_records
+        ]
+
+
+def _clock(timestamp):
+    return datetime.fromisoformat(timestamp).strftime('%H:%M:%S')
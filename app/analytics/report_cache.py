@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from app.common.files import atomic_write, check_hex_key
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import REPORT_CACHE_DIR, REPORT_CACHE_TTL_SECONDS, REPORT_CACHE_MAX_ENTRIES
+
+logger = get_logger(__name__)
+
+class ReportCache:
+    """
+    Generated HTML reports on disk, keyed by a hash of the report inputs.
+    Entries expire ttl seconds after they were written, and beyond
+    max_entries the least recently read ones are evicted. A read sets the
+    file's access time explicitly, so recency does not depend on atime
+    being enabled on the mount.
+    """
+
+    def __init__(self, root=REPORT_CACHE_DIR, ttl=REPORT_CACHE_TTL_SECONDS,
+                 max_entries=REPORT_CACHE_MAX_ENTRIES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(mode, first_day, last_day, watermarks):
+        """Returns the cache key of a report over [first_day, last_day] built from rows up to watermarks"""
+        inputs = json.dumps({
+            'mode': mode,
+            'first_day': first_day.isoformat(),
+            'last_day': last_day.isoformat(),
+            'watermarks': watermarks
+        }, sort_keys=True)
+        return hashlib.sha256(inputs.encode()).hexdigest()
+
+    def path_for(self, key):
+        check_hex_key(key, "report cache key")
+        return self.root / f"{key}.html"
+
+    def get(self, key):
+        """Returns the cached report for key, or None if missing or expired"""
+        path = self.path_for(key)
+        try:
+            stat = path.stat()
+            now = time.time()
+            if now - stat.st_mtime > self.ttl:
+                get_metrics().increment("report_cache.misses")
+                return None
+            html = path.read_text(encoding='utf-8')
+            # Mark as recently used, keeping the write time for the TTL
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            get_metrics().increment("report_cache.misses")
+            return None
+        except Exception as e:
+            logger.error(f"Error reading cached report {key}: {str(e)}")
+            return None
+        get_metrics().increment("report_cache.hits")
+        return html
+
+    def put(self, key, html):
+        """Stores a report under key, then evicts expired and least recently used entries"""
+        try:
+            path = self.path_for(key)
+            # Readers never see partial reports
+            atomic_write(path, html)
+            logger.debug(f"Cached report {key} ({len(html)} chars)")
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error caching report: {str(e)}")
+
+    def evict(self):
+        """Removes expired entries and the least recently used ones beyond max_entries"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for path in self.root.glob('*.html'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    entries.append((stat.st_atime, path))
+            entries.sort()
+            for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+                self._remove(path)
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+            get_metrics().increment("report_cache.evictions")
+        except FileNotFoundError:
+            pass
@@ -1,44 +1,151 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import datetime as dt
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, distinct
 from app.common.logger import get_logger
 from app.common.db import Database
 from app.models.image_record import ImageRecord
 from app.models.rfid_record import RFIDRecord
 from .chatgpt_client import ChatGPTClient
+from app.config import REPORT_HISTORY_DAYS
+from .rollups import OccupancyRollup
+from .daily_summaries import DailySummaryCache
+from .report_cache import ReportCache
 
 logger = get_logger(__name__)
 
 class ReportGenerator:
-    def __init__(self):
-        self.db = Database()
+    # Days covered by the daily and weekly reports, ending today.
+    # The monthly report covers the previous calendar month.
+    PERIOD_DAYS = {
+        'daily': 1,
+        'weekly': 7
+    }
+    REPORT_MODES = ('daily', 'weekly', 'monthly')
+
+    def __init__(self, db=None):
+        self.db = db or Database()
         self.chatgpt = ChatGPTClient()
+        self.rollups = OccupancyRollup(self.db)
+        self.summaries = DailySummaryCache(self.db, self.rollups)
+        self.cache = ReportCache()
         logger.info("Report generator initialized")
 
-    def generate_daily_report(self):
+    def generate_daily_report(self, force_refresh=False):
         """Generate daily report using ChatGPT"""
+        return self.generate_report('daily', force_refresh)
+
+    def generate_report(self, mode='daily', force_refresh=False):
+        """
+        Generate a daily, weekly or monthly report using ChatGPT.
+        A report built from the same period and records is served from the
+        cache unless force_refresh is set.
+        """
+        if mode not in self.REPORT_MODES:
+            raise ValueError(f"Unknown report mode: {mode}")
+
+        image_data = rfid_data = None
+        daily_summaries = []
         try:
-            # Get today's date
+            # Get today's date and the days covered by the report
             today = datetime.now().date()
+            first_day, last_day = self.report_period(mode, today)
+            period_days = (last_day - first_day).days + 1
+            
+            # Fold in the records since the last compaction, the rollup watermarks
+            # then identify the records the report is built from
+            cache_key = None
+            if self._refresh_rollups():
+                cache_key = ReportCache.key_for(mode, first_day, last_day, self.rollups.watermarks())
+                if not force_refresh:
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        logger.info(f"{mode.capitalize()} report served from cache, no new records since it was generated")
+                        return cached
+            
+            # Per-day totals of the period and of the days before it, for comparison
+            history_days = REPORT_HISTORY_DAYS if mode == 'daily' else period_days
+            daily_summaries = self.summaries.summaries(
+                first_day - timedelta(days=history_days), last_day, today
+            )
             
             # Get data from database
-            image_data = self._get_image_data(today)
-            rfid_data = self._get_rfid_data(today)
+            if mode == 'daily':
+                image_data = self._get_image_data(today)
+                rfid_data = self._get_rfid_data(today)
+            else:
+                image_data, rfid_data = self._summarize_period(
+                    daily_summaries[-period_days:], first_day, last_day
+                )
             
             data = {
-                'image_data':image_data,
-                'rfid_data':rfid_data
+                'mode': mode,
+                'period_start': first_day.isoformat(),
+                'period_end': last_day.isoformat(),
+                'image_data': image_data,
+                'rfid_data': rfid_data,
+                'daily_summaries': daily_summaries
             }
             
             # Get HTML report from ChatGPT
             html_report = self.chatgpt.analyze_usage_patterns(data)
+            if cache_key is not None:
+                self.cache.put(cache_key, html_report)
             
-            logger.info("Daily report generated successfully via ChatGPT")
+            logger.info(f"{mode.capitalize()} report generated successfully via ChatGPT")
             return html_report
 
         except Exception as e:
-            logger.error(f"Error generating daily report: {str(e)}")
-            return self._generate_fallback_html_report(image_data, rfid_data)
+            logger.error(f"Error generating {mode} report: {str(e)}")
+            return self._generate_fallback_html_report(image_data, rfid_data, daily_summaries)
+
+    def report_period(self, mode, today):
+        """Returns the first and last day covered by a report generated today"""
+        if mode == 'monthly':
+            last_day = today.replace(day=1) - timedelta(days=1)
+            return last_day.replace(day=1), last_day
+        return today - timedelta(days=self.PERIOD_DAYS[mode] - 1), today
+
+    def _summarize_period(self, daily_summaries, first_day, last_day):
+        """Adds up the daily summaries of a period into image and RFID totals"""
+        total_detections = sum(day['detections'] for day in daily_summaries)
+        total_persons = sum(day['total_persons'] for day in daily_summaries)
+        total_entries = sum(day['entries'] for day in daily_summaries)
+        total_exits = sum(day['exits'] for day in daily_summaries)
+
+        # Cards seen on several days count once, so this is one query over the period
+        with self.db.session_scope() as session:
+            unique_cards = session.query(func.count(distinct(RFIDRecord.card_id))).filter(
+                RFIDRecord.timestamp >= datetime.combine(first_day, datetime.min.time()),
+                RFIDRecord.timestamp < datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+            ).scalar()
+
+        image_data = {
+            'date': first_day.isoformat(),
+            'total_detections': total_detections,
+            'total_persons': total_persons,
+            'average_persons': total_persons / total_detections if total_detections > 0 else 0,
+            'hourly_stats': {},
+            'detailed_records': []
+        }
+        rfid_data = {
+            'date': first_day.isoformat(),
+            'total_events': total_entries + total_exits,
+            'unique_cards': unique_cards or 0,
+            'total_entries': total_entries,
+            'total_exits': total_exits,
+            'hourly_stats': {},
+            'detailed_records': []
+        }
+        return image_data, rfid_data
+
+    def _refresh_rollups(self):
+        """Compacts the hourly rollups, returns False if that failed and they may be stale"""
+        try:
+            self.rollups.compact()
+            return True
+        except Exception:
+            logger.warning("Rollup compaction failed, reporting from the last compacted hours")
+            return False
 
     def _format_hourly_stats(self, hourly_stats):
         """Format hourly statistics for the prompt"""
@@ -65,8 +172,33 @@ class ReportGenerator:
             )
         return "\n".join(formatted)
 
-    def _generate_fallback_html_report(self, image_data, rfid_data):
-        """Generate a basic HTML report if ChatGPT fails"""
+    def _generate_fallback_html_report(self, image_data, rfid_data, daily_summaries=()):
+        """
+        Generate a basic HTML report if ChatGPT fails. image_data and rfid_data are
+        None when the failure happened before they were read.
+        """
+        if image_data:
+            image_stats = (
+                f"<p>Total Detections: {image_data['total_detections']}</p>"
+                f"<p>Total Persons: {image_data['total_persons']}</p>"
+                f"<p>Average Persons per Detection: {image_data['average_persons']:.2f}</p>"
+            )
+        else:
+            image_stats = "<p>No image processing data available.</p>"
+        if rfid_data:
+            rfid_stats = (
+                f"<p>Total Events: {rfid_data['total_events']}</p>"
+                f"<p>Unique Cards: {rfid_data['unique_cards']}</p>"
+                f"<p>Total Entries: {rfid_data['total_entries']}</p>"
+                f"<p>Total Exits: {rfid_data['total_exits']}</p>"
+            )
+        else:
+            rfid_stats = "<p>No RFID data available.</p>"
+        summary_rows = "".join(
+            f"<tr><td>{day['date']}</td><td>{day['detections']}</td><td>{day['total_persons']}</td>"
+            f"<td>{day['entries']}</td><td>{day['exits']}</td><td>{day['unique_cards']}</td></tr>"
+            for day in daily_summaries
+        )
         return f"""
         <html>
         <head>
@@ -84,17 +216,20 @@ class ReportGenerator:
             
             <div class="section">
                 <h2>Image Processing Statistics</h2>
-                <p>Total Detections: {image_data['total_detections']}</p>
-                <p>Total Persons: {image_data['total_persons']}</p>
-                <p>Average Persons per Detection: {image_data['average_persons']:.2f}</p>
+                {image_stats}
             </div>
             
             <div class="section">
                 <h2>RFID Access Statistics</h2>
-                <p>Total Events: {rfid_data['total_events']}</p>
-                <p>Unique Cards: {rfid_data['unique_cards']}</p>
-                <p>Total Entries: {rfid_data['total_entries']}</p>
-                <p>Total Exits: {rfid_data['total_exits']}</p>
+                {rfid_stats}
+            </div>
+            
+            <div class="section">
+                <h2>Daily Summaries</h2>
+                <table>
+                    <tr><th>Date</th><th>Detections</th><th>Persons</th><th>Entries</th><th>Exits</th><th>Unique Cards</th></tr>
+                    {summary_rows}
+                </table>
             </div>
         </body>
         </html>
@@ -103,132 +238,116 @@ class ReportGenerator:
     def _get_image_data(self, date):
         """Retrieves image processing data for the given date"""
         try:
-            # Create session
-            session = self.db.Session()
-            
             # Get start and end of the specified date
             start_date = datetime.combine(date, datetime.min.time())
             end_date = datetime.combine(date, datetime.max.time())
+            in_range = and_(
+                ImageRecord.timestamp >= start_date,
+                ImageRecord.timestamp <= end_date
+            )
+            # Hourly rollup rows are read first, rollups.hourly() opens and removes its own session
+            hourly_rows = self.rollups.hourly(start_date, start_date + timedelta(days=1))
+
+            with self.db.session_scope() as session:
+                # Query only the columns we need, never the image payload
+                records = session.query(
+                    ImageRecord.timestamp,
+                    ImageRecord.person_count
+                ).filter(in_range).order_by(ImageRecord.timestamp).all()
             
-            # Query image records for the specified date
-            records = session.query(ImageRecord).filter(
-                and_(
-                    ImageRecord.timestamp >= start_date,
-                    ImageRecord.timestamp <= end_date
-                )
-            ).order_by(ImageRecord.timestamp).all()
-            
-            # Process the records
-            image_data = []
-            for record in records:
-                image_data.append({
-                    'timestamp': record.timestamp.isoformat(),
-                    'person_count': record.person_count
-                })
+                # Process the records
+                image_data = []
+                for timestamp, person_count in records:
+                    image_data.append({
+                        'timestamp': timestamp.isoformat(),
+                        'person_count': person_count
+                    })
             
-            # Calculate statistics
-            total_detections = len(records)
-            total_persons = sum(record.person_count for record in records)
+                # Get hourly distribution from the rollups, one row per hour
+                hourly_stats = {}
+                for row in hourly_rows:
+                    if row.detections:
+                        hourly_stats[row.hour.hour] = {
+                            'detections': row.detections,
+                            'total_persons': row.total_persons,
+                            'max_persons': row.max_persons
+                        }
             
-            # Get hourly distribution
-            hourly_stats = {}
-            for record in records:
-                hour = record.timestamp.hour
-                if hour not in hourly_stats:
-                    hourly_stats[hour] = {
-                        'detections': 0,
-                        'total_persons': 0,
-                        'max_persons': 0
-                    }
-                hourly_stats[hour]['detections'] += 1
-                hourly_stats[hour]['total_persons'] += record.person_count
-                hourly_stats[hour]['max_persons'] = max(
-                    hourly_stats[hour]['max_persons'],
-                    record.person_count
-                )
+                # Calculate statistics
+                total_detections = sum(stats['detections'] for stats in hourly_stats.values())
+                total_persons = sum(stats['total_persons'] for stats in hourly_stats.values())
             
-            return {
-                'date': date.isoformat(),
-                'total_detections': total_detections,
-                'total_persons': total_persons,
-                'average_persons': total_persons / total_detections if total_detections > 0 else 0,
-                'hourly_stats': hourly_stats,
-                'detailed_records': image_data
-            }
+                return {
+                    'date': date.isoformat(),
+                    'total_detections': total_detections,
+                    'total_persons': total_persons,
+                    'average_persons': total_persons / total_detections if total_detections > 0 else 0,
+                    'hourly_stats': hourly_stats,
+                    'detailed_records': image_data
+                }
             
         except Exception as e:
             logger.error(f"Error fetching image data: {str(e)}")
             raise
-        finally:
-            session.close()
 
     def _get_rfid_data(self, date):
         """Retrieves RFID data for the given date"""
         try:
-            # Create session
-            session = self.db.Session()
-            
             # Get start and end of the specified date
             start_date = datetime.combine(date, datetime.min.time())
             end_date = datetime.combine(date, datetime.max.time())
+            in_range = and_(
+                RFIDRecord.timestamp >= start_date,
+                RFIDRecord.timestamp <= end_date
+            )
+            # Hourly rollup rows are read first, rollups.hourly() opens and removes its own session
+            hourly_rows = self.rollups.hourly(start_date, start_date + timedelta(days=1))
+
+            with self.db.session_scope() as session:
+                # Query only the columns we need
+                records = session.query(
+                    RFIDRecord.timestamp,
+                    RFIDRecord.card_id,
+                    RFIDRecord.is_entry
+                ).filter(in_range).order_by(RFIDRecord.timestamp).all()
             
-            # Query RFID records for the specified date
-            records = session.query(RFIDRecord).filter(
-                and_(
-                    RFIDRecord.timestamp >= start_date,
-                    RFIDRecord.timestamp <= end_date
-                )
-            ).order_by(RFIDRecord.timestamp).all()
-            
-            # Process the records
-            rfid_data = []
-            unique_cards = set()
-            entries = 0
-            exits = 0
+                # Process the records
+                rfid_data = []
+                for timestamp, card_id, is_entry in records:
+                    rfid_data.append({
+                        'timestamp': timestamp.isoformat(),
+                        'card_id': card_id,
+                        'is_entry': is_entry
+                    })
             
-            for record in records:
-                rfid_data.append({
-                    'timestamp': record.timestamp.isoformat(),
-                    'card_id': record.card_id,
-                    'is_entry': record.is_entry
-                })
-                unique_cards.add(record.card_id)
-                if record.is_entry:
-                    entries += 1
-                else:
-                    exits += 1
+                # Get hourly distribution from the rollups, one row per hour
+                hourly_stats = {}
+                for row in hourly_rows:
+                    if row.entries or row.exits:
+                        hourly_stats[row.hour.hour] = {
+                            'entries': row.entries,
+                            'exits': row.exits,
+                            'total_events': row.entries + row.exits
+                        }
             
-            # Get hourly distribution
-            hourly_stats = {}
-            for record in records:
-                hour = record.timestamp.hour
-                if hour not in hourly_stats:
-                    hourly_stats[hour] = {
-                        'entries': 0,
-                        'exits': 0,
-                        'total_events': 0
-                    }
-                if record.is_entry:
-                    hourly_stats[hour]['entries'] += 1
-                else:
-                    hourly_stats[hour]['exits'] += 1
-                hourly_stats[hour]['total_events'] += 1
+                # Distinct cards do not add up across hours, so the day is counted directly
+                unique_cards = session.query(
+                    func.count(distinct(RFIDRecord.card_id))
+                ).filter(in_range).scalar()
             
-            return {
-                'date': date.isoformat(),
-                'total_events': len(records),
-                'unique_cards': len(unique_cards),
-                'total_entries': entries,
-                'total_exits': exits,
-                'hourly_stats': hourly_stats,
-                'detailed_records': rfid_data
-            }
+                return {
+                    'date': date.isoformat(),
+                    'total_events': sum(stats['total_events'] for stats in hourly_stats.values()),
+                    'unique_cards': unique_cards or 0,
+                    'total_entries': sum(stats['entries'] for stats in hourly_stats.values()),
+                    'total_exits': sum(stats['exits'] for stats in hourly_stats.values()),
+                    'hourly_stats': hourly_stats,
+                    'detailed_records': rfid_data
+                }
             
         except Exception as e:
             logger.error(f"Error fetching RFID data: {str(e)}")
             raise
-        finally:
-            session.close()
 
     def _analyze_data(self, image_data, rfid_data):
         """Sends data to ChatGPT for analysis"""
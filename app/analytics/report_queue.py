@@ -0,0 +1,122 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from app.common.logger import get_logger
+from app.config import REPORT_JOB_DEDUP_SECONDS
+
+logger = get_logger(__name__)
+
+class ReportJobQueue:
+    """
+    Cross-process queue of report requests, with a status channel back to each requester.
+    Channels are created up front, one per reader device, since queues can only be
+    handed to child processes when they start.
+    """
+
+    def __init__(self, channels=(None,)):
+        self.requests = mp.Queue()
+        self.statuses = {channel: mp.Queue() for channel in channels}
+
+    def submit(self, requested_by, kind='daily', channel=None):
+        """Enqueues a report request and returns immediately"""
+        self.requests.put({
+            'kind': kind,
+            'requested_by': requested_by,
+            'requested_at': time.time(),
+            'channel': channel
+        })
+        logger.info(f"Queued {kind} report requested by {requested_by}")
+
+    def post_status(self, job, status):
+        self.statuses[job['channel']].put({
+            'kind': job['kind'],
+            'requested_by': job['requested_by'],
+            'status': status
+        })
+
+    def poll_status(self, channel=None, timeout=None):
+        """Returns the next status update for channel, waiting up to timeout seconds, or None"""
+        try:
+            if timeout:
+                return self.statuses[channel].get(timeout=timeout)
+            return self.statuses[channel].get_nowait()
+        except queue.Empty:
+            return None
+
+
+class ReportWorker:
+    """
+    Consumes report requests from a ReportJobQueue.
+    Requests for the same report that are queued together, or arrive within
+    REPORT_JOB_DEDUP_SECONDS of a finished one, are answered without a new run.
+    """
+
+    def __init__(self, job_queue, report_generator=None, email_notifier=None,
+                 dedup_seconds=REPORT_JOB_DEDUP_SECONDS):
+        self.job_queue = job_queue
+        self.report_generator = report_generator
+        self.email_notifier = email_notifier
+        self.dedup_seconds = dedup_seconds
+        self._last_completed = {}
+
+    def _ensure_clients(self):
+        # Created lazily so the heavy clients live only in the worker's process
+        if self.report_generator is None:
+            from .report_generator import ReportGenerator
+            self.report_generator = ReportGenerator()
+        if self.email_notifier is None:
+            from .email_notifier import EmailNotifier
+            self.email_notifier = EmailNotifier()
+
+    def process_pending(self):
+        """Runs every queued request, coalescing duplicates. Returns the number of reports sent."""
+        jobs = []
+        while True:
+            try:
+                jobs.append(self.job_queue.requests.get_nowait())
+            except queue.Empty:
+                break
+
+        sent = 0
+        handled = set()
+        for job in jobs:
+            kind = job['kind']
+            last_completed = self._last_completed.get(kind, 0)
+            if kind in handled or time.time() - last_completed < self.dedup_seconds:
+                logger.info(f"Skipping duplicate {kind} report request from {job['requested_by']}")
+                self.job_queue.post_status(job, 'duplicate')
+                continue
+            handled.add(kind)
+            if self._run(job):
+                sent += 1
+        return sent
+
+    def _run(self, job):
+        self.job_queue.post_status(job, 'running')
+        try:
+            self._ensure_clients()
+            report = self.report_generator.generate_report(job['kind'])
+            self.email_notifier.send_report(report, job['kind'])
+            self._last_completed[job['kind']] = time.time()
+            self.job_queue.post_status(job, 'sent')
+            logger.info(f"{job['kind'].capitalize()} report requested by {job['requested_by']} sent")
+            return True
+        except Exception as e:
+            logger.error(f"Error generating requested report: {str(e)}")
+            self.job_queue.post_status(job, 'failed')
+            return False
+
+    def start_background(self, interval=1.0):
+        """Consumes the queue from a daemon thread, for processes without a scheduler"""
+        def loop():
+            while True:
+                try:
+                    self.process_pending()
+                except Exception as e:
+                    logger.error(f"Error in report worker: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="ReportWorker", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,203 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, case, delete, distinct, func, insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.common.db import Database
+from app.config import ROLLUP_REFRESH_HOURS
+from app.models.hourly_occupancy import HourlyOccupancy
+from app.models.daily_summary import DailySummary
+from app.models.rollup_watermark import RollupWatermark
+from app.models.image_record import ImageRecord
+from app.models.rfid_record import RFIDRecord
+
+logger = get_logger(__name__)
+
+class hour_bucket(FunctionElement):
+    """Start of the hour of a timestamp column"""
+    type = DateTime()
+    name = 'hour_bucket'
+    inherit_cache = True
+
+@compiles(hour_bucket)
+def _compile_hour_bucket(element, compiler, **kw):
+    return f"date_trunc('hour', {compiler.process(element.clauses, **kw)})"
+
+@compiles(hour_bucket, 'sqlite')
+def _compile_hour_bucket_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d %H:00:00', {compiler.process(element.clauses, **kw)})"
+
+class day_bucket(FunctionElement):
+    """Start of the day of a timestamp column"""
+    type = DateTime()
+    name = 'day_bucket'
+    inherit_cache = True
+
+@compiles(day_bucket)
+def _compile_day_bucket(element, compiler, **kw):
+    return f"date_trunc('day', {compiler.process(element.clauses, **kw)})"
+
+@compiles(day_bucket, 'sqlite')
+def _compile_day_bucket_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d 00:00:00', {compiler.process(element.clauses, **kw)})"
+
+# Source tables folded into the rollups, keyed by their watermark name
+SOURCES = {
+    'image_records': ImageRecord,
+    'rfid_records': RFIDRecord,
+}
+
+class OccupancyRollup:
+    """
+    Maintains the hourly_occupancy table from image and RFID records.
+    compact() recomputes only the hours touched by rows past each source's id
+    watermark, plus the last ROLLUP_REFRESH_HOURS, so reports and trends read
+    one row per hour instead of scanning the raw records.
+    """
+
+    def __init__(self, db=None, refresh_hours=ROLLUP_REFRESH_HOURS):
+        self.db = db or Database()
+        self.refresh_hours = refresh_hours
+        self._lock = threading.Lock()
+
+    def compact(self, now=None):
+        """Recomputes the dirty hours and returns how many were rewritten"""
+        now = now or datetime.now()
+        with self._lock:
+            try:
+                with self.db.session_scope() as session:
+                    dirty, watermarks = self._dirty_hours(session, now)
+                    for first, last in _consecutive_runs(dirty):
+                        self._recompute(session, first, last + timedelta(hours=1), now)
+                    # Cached summaries of days with changed hours are rebuilt on the next read
+                    if dirty:
+                        session.execute(delete(DailySummary).where(
+                            DailySummary.date.in_({hour.date() for hour in dirty})
+                        ))
+                    for source, last_id in watermarks.items():
+                        session.merge(RollupWatermark(source=source, last_id=last_id))
+            except Exception as e:
+                logger.error(f"Error compacting occupancy rollups: {str(e)}")
+                raise
+        get_metrics().increment("rollup.hours_compacted", len(dirty))
+        logger.info(f"Compacted {len(dirty)} hours of occupancy rollups")
+        return len(dirty)
+
+    def _dirty_hours(self, session, now):
+        """Returns the sorted hours to recompute and the new watermark of each source"""
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        dirty = {current_hour - timedelta(hours=i) for i in range(self.refresh_hours)}
+        watermarks = {}
+        for source, model in SOURCES.items():
+            watermark = session.get(RollupWatermark, source)
+            since = watermark.last_id if watermark else 0
+            last_id = session.query(func.max(model.id)).scalar() or 0
+            if last_id > since:
+                # Primary key range, so only the new rows are read
+                hours = session.query(hour_bucket(model.timestamp)).filter(
+                    model.id > since, model.id <= last_id
+                ).distinct().all()
+                dirty.update(hour for hour, in hours)
+            watermarks[source] = max(since, last_id)
+        return sorted(dirty), watermarks
+
+    def _recompute(self, session, start, end, now):
+        """Replaces the rollup rows of the hours in [start, end) with fresh aggregates"""
+        rows = {}
+
+        def row(hour):
+            return rows.setdefault(hour, {
+                'hour': hour, 'detections': 0, 'total_persons': 0, 'max_persons': 0,
+                'entries': 0, 'exits': 0, 'unique_cards': 0, 'updated_at': now
+            })
+
+        image_hour = hour_bucket(ImageRecord.timestamp).label('hour')
+        image_rows = session.query(
+            image_hour,
+            func.count(ImageRecord.id),
+            func.coalesce(func.sum(ImageRecord.person_count), 0),
+            func.coalesce(func.max(ImageRecord.person_count), 0)
+        ).filter(
+            ImageRecord.timestamp >= start, ImageRecord.timestamp < end
+        ).group_by(image_hour).all()
+        for hour, detections, total_persons, max_persons in image_rows:
+            row(hour).update(detections=detections, total_persons=int(total_persons),
+                             max_persons=max_persons)
+
+        rfid_hour = hour_bucket(RFIDRecord.timestamp).label('hour')
+        rfid_rows = session.query(
+            rfid_hour,
+            func.sum(case((RFIDRecord.is_entry, 1), else_=0)),
+            func.sum(case((RFIDRecord.is_entry, 0), else_=1)),
+            func.count(distinct(RFIDRecord.card_id))
+        ).filter(
+            RFIDRecord.timestamp >= start, RFIDRecord.timestamp < end
+        ).group_by(rfid_hour).all()
+        for hour, entries, exits, unique_cards in rfid_rows:
+            row(hour).update(entries=int(entries), exits=int(exits), unique_cards=unique_cards)
+
+        session.execute(delete(HourlyOccupancy).where(
+            HourlyOccupancy.hour >= start, HourlyOccupancy.hour < end
+        ))
+        if rows:
+            session.execute(insert(HourlyOccupancy), list(rows.values()))
+
+    def watermarks(self):
+        """Returns the last row id folded into the rollups, per source table"""
+        with self.db.session_scope() as session:
+            return {watermark.source: watermark.last_id for watermark in session.query(RollupWatermark).all()}
+
+    def hourly(self, start, end):
+        """Returns the rollup rows of the hours starting in [start, end), in order"""
+        try:
+            with self.db.session_scope() as session:
+                return session.query(HourlyOccupancy).filter(
+                    HourlyOccupancy.hour >= start, HourlyOccupancy.hour < end
+                ).order_by(HourlyOccupancy.hour).all()
+        except Exception as e:
+            logger.error(f"Error reading occupancy rollups: {str(e)}")
+            raise
+
+    def daily_trend(self, first_date, last_date):
+        """Returns per-day totals from first_date to last_date inclusive, built from the hourly rows"""
+        days = {}
+        day = first_date
+        while day <= last_date:
+            days[day] = {
+                'date': day.isoformat(), 'detections': 0, 'total_persons': 0, 'max_persons': 0,
+                'peak_hour': None, 'entries': 0, 'exits': 0
+            }
+            day += timedelta(days=1)
+
+        start = datetime.combine(first_date, datetime.min.time())
+        end = datetime.combine(last_date + timedelta(days=1), datetime.min.time())
+        peak_persons = {}
+        for hour in self.hourly(start, end):
+            day = hour.hour.date()
+            totals = days[day]
+            totals['detections'] += hour.detections
+            totals['total_persons'] += hour.total_persons
+            totals['max_persons'] = max(totals['max_persons'], hour.max_persons)
+            if hour.total_persons > peak_persons.get(day, 0):
+                peak_persons[day] = hour.total_persons
+                totals['peak_hour'] = hour.hour.hour
+            totals['entries'] += hour.entries
+            totals['exits'] += hour.exits
+
+        for totals in days.values():
+            detections = totals['detections']
+            totals['average_persons'] = totals['total_persons'] / detections if detections > 0 else 0
+        return list(days.values())
+
+
+def _consecutive_runs(hours):
+    """Groups sorted hours into (first, last) runs of consecutive hours"""
+    runs = []
+    for hour in hours:
+        if runs and hour - runs[-1][1] == timedelta(hours=1):
+            runs[-1][1] = hour
+        else:
+            runs.append([hour, hour])
+    return runs
@@ -1,14 +1,17 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from app.common.logger import get_logger
-from app.config import IMAGE_PROCESSING_INTERVAL, REPORT_GENERATION_TIME
-from app.image_processing.service import PersonDetectionService
+from app.config import (
+    REPORT_GENERATION_TIME, REPORT_WEEKLY_TIME, REPORT_MONTHLY_TIME,
+    REPORT_QUEUE_POLL_SECONDS, ROLLUP_COMPACTION_SECONDS
+)
 from .report_generator import ReportGenerator
 from .email_notifier import EmailNotifier
+from .report_queue import ReportWorker
 
 logger = get_logger(__name__)
 
-def setup_scheduler(rfid_service=None):
+def setup_scheduler(report_queue=None):
     """Sets up and configures the application scheduler"""
     try:
         scheduler = BackgroundScheduler()
@@ -19,29 +22,57 @@ def setup_scheduler(rfid_service=None):
         report_generator = ReportGenerator()
         email_notifier = EmailNotifier()
         
-        def generate_and_send_report():
-            """Generate and send daily report"""
+        def generate_and_send_report(mode='daily'):
+            """Generate and send a daily, weekly or monthly report"""
             try:
-                report = report_generator.generate_daily_report()
-                email_notifier.send_report(report)
-                logger.info("Daily report generated and sent successfully")
+                report = report_generator.generate_report(mode)
+                email_notifier.send_report(report, mode)
+                logger.info(f"{mode.capitalize()} report generated and sent successfully")
             except Exception as e:
-                logger.error(f"Error generating/sending daily report: {str(e)}")
+                logger.error(f"Error generating/sending {mode} report: {str(e)}")
+        
+        # Consume reports requested by admin cards, one run at a time
+        if report_queue is not None:
+            worker = ReportWorker(report_queue, report_generator, email_notifier)
+            scheduler.add_job(
+                worker.process_pending,
+                'interval',
+                seconds=REPORT_QUEUE_POLL_SECONDS,
+                id='report_queue_job',
+                max_instances=1,
+                coalesce=True
+            )
+            logger.info("Report request queue attached to scheduler")
+        
+        # Keep the hourly occupancy rollups current, sharing the report's rollup lock
+        scheduler.add_job(
+            report_generator.rollups.compact,
+            'interval',
+            seconds=ROLLUP_COMPACTION_SECONDS,
+            id='rollup_compaction_job',
+            max_instances=1,
+            coalesce=True
+        )
+        
+        # Schedule weekly and monthly reports, unless disabled with an empty time
+        for mode, crontab in (('weekly', REPORT_WEEKLY_TIME), ('monthly', REPORT_MONTHLY_TIME)):
+            if crontab:
+                scheduler.add_job(
+                    generate_and_send_report,
+                    CronTrigger.from_crontab(crontab),
+                    args=[mode],
+                    id=f'{mode}_report_job'
+                )
         
         # Schedule daily report generation
         scheduler.add_job(
             generate_and_send_report,
-            CronTrigger.from_crontab(REPORT_GENERATION_TIME)
+            CronTrigger.from_crontab(REPORT_GENERATION_TIME),
+            id='daily_report_job'
         )
         
-        # Add admin card report generation capability to RFID service
-        if rfid_service:
-            rfid_service.report_generator = report_generator
-            rfid_service.email_notifier = email_notifier
-            logger.info("Added report generation capability to RFID service")
-        
         logger.info("Scheduler initialized successfully")
         return scheduler
     except Exception as e:
         logger.error(f"Error setting up scheduler: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
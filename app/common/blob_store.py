@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import Path
+from app.common.files import atomic_write, check_hex_key
+from app.common.logger import get_logger
+from app.config import BLOB_STORE_DIR
+
+logger = get_logger(__name__)
+
+class BlobStore:
+    """Content-addressed file store, sharded into directories by hash prefix"""
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key_for(data):
+        """Returns the content hash used as the key for data"""
+        return hashlib.sha256(data).hexdigest()
+
+    def path_for(self, key):
+        """Returns the file path of a key, e.g. root/ab/cd/abcd..."""
+        check_hex_key(key, "blob key")
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, data):
+        """Stores data and returns its key. Identical content is stored once."""
+        try:
+            key = self.key_for(data)
+            path = self.path_for(key)
+            if path.exists():
+                return key
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Readers never see partial blobs
+            atomic_write(path, data)
+
+            logger.debug(f"Stored blob {key} ({len(data)} bytes)")
+            return key
+        except Exception as e:
+            logger.error(f"Error storing blob: {str(e)}")
+            raise
+
+    def exists(self, key):
+        return self.path_for(key).exists()
+
+    def open(self, key):
+        """Opens a blob for streaming reads"""
+        return open(self.path_for(key), 'rb')
+
+    def iter_chunks(self, key, chunk_size=CHUNK_SIZE):
+        """Yields the content of a blob in chunks"""
+        with self.open(key) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def get(self, key):
+        """Returns the full content of a blob"""
+        with self.open(key) as f:
+            return f.read()
+
+    def delete(self, key):
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            pass
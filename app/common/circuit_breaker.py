@@ -0,0 +1,64 @@
+import threading
+import time
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a while.
+    After failure_threshold failures in a row the circuit opens and calls
+    are refused for reset_seconds. Then a single trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """True if a call may be made now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._set_state(self.HALF_OPEN)
+                return True
+            # Open, or half open with the trial call still running
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        get_metrics().set_gauge(f"circuit.{self.name}.open", state == self.OPEN)
+        if state == self.OPEN:
+            logger.warning(f"Circuit {self.name} opened after {self.failures} failures, "
+                           f"retrying in {self.reset_seconds}s")
+        else:
+            logger.info(f"Circuit {self.name} {state.replace('_', ' ')}")
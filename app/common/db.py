@@ -1,45 +1,232 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy import create_engine
-from app.config import DATABASE_URL
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL, DB_WRITE_MAX_PENDING
+)
 from app.common.logger import get_logger
+from app.common.metrics import get_metrics
 
 logger = get_logger(__name__)
 
 # Create a single Base instance for all models
 Base = declarative_base()
 
+# One engine and session registry per database URL and process
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(url=None):
+    """Returns the engine and scoped session registry shared by this process"""
+    url = url or DATABASE_URL
+    # Pooled connections must not cross a fork, so child processes get their own engine
+    key = (url, os.getpid())
+    with _engines_lock:
+        if key not in _engines:
+            options = {
+                'pool_pre_ping': True,
+                'pool_recycle': DB_POOL_RECYCLE,
+            }
+            if not url.startswith('sqlite'):
+                options.update(
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT
+                )
+            engine = create_engine(url, **options)
+            session_registry = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+            _engines[key] = (engine, session_registry)
+            logger.info(f"Database engine created for process {os.getpid()}")
+        return _engines[key]
+
 class Database:
-    def __init__(self):
+    def __init__(self, url=None):
         try:
-            self.engine = create_engine(DATABASE_URL)
-            self.Session = sessionmaker(bind=self.engine)
-            Base.metadata.create_all(self.engine)
+            self.engine, self.Session = get_engine(url)
         except Exception as e:
             logger.error(f"Error initializing database: {str(e)}")
             raise
 
-    def save(self, record):
-        """Saves a record to the database"""
+    def create_schema(self):
+        """Creates missing tables, run once at deployment or startup rather than per instance"""
+        Base.metadata.create_all(self.engine)
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Provides the thread's session for a unit of work, committing or rolling back at the end.
+        Nested scopes share the outer scope's transaction, only the outermost one ends it.
+        """
         session = self.Session()
+        depth = session.info.get('scope_depth', 0)
+        session.info['scope_depth'] = depth + 1
+        if depth:
+            try:
+                yield session
+            finally:
+                session.info['scope_depth'] = depth
+            return
         try:
-            session.add(record)
+            yield session
             session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.Session.remove()
+
+    def buffered_writer(self, batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_INTERVAL):
+        """Returns a BufferedWriter that batches records into this database"""
+        return BufferedWriter(self, batch_size, flush_interval)
+
+    def save_all(self, records):
+        """Saves several records in a single transaction"""
+        try:
+            with self.session_scope() as session:
+                session.add_all(records)
+            logger.debug(f"Saved {len(records)} records")
+        except Exception as e:
+            logger.error(f"Error saving batch to database: {str(e)}")
+            raise
+
+    def save(self, record):
+        """Saves a record to the database"""
+        try:
+            with self.session_scope() as session:
+                session.add(record)
             logger.debug(f"Saved record: {record}")
         except Exception as e:
-            session.rollback()
             logger.error(f"Error saving to database: {str(e)}")
             raise
-        finally:
-            session.close()
 
     def query(self, model, **kwargs):
         """Queries the database"""
         try:
-            session = self.Session()
-            return session.query(model).filter_by(**kwargs).all()
+            with self.session_scope() as session:
+                return session.query(model).filter_by(**kwargs).all()
         except Exception as e:
             logger.error(f"Error querying database: {str(e)}")
             raise
-        finally:
-            session.close() 
\ No newline at end of file
+
+
+def is_transient_error(error):
+    """True for connection and server-side failures that a later retry can fix"""
+    if isinstance(error, (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class BufferedWriter:
+    """
+    Collects records and writes them in batches from a background flusher thread.
+    A batch is flushed when batch_size records are pending, every flush_interval
+    seconds, and on close(), which also runs at interpreter exit.
+    """
+
+    def __init__(self, db, batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_INTERVAL,
+                 max_pending=DB_WRITE_MAX_PENDING):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="BufferedWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self):
+        """Number of records not yet written to the database"""
+        with self._lock:
+            return len(self._buffer)
+
+    def add(self, record):
+        """Queues a record for the next batch"""
+        if self._closed:
+            raise RuntimeError("BufferedWriter is closed")
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) > self.max_pending:
+                del self._buffer[0]
+                logger.error("Write buffer full, dropped the oldest pending record")
+            pending = len(self._buffer)
+        get_metrics().set_gauge("db.pending_writes", pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes all pending records in one transaction and returns how many were written.
+        Connection errors keep the batch pending; a batch rejected for its data is
+        written record by record, dropping the records the database refuses.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                self.db.save_all(batch)
+                written = len(batch)
+            except Exception as e:
+                if is_transient_error(e):
+                    # Keep the batch for the next attempt, ahead of newer records
+                    self._requeue(batch)
+                    raise
+                logger.error(f"Batch of {len(batch)} records rejected, writing them one at a time: {str(e)}")
+                written = self._save_each(batch)
+            get_metrics().increment("db.records_written", written)
+            get_metrics().set_gauge("db.pending_writes", self.pending)
+            return written
+
+    def _save_each(self, batch):
+        """Saves records one by one so a bad record is dropped without losing the rest"""
+        written = 0
+        for i, record in enumerate(batch):
+            try:
+                self.db.save(record)
+                written += 1
+            except Exception as e:
+                if is_transient_error(e):
+                    self._requeue(batch[i:])
+                    raise
+                dropped = get_metrics().increment("db.records_dropped")
+                logger.error(f"Dropped unwritable record {record} ({dropped} so far): {str(e)}")
+        return written
+
+    def _requeue(self, records):
+        with self._lock:
+            self._buffer[:0] = records
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background flush failed, {self.pending} records pending: {str(e)}")
+
+    def close(self):
+        """Stops the flusher and writes everything still pending"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_event.set()
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        atexit.unregister(self.close)
+        written = self.flush()
+        logger.info(f"Buffered writer closed, flushed {written} pending records")
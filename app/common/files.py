@@ -0,0 +1,34 @@
+import os
+import tempfile
+from pathlib import Path
+
+HEX_DIGITS = frozenset('0123456789abcdef')
+
+def check_hex_key(key, kind="key"):
+    """Raises ValueError unless key is a lowercase hex SHA-256 digest, so it is safe to use in a path"""
+    if len(key) != 64 or not HEX_DIGITS.issuperset(key):
+        raise ValueError(f"Invalid {kind}: {key}")
+    return key
+
+def atomic_write(path, data):
+    """
+    Writes data (bytes or str) to path through a temporary file in the same
+    directory, so readers see either the old file or the complete new one.
+    The temporary file is removed if the write fails.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        if isinstance(data, str):
+            f = os.fdopen(fd, 'w', encoding='utf-8')
+        else:
+            f = os.fdopen(fd, 'wb')
+        with f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,58 @@
+import threading
+from app.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+class Metrics:
+    """Process-wide counters, gauges and timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._observations = {}
+
+    def increment(self, name, value=1):
+        """Adds value to a monotonically increasing counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            total = self._counters[name]
+        logger.debug(f"metric {name}={total}")
+        return total
+
+    def set_gauge(self, name, value):
+        """Records the current value of a gauge"""
+        with self._lock:
+            self._gauges[name] = value
+        logger.debug(f"metric {name}={value}")
+
+    def observe(self, name, value):
+        """Records one sample of a timing or size distribution"""
+        with self._lock:
+            stats = self._observations.setdefault(
+                name, {'count': 0, 'total': 0.0, 'min': value, 'max': value, 'last': value}
+            )
+            stats['count'] += 1
+            stats['total'] += value
+            stats['min'] = min(stats['min'], value)
+            stats['max'] = max(stats['max'], value)
+            stats['last'] = value
+        logger.debug(f"metric {name}={value}")
+
+    def snapshot(self):
+        """Returns a copy of all metrics recorded so far"""
+        with self._lock:
+            observations = {}
+            for name, stats in self._observations.items():
+                observations[name] = dict(stats, average=stats['total'] / stats['count'])
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'observations': observations
+            }
+
+
+_metrics = Metrics()
+
+def get_metrics():
+    return _metrics
@@ -0,0 +1,99 @@
+import threading
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import (
+    IMAGE_PROCESSING_INTERVAL, IMAGE_PROCESSING_ADAPTIVE, IMAGE_PROCESSING_MIN_INTERVAL,
+    IMAGE_PROCESSING_MAX_INTERVAL, IMAGE_PROCESSING_BACKOFF
+)
+
+logger = get_logger(__name__)
+
+class AdaptiveCadence:
+    """
+    Decides when the next detection burst starts.
+    The interval starts at base_interval, drops to min_interval when the person
+    count changes or an RFID card was tapped (activity holds the time of the last
+    tap, shared with the reader processes), and grows by backoff per burst with
+    an unchanged count, up to max_interval. Savings are reported against a fixed
+    cadence of base_interval.
+    """
+
+    def __init__(self, activity=None, base_interval=IMAGE_PROCESSING_INTERVAL,
+                 min_interval=IMAGE_PROCESSING_MIN_INTERVAL, max_interval=IMAGE_PROCESSING_MAX_INTERVAL,
+                 backoff=IMAGE_PROCESSING_BACKOFF, adaptive=IMAGE_PROCESSING_ADAPTIVE):
+        self.activity = activity
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self.interval = base_interval
+        self.next_due = 0
+        self.bursts = 0
+        self._started_at = None
+        self._last_count = None
+        self._last_burst_at = 0
+        self._last_activity = activity.value if activity is not None else 0
+        self._lock = threading.Lock()
+
+    def due(self, now):
+        """True when a burst should start at now"""
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = now
+            if self.adaptive and self.activity is not None and self.activity.value > self._last_activity:
+                # Someone just came through a door, look right away
+                self._last_activity = self.activity.value
+                self.interval = self.min_interval
+                self.next_due = min(self.next_due, now)
+                logger.info("RFID activity, sampling now")
+            return now >= self.next_due
+
+    def burst_started(self, now):
+        with self._lock:
+            self.bursts += 1
+            self._last_burst_at = now
+            self.next_due = now + self.interval
+        self._report(now)
+
+    def observe(self, count):
+        """Adapts the interval to the person count of the latest burst"""
+        if not self.adaptive:
+            return
+        with self._lock:
+            if self._last_count is not None and count != self._last_count:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._last_count = count
+            # Reschedule the next burst with the new interval
+            self.next_due = self._last_burst_at + self.interval
+        logger.debug(f"Count {count}, next detection interval {self.interval:.0f}s")
+
+    def savings(self, now):
+        """Bursts and approximate CPU seconds saved so far against the fixed cadence"""
+        with self._lock:
+            elapsed = now - self._started_at if self._started_at is not None else 0
+            fixed_bursts = int(elapsed // self.base_interval) + 1 if self._started_at is not None else 0
+            bursts = self.bursts
+        bursts_saved = fixed_bursts - bursts
+        burst_cpu = get_metrics().snapshot()['observations'].get('inference.burst_cpu_seconds', {})
+        cpu_saved = bursts_saved * burst_cpu.get('average', 0)
+        return {
+            'bursts': bursts,
+            'fixed_cadence_bursts': fixed_bursts,
+            'bursts_saved': bursts_saved,
+            'cpu_seconds_saved': cpu_saved,
+        }
+
+    def _report(self, now):
+        savings = self.savings(now)
+        metrics = get_metrics()
+        metrics.set_gauge("cadence.interval_seconds", self.interval)
+        metrics.set_gauge("cadence.bursts_saved", savings['bursts_saved'])
+        metrics.set_gauge("cadence.cpu_seconds_saved", savings['cpu_seconds_saved'])
+        logger.info(
+            f"Detection burst {savings['bursts']} (fixed {self.base_interval}s cadence: "
+            f"{savings['fixed_cadence_bursts']}), {savings['bursts_saved']} bursts and "
+            f"~{savings['cpu_seconds_saved']:.1f} CPU s saved, next in {self.interval:.0f}s"
+        )
@@ -6,8 +6,11 @@ from app.common.logger import get_logger
 logger = get_logger(__name__)
 
 class Camera:
-    def __init__(self, camera_id=0):
+    def __init__(self, camera_id=0, scan_fallback=True):
         self.camera_id = camera_id
+        # Try indices 1-4 when camera_id cannot be opened. Off for configured devices,
+        # where it could silently pick up another device's camera.
+        self.scan_fallback = scan_fallback
         self.cap = None
         self._initialize_camera()
 
@@ -29,7 +32,7 @@ class Camera:
             else:  # Linux (including Raspberry Pi)
                 self.cap = cv2.VideoCapture(self.camera_id, cv2.CAP_V4L2)
                         
-            if not self.cap.isOpened():
+            if not self.cap.isOpened() and self.scan_fallback:
                 # Try different camera indices if the first one fails
                 for i in range(1, 5):
                     if system == 'darwin':
@@ -41,13 +44,15 @@ class Camera:
                     if self.cap.isOpened():
                         self.camera_id = i
                         break
-                
-                if not self.cap.isOpened():
-                    raise RuntimeError("Cannot open camera")
+
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Cannot open camera {self.camera_id}")
             
             # Set camera properties
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Keep the driver queue short so a paced reader gets recent frames
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             # For macOS, try to disable auto focus and exposure
             if system == 'darwin':
@@ -60,14 +65,20 @@ class Camera:
             logger.error(f"Error initializing camera: {str(e)}")
             raise RuntimeError(f"Failed to initialize camera: {str(e)}")
 
-    def read_frame(self):
+    def read_frame(self, out=None):
+        """Returns a 640x480 frame. With out, a preallocated 480x640x3 array, nothing is allocated per frame."""
         if self.cap is None or not self.cap.isOpened():
             self._initialize_camera()
             
         for _ in range(3):  # Try up to 3 times to read a frame
-            ret, frame = self.cap.read()
+            ret, frame = self.cap.read(out)
             if ret:
-                return cv2.resize(frame, (640, 480))
+                if out is None:
+                    return cv2.resize(frame, (640, 480))
+                # The capture writes into out directly when the camera delivers 640x480
+                if frame.shape != out.shape or frame.ctypes.data != out.ctypes.data:
+                    cv2.resize(frame, (640, 480), dst=out)
+                return out
             
         logger.error("Failed to capture frame from camera")
         raise RuntimeError("Failed to capture frame from camera")
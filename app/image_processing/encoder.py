@@ -0,0 +1,52 @@
+import time
+import cv2
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import FRAME_ENCODE_FORMAT, FRAME_ENCODE_QUALITY, FRAME_ENCODE_MAX_WIDTH
+
+logger = get_logger(__name__)
+
+class FrameEncoder:
+    """
+    Encodes frames for storage with a configurable format, quality and maximum width.
+    Encode time and size of every sample are recorded as encoder.encode_ms and
+    encoder.bytes_per_sample. Formats the OpenCV build cannot write fall back to JPEG.
+    """
+    # format -> (file extension, OpenCV quality flag)
+    FORMATS = {
+        'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+        'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+        'avif': ('.avif', getattr(cv2, 'IMWRITE_AVIF_QUALITY', None)),
+    }
+
+    def __init__(self, fmt=FRAME_ENCODE_FORMAT, quality=FRAME_ENCODE_QUALITY, max_width=FRAME_ENCODE_MAX_WIDTH):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown frame format '{fmt}', expected one of {sorted(self.FORMATS)}")
+        extension, quality_flag = self.FORMATS[fmt]
+        if quality_flag is None or not cv2.haveImageWriter(f"frame{extension}"):
+            logger.warning(f"OpenCV cannot write {fmt} images here, storing frames as JPEG")
+            fmt = 'jpeg'
+            extension, quality_flag = self.FORMATS[fmt]
+        self.format = fmt
+        self.extension = extension
+        self.params = [quality_flag, quality]
+        self.max_width = max_width
+        logger.info(f"Frame encoder: {fmt}, quality {quality}, max width {max_width}")
+
+    def encode(self, frame):
+        """Returns the encoded bytes of frame, downscaled to max_width if wider"""
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            size = (self.max_width, round(height * self.max_width / width))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode(self.extension, frame, self.params)
+        if not ok:
+            raise RuntimeError(f"Failed to encode frame as {self.format}")
+        data = buffer.tobytes()
+
+        metrics = get_metrics()
+        metrics.observe("encoder.encode_ms", (time.perf_counter() - start) * 1000)
+        metrics.observe("encoder.bytes_per_sample", len(data))
+        return data
@@ -0,0 +1,167 @@
+import time
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import FRAME_RING_SLOTS, FRAME_RING_FPS, FRAME_WIDTH, FRAME_HEIGHT
+
+logger = get_logger(__name__)
+
+FRAME_SHAPE = (FRAME_HEIGHT, FRAME_WIDTH, 3)
+
+class FrameRing:
+    """
+    Ring of preallocated frame slots in shared memory, written by one capture
+    process and read as zero-copy views by any number of consumer processes.
+
+    The header holds the latest sequence number, a camera reset flag, the ring
+    geometry and the sequence number stored in each slot (-1 while it is being
+    written), so attach() needs nothing but the name. A view
+    returned by latest() stays valid while is_current(seq) is true; once the
+    writer has gone round the ring the slot holds a newer frame.
+    """
+    LATEST = 0
+    RESET_REQUESTED = 1
+    GEOMETRY = slice(2, 6)  # slots, height, width, channels
+    HEADER_FIELDS = 6
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        geometry = np.ndarray((self.HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)[self.GEOMETRY]
+        slots, *shape = (int(value) for value in geometry)
+        self.slots = slots
+        self._header = np.ndarray((self.HEADER_FIELDS + slots,), dtype=np.int64, buffer=shm.buf)
+        self.frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=shm.buf,
+                                 offset=self._frames_offset(slots))
+
+    @classmethod
+    def _frames_offset(cls, slots):
+        # Frames start on a 64-byte boundary after the header
+        header_bytes = (cls.HEADER_FIELDS + slots) * 8
+        return (header_bytes + 63) // 64 * 64
+
+    @classmethod
+    def create(cls, slots=FRAME_RING_SLOTS, shape=FRAME_SHAPE):
+        """Allocates a new ring, the creator is responsible for unlink()"""
+        size = cls._frames_offset(slots) + slots * int(np.prod(shape))
+        shm = SharedMemory(create=True, size=size)
+        header = np.ndarray((cls.HEADER_FIELDS + slots,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[cls.GEOMETRY] = (slots,) + tuple(shape)
+        del header
+        ring = cls(shm, owner=True)
+        logger.info(f"Frame ring {ring.name} created: {slots} slots, {size / 1e6:.1f} MB")
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """Opens a ring created by another process of the same application"""
+        # Child processes share the creator's resource tracker, which unlinks
+        # the ring only if the creator dies without calling unlink()
+        return cls(SharedMemory(name=name))
+
+    def begin_write(self):
+        """Returns (seq, slot view) for the next frame, publish it with commit(seq)"""
+        seq = int(self._header[self.LATEST]) + 1
+        self._header[self.HEADER_FIELDS + seq % self.slots] = -1
+        return seq, self.frames[seq % self.slots]
+
+    def commit(self, seq):
+        self._header[self.HEADER_FIELDS + seq % self.slots] = seq
+        self._header[self.LATEST] = seq
+
+    def latest(self):
+        """Returns (seq, view) of the most recent frame, or (0, None) before the first one"""
+        seq = int(self._header[self.LATEST])
+        if seq == 0:
+            return 0, None
+        return seq, self.frames[seq % self.slots]
+
+    def is_current(self, seq):
+        """True while the slot of frame seq has not been overwritten"""
+        return seq > 0 and int(self._header[self.HEADER_FIELDS + seq % self.slots]) == seq
+
+    def request_reset(self):
+        """Asks the capture process to reinitialize its camera"""
+        self._header[self.RESET_REQUESTED] = 1
+
+    def take_reset_request(self):
+        requested = bool(self._header[self.RESET_REQUESTED])
+        self._header[self.RESET_REQUESTED] = 0
+        return requested
+
+    def close(self):
+        self._header = None
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A consumer still holds a view, the mapping goes away with the process
+            logger.warning(f"Frame ring {self.name} still in use, left mapped")
+
+    def unlink(self):
+        self.close()
+        if self.owner:
+            self.shm.unlink()
+            logger.info(f"Frame ring {self.name} removed")
+
+
+def capture_into_ring(camera, ring, stop_event, fps=FRAME_RING_FPS, error_cooldown=1.0):
+    """Capture process loop: reads frames straight into ring slots at up to fps frames per second"""
+    frame_interval = 1.0 / fps
+    next_frame = time.monotonic()
+    logger.info(f"Capturing into frame ring {ring.name} at {fps} fps")
+    while not stop_event.is_set():
+        if ring.take_reset_request():
+            _reset_camera(camera)
+
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            stop_event.wait(delay)
+        next_frame = max(next_frame + frame_interval, time.monotonic())
+
+        try:
+            seq, slot = ring.begin_write()
+            camera.read_frame(out=slot)
+            ring.commit(seq)
+            get_metrics().increment("frame_ring.frames_captured")
+        except Exception as e:
+            logger.error(f"Error grabbing frame: {str(e)}")
+            stop_event.wait(error_cooldown)
+            _reset_camera(camera)
+
+def _reset_camera(camera):
+    try:
+        logger.info("Attempting to reinitialize camera...")
+        camera._initialize_camera()
+    except Exception as e:
+        logger.error(f"Failed to reinitialize camera: {str(e)}")
+
+
+class RingFrameSource:
+    """Consumer side of a FrameRing, with the same interface as FrameGrabber"""
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def latest(self):
+        """Returns (sequence number, zero-copy frame view) of the most recent frame"""
+        return self.ring.latest()
+
+    def is_current(self, seq):
+        return self.ring.is_current(seq)
+
+    def request_reset(self):
+        self.ring.request_reset()
+
+    # Capture runs in its own process, so there is no thread to manage here
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=None):
+        pass
@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+
+class Letterbox:
+    """
+    Fits frames into square model inputs without distorting them, like yolov5:
+    each frame is scaled to fit and centred on a grey (114) background.
+    The batch buffer is allocated once and reused, so only the resized pixels
+    are written per call. Not thread safe, each detector owns one.
+    """
+    PAD_VALUE = 114
+
+    def __init__(self, size, max_batch=1):
+        self.size = size
+        self._buffer = np.full((max_batch, size, size, 3), self.PAD_VALUE, dtype=np.uint8)
+        # Placement of the frame inside each buffer slot: (scale, pad_x, pad_y, width, height)
+        self._placements = [None] * max_batch
+        self.transforms = []
+
+    def _placement(self, frame_shape):
+        height, width = frame_shape[:2]
+        scale = min(self.size / width, self.size / height)
+        new_width, new_height = round(width * scale), round(height * scale)
+        pad_x, pad_y = (self.size - new_width) // 2, (self.size - new_height) // 2
+        return scale, pad_x, pad_y, new_width, new_height
+
+    def __call__(self, frames):
+        """Letterboxes frames into the buffer and returns an (N, size, size, 3) view of it"""
+        count = len(frames)
+        if count > len(self._buffer):
+            self._buffer = np.full((count, self.size, self.size, 3), self.PAD_VALUE, dtype=np.uint8)
+            self._placements = [None] * count
+
+        self.transforms = []
+        for i, frame in enumerate(frames):
+            placement = self._placement(frame.shape)
+            scale, pad_x, pad_y, new_width, new_height = placement
+            if placement != self._placements[i]:
+                # Frame size changed for this slot, so the padding moved
+                self._buffer[i].fill(self.PAD_VALUE)
+                self._placements[i] = placement
+            cv2.resize(
+                frame, (new_width, new_height),
+                dst=self._buffer[i, pad_y:pad_y + new_height, pad_x:pad_x + new_width],
+                interpolation=cv2.INTER_LINEAR
+            )
+            self.transforms.append((scale, pad_x, pad_y, frame.shape[1], frame.shape[0]))
+        return self._buffer[:count]
+
+    def to_frame(self, boxes, index):
+        """Maps x1, y1, x2, y2 boxes of the index-th input back onto its original frame, in place"""
+        scale, pad_x, pad_y, width, height = self.transforms[index]
+        # Strided slices are views, so every step updates boxes directly
+        xs, ys = boxes[:, 0:4:2], boxes[:, 1:4:2]
+        xs -= pad_x
+        ys -= pad_y
+        boxes[:, :4] /= scale
+        np.clip(xs, 0, width, out=xs)
+        np.clip(ys, 0, height, out=ys)
+        return boxes
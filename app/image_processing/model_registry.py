@@ -0,0 +1,80 @@
+import hashlib
+import mmap
+from app.common.logger import get_logger
+from app.config import MODEL_REQUIRE_CHECKSUM, MODEL_MANIFEST_PATH
+
+logger = get_logger(__name__)
+
+class ModelIntegrityError(RuntimeError):
+    """Raised when a pinned model file does not match its expected checksum"""
+
+
+class ModelRegistry:
+    """
+    Resolves pinned model files on local disk and verifies their checksums.
+    A file without an explicit digest is checked against the manifest that
+    provision_models.py writes, in sha256sum format.
+    """
+
+    def __init__(self, require_checksum=MODEL_REQUIRE_CHECKSUM, manifest_path=MODEL_MANIFEST_PATH):
+        self.require_checksum = require_checksum
+        self.manifest_path = manifest_path
+        self._verified = {}
+
+    def manifest(self):
+        """Returns the recorded digests keyed by file name"""
+        try:
+            with open(self.manifest_path) as f:
+                lines = [line.split() for line in f if line.strip()]
+        except FileNotFoundError:
+            return {}
+        return {name: digest for digest, name in lines}
+
+    def available(self, path):
+        """Returns True if the model file exists locally"""
+        return path.is_file()
+
+    def resolve(self, path, sha256=None):
+        """Returns the verified local path of a pinned model file"""
+        if not self.available(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+
+        stat = path.stat()
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if self._verified.get(path) == stamp:
+            return path
+
+        sha256 = sha256 or self.manifest().get(path.name)
+        if sha256:
+            digest = self.checksum(path)
+            if digest != sha256.lower():
+                raise ModelIntegrityError(
+                    f"Checksum mismatch for {path}: expected {sha256}, got {digest}"
+                )
+            logger.info(f"Verified checksum of {path.name}")
+        elif self.require_checksum:
+            raise ModelIntegrityError(
+                f"No checksum pinned for {path}: run provision_models.py, set its SHA-256 "
+                f"in the config or MODEL_REQUIRE_CHECKSUM=false to skip verification"
+            )
+        else:
+            logger.warning(f"No checksum pinned for {path.name}, skipping verification")
+
+        self._verified[path] = stamp
+        return path
+
+    def checksum(self, path):
+        """Computes the SHA-256 of a file through a read-only memory map"""
+        with open(path, 'rb') as f, self.map(f) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+    @staticmethod
+    def map(f):
+        """Memory-maps an open file read-only"""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+_registry = ModelRegistry()
+
+def get_model_registry():
+    return _registry
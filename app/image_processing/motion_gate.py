@@ -0,0 +1,53 @@
+import time
+import cv2
+import numpy as np
+from app.common.logger import get_logger
+from app.config import (
+    MOTION_PIXEL_THRESHOLD, MOTION_MIN_CHANGED_RATIO, MOTION_MAX_STATIC_SECONDS
+)
+
+logger = get_logger(__name__)
+
+class MotionGate:
+    """Cheap frame differencing against the last stored frame, used to skip inference on static scenes"""
+    SIGNATURE_SIZE = (160, 120)
+
+    def __init__(self, pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                 min_changed_ratio=MOTION_MIN_CHANGED_RATIO,
+                 max_static_seconds=MOTION_MAX_STATIC_SECONDS):
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_static_seconds = max_static_seconds
+        self._reference = None
+        self._reference_time = 0
+
+    def _signature(self, frame):
+        """Downscaled, blurred greyscale version of the frame"""
+        small = cv2.resize(frame, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_ratio(self, frame):
+        """Fraction of pixels that differ from the reference frame"""
+        diff = cv2.absdiff(self._signature(frame), self._reference)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def has_changed(self, frames):
+        """Returns True if any frame differs from the reference or the reference is too old"""
+        if self._reference is None:
+            return True
+        if time.time() - self._reference_time >= self.max_static_seconds:
+            logger.debug("Reference frame expired, forcing detection")
+            return True
+
+        for frame in frames:
+            ratio = self.changed_ratio(frame)
+            if ratio >= self.min_changed_ratio:
+                logger.debug(f"Motion detected ({ratio:.2%} of pixels changed)")
+                return True
+        return False
+
+    def update(self, frame):
+        """Makes frame the reference for future comparisons"""
+        self._reference = self._signature(frame)
+        self._reference_time = time.time()
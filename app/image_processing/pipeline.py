@@ -0,0 +1,243 @@
+import queue
+import threading
+import time
+import numpy as np
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import MOTION_STATIC_ACTION
+
+logger = get_logger(__name__)
+
+class DropOldestQueue(queue.Queue):
+    """Bounded queue that discards the oldest item instead of blocking when full"""
+
+    def __init__(self, maxsize, on_drop=None):
+        super().__init__(maxsize=maxsize)
+        self.dropped = 0
+        # Called with each dropped item, e.g. to return its buffers
+        self.on_drop = on_drop
+
+    def put_latest(self, item):
+        """Puts an item, dropping stale items to make room if needed"""
+        while True:
+            try:
+                self.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    stale = self.get_nowait()
+                    self.dropped += 1
+                    logger.warning(f"Queue full, dropped stale item ({self.dropped} dropped so far)")
+                except queue.Empty:
+                    continue
+                if self.on_drop is not None:
+                    self.on_drop(stale)
+
+
+class BurstBuffers:
+    """
+    Preallocated (burst_size, height, width, 3) arrays that bursts are copied
+    into as they are collected, so inference never reads frames the capture side
+    can overwrite. A buffer is acquired per burst and released once inference is
+    done with it or its burst is dropped.
+    """
+
+    def __init__(self, count, burst_size):
+        self.count = count
+        self.burst_size = burst_size
+        self._free = queue.SimpleQueue()
+        self._allocated = False
+
+    def acquire(self, frame_shape):
+        """Returns a free buffer for frames of frame_shape, or None if all are in use"""
+        if not self._allocated:
+            # Allocated on first use, the frame size is only known then
+            for _ in range(self.count):
+                self._free.put(np.empty((self.burst_size,) + tuple(frame_shape), dtype=np.uint8))
+            self._allocated = True
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, buffer):
+        self._free.put(buffer)
+
+
+class FrameGrabber(threading.Thread):
+    """Continuously reads frames from the camera and keeps only the latest one"""
+
+    def __init__(self, camera, error_cooldown=1.0):
+        super().__init__(name="FrameGrabber", daemon=True)
+        self.camera = camera
+        self.error_cooldown = error_cooldown
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._reset_requested = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info("Frame grabber started")
+        while not self._stop_event.is_set():
+            if self._reset_requested.is_set():
+                self._reset_requested.clear()
+                self._reset_camera()
+            try:
+                frame = self.camera.read_frame()
+                with self._lock:
+                    self._frame = frame
+                    self._seq += 1
+            except Exception as e:
+                logger.error(f"Error grabbing frame: {str(e)}")
+                self._stop_event.wait(self.error_cooldown)
+                self._reset_camera()
+        logger.info("Frame grabber stopped")
+
+    def _reset_camera(self):
+        try:
+            logger.info("Attempting to reinitialize camera...")
+            self.camera._initialize_camera()
+        except Exception as e:
+            logger.error(f"Failed to reinitialize camera: {str(e)}")
+
+    def request_reset(self):
+        """Asks the grabber thread to reinitialize the camera"""
+        self._reset_requested.set()
+
+    def latest(self):
+        """Returns (sequence number, frame) of the most recent frame"""
+        with self._lock:
+            return self._seq, self._frame
+
+    def is_current(self, seq):
+        """Each read returns a new array, so captured frames never change"""
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Runs batched person detection on captured bursts and forwards the best frame"""
+
+    def __init__(self, detector, burst_queue, persist_queue, motion_gate=None, cadence=None,
+                 burst_done=None):
+        super().__init__(name="InferenceWorker", daemon=True)
+        self.detector = detector
+        self.burst_queue = burst_queue
+        self.persist_queue = persist_queue
+        self.motion_gate = motion_gate
+        # Called with each burst's frames once they are no longer needed
+        self.burst_done = burst_done
+        # Told the count of every burst so it can adapt the detection interval
+        self.cadence = cadence
+        self.last_count = None
+        self._lock = threading.Lock()
+        self._result_seq = 0
+        self._last_result = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info("Inference worker started")
+        while not self._stop_event.is_set():
+            try:
+                burst = self.burst_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if burst is None:
+                break
+            try:
+                cpu_start = time.process_time()
+                self._process_burst(*burst)
+                # Process-wide, so it includes the model's intra-op threads
+                get_metrics().observe("inference.burst_cpu_seconds", time.process_time() - cpu_start)
+                if self.cadence is not None and self.last_count is not None:
+                    self.cadence.observe(self.last_count)
+            except Exception as e:
+                logger.error(f"Error processing burst: {str(e)}")
+            finally:
+                if self.burst_done is not None:
+                    self.burst_done(burst[1])
+        logger.info("Inference worker stopped")
+
+    def _process_burst(self, timestamp, frames):
+        if self.motion_gate is not None and self.last_count is not None \
+                and not self.motion_gate.has_changed(frames):
+            self._reuse_last_count(timestamp)
+            return
+
+        batch_boxes = self.detector.detect_persons_batch(frames)
+
+        best_count = -1
+        best_frame = None
+        best_boxes = None
+        for i, (frame, person_boxes) in enumerate(zip(frames, batch_boxes)):
+            count = len(person_boxes)
+            if count > best_count:
+                best_count = count
+                best_frame = frame
+                best_boxes = person_boxes
+            logger.debug(f"Batch frame {i+1}: detected {count} persons")
+
+        if best_frame is None:
+            return
+
+        # The burst buffer is reused once this returns
+        best_frame = best_frame.copy()
+        self.last_count = best_count
+        if self.motion_gate is not None:
+            self.motion_gate.update(best_frame)
+
+        frame_with_boxes = self.detector.draw_boxes(best_frame.copy(), best_boxes)
+        with self._lock:
+            self._result_seq += 1
+            self._last_result = (self._result_seq, best_count, frame_with_boxes)
+
+        self.persist_queue.put_latest((best_count, best_frame, timestamp))
+        logger.info(f"Queued best frame with {best_count} persons from batch")
+
+    def _reuse_last_count(self, timestamp):
+        """Skips inference on a static scene, optionally recording the previous count"""
+        saved = get_metrics().increment("motion_gate.inferences_saved")
+        logger.info(f"Scene unchanged, reusing count {self.last_count} ({saved} inferences saved)")
+        if MOTION_STATIC_ACTION == "count_only":
+            self.persist_queue.put_latest((self.last_count, None, timestamp))
+
+    def last_result(self):
+        """Returns (sequence number, count, annotated frame) of the most recent burst, or None"""
+        with self._lock:
+            return self._last_result
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class PersistenceWorker(threading.Thread):
+    """Encodes and stores detection results off the display thread"""
+
+    def __init__(self, persist_queue, save_fn):
+        super().__init__(name="PersistenceWorker", daemon=True)
+        self.persist_queue = persist_queue
+        self.save_fn = save_fn
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info("Persistence worker started")
+        while True:
+            try:
+                item = self.persist_queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    break
+                continue
+            if item is None:
+                break
+            try:
+                self.save_fn(*item)
+            except Exception as e:
+                logger.error(f"Error persisting detection: {str(e)}")
+        logger.info("Persistence worker stopped")
+
+    def stop(self):
+        self._stop_event.set()
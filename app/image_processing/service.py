@@ -1,32 +1,108 @@
 import time
 import datetime
-import cv2
 from app.common.logger import get_logger
+from app.common.metrics import get_metrics
 from app.common.db import Database
+from app.common.blob_store import BlobStore
+from app.config import (
+    MOTION_GATE_ENABLED, IMAGE_CAPTURE_COUNT, IMAGE_CAPTURE_DELAY, PIPELINE_JOIN_TIMEOUTS
+)
 from app.models.image_record import ImageRecord
 from .camera import Camera
 from .yolo_inference import YOLODetector
+from .motion_gate import MotionGate
+from .pipeline import BurstBuffers, DropOldestQueue, FrameGrabber, InferenceWorker, PersistenceWorker
+from .frame_ring import RingFrameSource
+from .encoder import FrameEncoder
+from .cadence import AdaptiveCadence
 
 logger = get_logger(__name__)
 
 class PersonDetectionService:
-    CAPTURE_INTERVAL = 30         # Seconds between each batch capture
-    CAPTURE_COUNT_AT_ONCE = 5     # Number of photos taken per batch
-    CAPTURE_DELAY = 0.2          # Delay between individual captures in a batch
+    CAPTURE_COUNT_AT_ONCE = IMAGE_CAPTURE_COUNT  # Number of photos taken per batch
+    CAPTURE_DELAY = IMAGE_CAPTURE_DELAY          # Delay between individual captures in a batch
     ERROR_COOLDOWN = 20          # Seconds to wait after an error
+    BURST_QUEUE_SIZE = 2         # Bursts waiting for inference before the oldest is dropped
+    PERSIST_QUEUE_SIZE = 10      # Results waiting for storage before the oldest is dropped
 
-    def __init__(self, camera=None, detector=None, db=None):
-        self.camera = camera or Camera()
+    def __init__(self, camera=None, detector=None, db=None, motion_gate=None, blob_store=None,
+                 device_id=None, frame_ring=None, encoder=None, cadence=None):
+        self.device_id = device_id
+        # With a frame ring the camera belongs to a separate capture process
+        self.camera = camera or (None if frame_ring is not None else Camera())
         self.detector = detector or YOLODetector()
         self.db = db or Database()
-        self.last_capture_time = 0
+        self.blob_store = blob_store or BlobStore()
+        # Frames are encoded on the persistence worker thread, off the inference path
+        self.encoder = encoder or FrameEncoder()
+        self.writer = self.db.buffered_writer()
+        self.motion_gate = motion_gate or (MotionGate() if MOTION_GATE_ENABLED else None)
+        # Decides when bursts start, see IMAGE_PROCESSING_* in the config
+        self.cadence = cadence or AdaptiveCadence()
         self.last_error_time = 0
         self.error_count = 0
 
+        # Staged pipeline: grabber thread -> burst queue -> inference -> persist queue -> storage
+        # Bursts are copied out of the grabber as they are collected, into one buffer per burst
+        # being collected, queued or detected. Only the preview shows the zero-copy views.
+        self.burst_buffers = BurstBuffers(self.BURST_QUEUE_SIZE + 2, self.CAPTURE_COUNT_AT_ONCE)
+        self.burst_queue = DropOldestQueue(
+            self.BURST_QUEUE_SIZE, on_drop=lambda burst: self.burst_buffers.release(burst[1])
+        )
+        self.persist_queue = DropOldestQueue(self.PERSIST_QUEUE_SIZE)
+        if frame_ring is not None:
+            self.grabber = RingFrameSource(frame_ring)
+        else:
+            self.grabber = FrameGrabber(self.camera)
+        self.inference_worker = InferenceWorker(
+            self.detector, self.burst_queue, self.persist_queue, self.motion_gate,
+            cadence=self.cadence, burst_done=self.burst_buffers.release
+        )
+        self.persistence_worker = PersistenceWorker(self.persist_queue, self._save_to_database)
+        self._started = False
+
+        # Burst currently being collected from the grabber
+        self._burst = None
+        self._burst_count = 0
+        self._burst_timestamp = None
+        self._burst_last_seq = None
+        self._burst_last_time = 0
+        self._shown_frame_seq = 0
+        self._shown_result_seq = 0
+
+    def start(self):
+        """Starts the capture, inference and persistence threads"""
+        if self._started:
+            return
+        self.grabber.start()
+        self.inference_worker.start()
+        self.persistence_worker.start()
+        self._started = True
+        logger.info("Person detection pipeline started")
+
+    def stop(self):
+        """Stops the pipeline, letting pending results reach the database"""
+        if self._started:
+            self.grabber.stop()
+            self.inference_worker.stop()
+            self.persistence_worker.stop()
+            self.grabber.join(timeout=PIPELINE_JOIN_TIMEOUTS['grabber'])
+            self.inference_worker.join(timeout=PIPELINE_JOIN_TIMEOUTS['inference'])
+            self.persistence_worker.join(timeout=PIPELINE_JOIN_TIMEOUTS['persistence'])
+            self._started = False
+        self.writer.close()
+        if self.camera is not None:
+            self.camera.release()
+        logger.info("Person detection pipeline stopped")
+
+    def reset_camera(self):
+        """Reinitializes the camera from the grabber thread"""
+        self.grabber.request_reset()
+
     def process_frame(self):
         """
-        Processes frames for display and detection.
-        Handles errors gracefully and continues operation.
+        Returns the latest frame for display without blocking on detection.
+        Bursts are collected from the grabber and handed to the inference worker.
         """
         current_time = time.time()
 
@@ -35,79 +111,78 @@ class PersonDetectionService:
             if self.error_count > 0 and (current_time - self.last_error_time) < self.ERROR_COOLDOWN:
                 return None
 
-            frame = self.camera.read_frame()
-            if frame is None:
-                raise RuntimeError("Failed to capture frame")
-
-            frame_with_boxes = frame.copy()
-
-            # Only perform detection and storage if the interval has passed
-            if current_time - self.last_capture_time >= self.CAPTURE_INTERVAL:
-                best_count = -1
-                best_frame = None
-                best_frame_with_boxes = None
-                batch_success = False
-
-                logger.info(f"Starting batch capture of {self.CAPTURE_COUNT_AT_ONCE} frames")
-                
-                # Take CAPTURE_COUNT_AT_ONCE photos with delay
-                for i in range(self.CAPTURE_COUNT_AT_ONCE):
-                    try:
-                        frame = self.camera.read_frame()
-                        if frame is not None:
-                            person_boxes = self.detector.detect_persons(frame)
-                            count = len(person_boxes)
-                            
-                            if count > best_count:
-                                best_count = count
-                                best_frame = frame.copy()
-                                best_frame_with_boxes = self.detector.draw_boxes(frame.copy(), person_boxes)
-                            
-                            batch_success = True
-                            logger.debug(f"Batch frame {i+1}: detected {count} persons")
-                        
-                        time.sleep(self.CAPTURE_DELAY)
-                    except Exception as e:
-                        logger.warning(f"Error capturing batch frame {i+1}: {e}")
-                        continue
-
-                if batch_success and best_frame is not None:
-                    self._save_to_database(best_count, best_frame)
-                    frame_with_boxes = best_frame_with_boxes
-                    logger.info(f"Saved best frame with {best_count} persons from batch")
-                    self.error_count = 0  # Reset error count on success
-                
-                self.last_capture_time = current_time
-
-            return frame_with_boxes
+            if not self._started:
+                self.start()
+
+            seq, frame = self.grabber.latest()
+            if frame is None or seq == self._shown_frame_seq:
+                return None
+            self._shown_frame_seq = seq
+
+            self._collect_burst(current_time, seq, frame)
+
+            # Show the annotated best frame once when a new burst result is available
+            result = self.inference_worker.last_result()
+            if result is not None and result[0] != self._shown_result_seq:
+                self._shown_result_seq = result[0]
+                self.error_count = 0  # Reset error count on success
+                return result[2]
+
+            return frame
 
         except Exception as e:
             self.error_count += 1
             self.last_error_time = current_time
             logger.error(f"Error in process_frame: {str(e)}")
-            
-            # Try to reinitialize camera if multiple errors occur
-            if self.error_count >= 3:
-                try:
-                    logger.info("Attempting to reinitialize camera...")
-                    self.camera._initialize_camera()
-                    self.error_count = 0  # Reset error count if reinitialization succeeds
-                except Exception as cam_error:
-                    logger.error(f"Failed to reinitialize camera: {str(cam_error)}")
-            
             return None
 
-    def _save_to_database(self, count, frame):
-        """Saves the frame and detection count to the database."""
+    def _collect_burst(self, current_time, seq, frame):
+        """Copies CAPTURE_COUNT_AT_ONCE distinct frames spaced by CAPTURE_DELAY into a burst buffer"""
+        if self._burst is None:
+            if not self.cadence.due(current_time):
+                return
+            self._burst = self.burst_buffers.acquire(frame.shape)
+            if self._burst is None:
+                logger.warning("No free burst buffer, skipping this burst")
+                return
+            logger.info(f"Starting batch capture of {self.CAPTURE_COUNT_AT_ONCE} frames")
+            self._burst_count = 0
+            self._burst_timestamp = datetime.datetime.now()
+            self._burst_last_seq = None
+            self._burst_last_time = 0
+            self.cadence.burst_started(current_time)
+
+        if seq == self._burst_last_seq or current_time - self._burst_last_time < self.CAPTURE_DELAY:
+            return
+
+        self._burst[self._burst_count] = frame
+        if not self.grabber.is_current(seq):
+            # The ring wrapped onto this slot while it was being copied, take the next frame
+            overruns = get_metrics().increment("frame_ring.overruns")
+            logger.warning(f"Frame {seq} was overwritten while copied into the burst ({overruns} so far)")
+            return
+        self._burst_count += 1
+        self._burst_last_seq = seq
+        self._burst_last_time = current_time
+
+        if self._burst_count >= self.CAPTURE_COUNT_AT_ONCE:
+            self.burst_queue.put_latest((self._burst_timestamp, self._burst))
+            self._burst = None
+
+    def _save_to_database(self, count, frame, timestamp=None):
+        """Saves the frame and detection count to the database. frame may be None to store the count only."""
         try:
-            timestamp = datetime.datetime.now()
-            image_data = cv2.imencode('.jpg', frame)[1].tobytes()
+            timestamp = timestamp or datetime.datetime.now()
+            image_key = None
+            if frame is not None:
+                image_key = self.blob_store.put(self.encoder.encode(frame))
             record = ImageRecord(
                 timestamp=timestamp,
                 person_count=count,
-                image_data=image_data
+                image_key=image_key,
+                device_id=self.device_id
             )
-            self.db.save(record)
-            logger.debug(f"Saved frame with {count} persons at {timestamp}")
+            self.writer.add(record)
+            logger.debug(f"Queued frame with {count} persons at {timestamp}")
         except Exception as e:
-            logger.error(f"Error saving to database: {str(e)}")
\ No newline at end of file
+            logger.error(f"Error saving to database: {str(e)}")
@@ -1,46 +1,279 @@
-import torch
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
 import cv2
+import numpy as np
 from app.common.logger import get_logger
-from app.config import YOLO_CONFIDENCE_THRESHOLD
+from app.common.metrics import get_metrics
+from app.config import (
+    YOLO_CONFIDENCE_THRESHOLD, YOLO_NMS_CONFIDENCE_THRESHOLD, YOLO_IOU_THRESHOLD,
+    YOLO_NUM_THREADS, YOLO_BACKEND, YOLO_ONNX_MODEL_PATH, YOLO_ONNX_SHA256,
+    YOLO_HUB_REPO_DIR, YOLO_WEIGHTS_PATH, YOLO_WEIGHTS_SHA256, YOLO_ALLOW_HUB_DOWNLOAD,
+    YOLO_WARMUP_RUNS, YOLO_WARMUP_BATCH_SIZE
+)
+from .model_registry import get_model_registry
+from .letterbox import Letterbox
 
 logger = get_logger(__name__)
 
-class YOLODetector:
+PERSON_CLASS_ID = 0
+MODEL_INPUT_SIZE = 640
+
+
+def non_max_suppression(prediction, conf_thres=YOLO_NMS_CONFIDENCE_THRESHOLD,
+                        iou_thres=YOLO_IOU_THRESHOLD, classes=(PERSON_CLASS_ID,), max_det=1000):
+    """
+    NumPy port of yolov5's non_max_suppression for a single image.
+    Takes raw (num_anchors, 5 + num_classes) predictions in cx, cy, w, h format
+    and returns an (N, 6) array of x1, y1, x2, y2, score, class.
+    """
+    x = prediction[prediction[:, 4] > conf_thres]
+    if not len(x):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    # Class confidence = objectness * class probability, best class only
+    scores = x[:, 5:] * x[:, 4:5]
+    cls = scores.argmax(1)
+    conf = scores[np.arange(len(x)), cls]
+
+    keep = conf > conf_thres
+    if classes is not None:
+        keep &= np.isin(cls, classes)
+    x, cls, conf = x[keep], cls[keep], conf[keep]
+    if not len(x):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    boxes = np.empty((len(x), 4), dtype=np.float32)
+    boxes[:, 0] = x[:, 0] - x[:, 2] / 2
+    boxes[:, 1] = x[:, 1] - x[:, 3] / 2
+    boxes[:, 2] = x[:, 0] + x[:, 2] / 2
+    boxes[:, 3] = x[:, 1] + x[:, 3] / 2
+
+    # Offset boxes by class so NMS is applied per class
+    offset_boxes = boxes + cls[:, None].astype(np.float32) * 7680
+    areas = (offset_boxes[:, 2] - offset_boxes[:, 0]) * (offset_boxes[:, 3] - offset_boxes[:, 1])
+    order = conf.argsort()[::-1]
+    kept = []
+    while order.size and len(kept) < max_det:
+        i = order[0]
+        kept.append(i)
+        xx1 = np.maximum(offset_boxes[i, 0], offset_boxes[order[1:], 0])
+        yy1 = np.maximum(offset_boxes[i, 1], offset_boxes[order[1:], 1])
+        xx2 = np.minimum(offset_boxes[i, 2], offset_boxes[order[1:], 2])
+        yy2 = np.minimum(offset_boxes[i, 3], offset_boxes[order[1:], 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter)
+        order = order[1:][iou <= iou_thres]
+
+    return np.concatenate(
+        [boxes[kept], conf[kept, None], cls[kept, None].astype(np.float32)], axis=1
+    ).astype(np.float32)
+
+
+class InferenceBackend(ABC):
+    """
+    Base class for YOLO inference engines.
+    infer() takes a list of 640x640x3 uint8 images and returns one (N, 6) array of
+    x1, y1, x2, y2, score, class per image, in model input coordinates.
+    """
+    name = None
+
+    @abstractmethod
+    def infer(self, images):
+        """Runs the model on a batch of letterboxed images"""
+
+
+class TorchHubBackend(InferenceBackend):
+    """
+    Eager PyTorch yolov5n.
+    Loads the pinned local weights; torch.hub is only used when YOLO_ALLOW_HUB_DOWNLOAD is set.
+    """
+    name = "torch"
+
     def __init__(self):
-        try:
-            # for CPU optimization
-            torch.set_num_threads(2)
+        import torch
+
+        # for CPU optimization
+        torch.set_num_threads(YOLO_NUM_THREADS)
+        registry = get_model_registry()
+        if registry.available(YOLO_WEIGHTS_PATH) and YOLO_HUB_REPO_DIR.is_dir():
+            self.model = self._load_local(torch, registry.resolve(YOLO_WEIGHTS_PATH, YOLO_WEIGHTS_SHA256))
+        elif YOLO_ALLOW_HUB_DOWNLOAD:
+            logger.warning(f"Pinned weights not found at {YOLO_WEIGHTS_PATH}, loading from torch.hub")
             self.model = torch.hub.load('ultralytics/yolov5', 'yolov5n', pretrained=True)
-            self.model.classes = [0]  # Only detect 'person' class
-            logger.info("YOLOv5 model loaded successfully")
+        else:
+            raise FileNotFoundError(
+                f"Pinned weights not found at {YOLO_WEIGHTS_PATH} or yolov5 repo missing at "
+                f"{YOLO_HUB_REPO_DIR}; run provision_models.py or set YOLO_ALLOW_HUB_DOWNLOAD=true"
+            )
+        self.model.classes = [PERSON_CLASS_ID]  # Only detect 'person' class
+        self.model.conf = YOLO_NMS_CONFIDENCE_THRESHOLD
+        self.model.iou = YOLO_IOU_THRESHOLD
+
+    def _load_local(self, torch, weights_path):
+        """Builds the AutoShape model from a memory-mapped checkpoint, without torch.hub"""
+        # The pickled checkpoint references the yolov5 model classes
+        if str(YOLO_HUB_REPO_DIR) not in sys.path:
+            sys.path.insert(0, str(YOLO_HUB_REPO_DIR))
+        from models.common import AutoShape
+
+        try:
+            checkpoint = torch.load(weights_path, map_location='cpu', mmap=True, weights_only=False)
+        except TypeError:
+            # torch < 2.1 has no mmap support
+            checkpoint = torch.load(weights_path, map_location='cpu')
+        model = (checkpoint.get('ema') or checkpoint['model']).float().fuse().eval()
+        logger.info(f"Loaded pinned weights from {weights_path}")
+        return AutoShape(model)
+
+    def infer(self, images):
+        results = self.model(list(images))
+        return [detections.cpu().numpy() for detections in results.xyxy]
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """yolov5n exported to ONNX and run on the ONNX Runtime CPU execution provider"""
+    name = "onnx"
+
+    def __init__(self, model_path=YOLO_ONNX_MODEL_PATH, sha256=YOLO_ONNX_SHA256):
+        import onnxruntime as ort
+
+        model_path = get_model_registry().resolve(model_path, sha256)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = YOLO_NUM_THREADS
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Models exported without --dynamic only accept a batch of one
+        self.fixed_batch = isinstance(model_input.shape[0], int)
+        self._blob = None
+
+    def _to_blob(self, images):
+        """Same preprocessing as yolov5 AutoShape (channels as given, scaled to 0-1, NCHW) into a reused buffer"""
+        count = len(images)
+        if self._blob is None or len(self._blob) < count:
+            self._blob = np.empty((count, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), dtype=np.float32)
+        blob = self._blob[:count]
+        for i, image in enumerate(images):
+            blob[i] = image.transpose(2, 0, 1)
+        blob *= 1 / 255.0
+        return blob
+
+    def infer(self, images):
+        blob = self._to_blob(images)
+
+        if self.fixed_batch:
+            predictions = [self.session.run(None, {self.input_name: blob[i:i + 1]})[0][0]
+                           for i in range(len(images))]
+        else:
+            predictions = self.session.run(None, {self.input_name: blob})[0]
+
+        batch_detections = [non_max_suppression(prediction) for prediction in predictions]
+        for detections in batch_detections:
+            # AutoShape clips boxes to the image, do the same for identical output
+            np.clip(detections[:, :4], 0, MODEL_INPUT_SIZE, out=detections[:, :4])
+        return batch_detections
+
+
+BACKENDS = {
+    TorchHubBackend.name: TorchHubBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+}
+
+
+def create_backend(name=YOLO_BACKEND):
+    """Instantiates the inference backend selected in the config"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown YOLO backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class YOLODetector:
+    """
+    Person detector around one loaded model. Several cameras' inference threads
+    can share an instance: forward passes run one at a time, since they reuse
+    the letterbox input buffer.
+    """
+
+    def __init__(self, backend=None, warmup_runs=YOLO_WARMUP_RUNS):
+        try:
+            start_time = time.perf_counter()
+            self.backend = backend or create_backend()
+            self.letterbox = Letterbox(MODEL_INPUT_SIZE, YOLO_WARMUP_BATCH_SIZE)
+            self._lock = threading.Lock()
+            load_time = time.perf_counter() - start_time
+            logger.info(f"YOLOv5 model loaded successfully ({self.backend.name} backend)")
+
+            self.warmup(warmup_runs)
+            startup_time = time.perf_counter() - start_time
+
+            get_metrics().observe("detector.startup_seconds", startup_time)
+            logger.info(
+                f"Detector ready in {startup_time:.2f}s "
+                f"(load {load_time:.2f}s, warm-up {startup_time - load_time:.2f}s)"
+            )
         except Exception as e:
             logger.error(f"Failed to load YOLOv5 model: {str(e)}")
             raise
 
+    def warmup(self, runs=YOLO_WARMUP_RUNS, batch_size=YOLO_WARMUP_BATCH_SIZE):
+        """Runs dummy bursts so lazy allocations happen before the first real capture"""
+        if runs <= 0:
+            return
+        frames = [np.zeros((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3), dtype=np.uint8)] * batch_size
+        for _ in range(runs):
+            self.backend.infer(frames)
+        logger.debug(f"Warm-up finished ({runs} runs, batch size {batch_size})")
+
     def detect_persons(self, frame):
         try:
-            # Resize for model 5n
-            resized_frame = cv2.resize(frame, (640, 640))
-            results = self.model(resized_frame)
-            detections = results.xyxy[0]  # Bounding box'lar, skor ve sınıf id'leri
-
-            person_boxes = []
-            for *box, score, cls in detections:
-                if int(cls) == 0 and score > YOLO_CONFIDENCE_THRESHOLD:
-                    person_boxes.append(box)
-
+            person_boxes = self.detect_persons_batch([frame])[0]
             logger.debug(f"Detected {len(person_boxes)} persons in frame")
             return person_boxes
         except Exception as e:
             logger.error(f"Error during person detection: {str(e)}")
             raise
 
+    def detect_persons_batch(self, frames):
+        """
+        Runs a single batched forward pass over frames.
+        Returns one contiguous (N, 5) float32 array per frame: x1, y1, x2, y2, score
+        of each person, in frame coordinates.
+        """
+        try:
+            # frames may be a list or an (N, H, W, 3) burst array
+            if len(frames) == 0:
+                return []
+
+            with self._lock:
+                # Letterbox into the reused input buffer and hand the whole burst to the model at once
+                images = self.letterbox(frames)
+                batch_detections = self.backend.infer(images)
+
+                batch_boxes = []
+                for i, detections in enumerate(batch_detections):
+                    is_person = (detections[:, 5] == PERSON_CLASS_ID) & (detections[:, 4] > YOLO_CONFIDENCE_THRESHOLD)
+                    # Boolean indexing yields a new contiguous array, safe to map in place
+                    boxes = detections[is_person, :5].astype(np.float32, copy=False)
+                    batch_boxes.append(self.letterbox.to_frame(boxes, i))
+
+            logger.debug(f"Detected {[len(boxes) for boxes in batch_boxes]} persons in batch of {len(frames)} frames")
+            return batch_boxes
+        except Exception as e:
+            logger.error(f"Error during batched person detection: {str(e)}")
+            raise
+
     def draw_boxes(self, frame, boxes):
+        """Draws (N, 5) person detections, converting all coordinates to ints in one step"""
         try:
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box)
+            for x1, y1, x2, y2 in boxes[:, :4].astype(np.int32).tolist():
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             return frame
         except Exception as e:
             logger.error(f"Error drawing bounding boxes: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime, Boolean
+from app.common.db import Base
+
+class CardPresence(Base):
+    """Last known entry/exit state of each card, shared by every reader process"""
+    __tablename__ = 'card_presence'
+
+    card_id = Column(String, primary_key=True)
+    is_present = Column(Boolean, nullable=False)  # True after an entry, False after an exit
+    last_seen = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CardPresence(card_id={self.card_id}, is_present={self.is_present}, last_seen={self.last_seen})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Date, DateTime
+from app.common.db import Base
+
+class DailySummary(Base):
+    """Totals of one finished day, cached by DailySummaryCache for multi-day reports"""
+    __tablename__ = 'daily_summaries'
+
+    date = Column(Date, primary_key=True)
+    detections = Column(Integer, nullable=False, default=0)
+    total_persons = Column(Integer, nullable=False, default=0)
+    max_persons = Column(Integer, nullable=False, default=0)
+    peak_hour = Column(Integer)  # Hour with the most persons detected, None without detections
+    entries = Column(Integer, nullable=False, default=0)
+    exits = Column(Integer, nullable=False, default=0)
+    unique_cards = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (f"<DailySummary(date={self.date}, detections={self.detections}, "
+                f"total_persons={self.total_persons}, entries={self.entries}, exits={self.exits})>")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime
+from app.common.db import Base
+
+class HourlyOccupancy(Base):
+    """Detections and RFID activity aggregated per hour, maintained by OccupancyRollup"""
+    __tablename__ = 'hourly_occupancy'
+
+    hour = Column(DateTime, primary_key=True)  # Start of the hour
+    detections = Column(Integer, nullable=False, default=0)
+    total_persons = Column(Integer, nullable=False, default=0)
+    max_persons = Column(Integer, nullable=False, default=0)
+    entries = Column(Integer, nullable=False, default=0)
+    exits = Column(Integer, nullable=False, default=0)
+    unique_cards = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (f"<HourlyOccupancy(hour={self.hour}, detections={self.detections}, "
+                f"total_persons={self.total_persons}, entries={self.entries}, exits={self.exits})>")
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, LargeBinary
+from sqlalchemy import Column, Integer, DateTime, LargeBinary, String, Index
+from sqlalchemy.orm import deferred
 from app.common.db import Base
 
 class ImageRecord(Base):
@@ -8,7 +9,17 @@ class ImageRecord(Base):
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
     person_count = Column(Integer, nullable=False)
-    image_data = Column(LargeBinary)
+    # Key of the JPEG in the BlobStore
+    image_key = Column(String(64))
+    # Camera that took the frame, see DEVICES
+    device_id = Column(String(64))
+    # Legacy inline JPEG, emptied by migrate_image_blobs.py and never loaded unless accessed
+    image_data = deferred(Column(LargeBinary))
+
+    # Rows are appended in time order, so a BRIN index covers daily range scans at a tiny size
+    __table_args__ = (
+        Index('idx_image_records_timestamp', 'timestamp', postgresql_using='brin'),
+    )
 
     def __repr__(self):
-        return f"<ImageRecord(id={self.id}, timestamp={self.timestamp}, person_count={self.person_count})>" 
\ No newline at end of file
+        return f"<ImageRecord(id={self.id}, timestamp={self.timestamp}, person_count={self.person_count}, device_id={self.device_id})>" 
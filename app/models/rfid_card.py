@@ -12,7 +12,13 @@ class RFIDCard(Base):
     created_at = Column(DateTime, nullable=False)
 
     # Relationship with records
-    records = relationship("RFIDRecord", back_populates="card", cascade="all, delete-orphan")
+    # There is no foreign key constraint, so the join on card_id is spelled out
+    records = relationship(
+        "RFIDRecord",
+        primaryjoin="RFIDCard.card_id == foreign(RFIDRecord.card_id)",
+        back_populates="card",
+        cascade="all, delete-orphan"
+    )
 
     # Create indexes for faster queries
     __table_args__ = (
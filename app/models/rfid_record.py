@@ -1,6 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
+from sqlalchemy.orm import relationship
 from app.common.db import Base
+from app.models.rfid_card import RFIDCard  # noqa: F401 - registers the card relationship target
 
 class RFIDRecord(Base):
     __tablename__ = 'rfid_records'
@@ -9,6 +11,19 @@ class RFIDRecord(Base):
     card_id = Column(String, nullable=False)
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
     is_entry = Column(Boolean, nullable=False)  # True for entry, False for exit
+    device_id = Column(String(64))  # Reader that recorded the tap, see DEVICES
+
+    card = relationship(
+        "RFIDCard",
+        primaryjoin="foreign(RFIDRecord.card_id) == RFIDCard.card_id",
+        back_populates="records"
+    )
+
+    # Create indexes for faster queries
+    __table_args__ = (
+        Index('idx_rfid_records_timestamp', 'timestamp', postgresql_using='brin'),
+        Index('idx_rfid_records_card_id_timestamp', 'card_id', 'timestamp'),
+    )
 
     def __repr__(self):
-        return f"<RFIDRecord(id={self.id}, card_id={self.card_id}, timestamp={self.timestamp}, is_entry={self.is_entry})>" 
\ No newline at end of file
+        return f"<RFIDRecord(id={self.id}, card_id={self.card_id}, timestamp={self.timestamp}, is_entry={self.is_entry}, device_id={self.device_id})>" 
\ No newline at end of file
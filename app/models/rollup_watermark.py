@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+from app.common.db import Base
+
+class RollupWatermark(Base):
+    """Highest source row id already folded into the rollups, per source table"""
+    __tablename__ = 'rollup_watermarks'
+
+    source = Column(String(64), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RollupWatermark(source={self.source}, last_id={self.last_id})>"
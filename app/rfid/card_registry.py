@@ -0,0 +1,78 @@
+import uuid
+from app.common.files import atomic_write
+from app.common.logger import get_logger
+from app.config import RFID_CARD_REGISTRY_STAMP
+from app.models.rfid_card import RFIDCard
+
+logger = get_logger(__name__)
+
+class CardRegistry:
+    """
+    All registered RFID cards, held in memory and keyed by card_id.
+    Changes are signalled through a stamp file rather than per-tap queries:
+    writers call invalidate(), which atomically replaces the stamp with the next
+    counter value, and every registry reloads on its next lookup once the
+    stamp's contents differ from the ones it loaded with. If that reload fails,
+    the previously loaded cards keep being served.
+    """
+
+    def __init__(self, db, stamp_path=RFID_CARD_REGISTRY_STAMP):
+        self.db = db
+        self.stamp_path = stamp_path
+        self._cards = {}
+        self._loaded_stamp = None
+        self._stale = False
+
+    def _read_stamp(self):
+        try:
+            return self.stamp_path.read_text()
+        except FileNotFoundError:
+            return ""
+
+    def _next_stamp(self):
+        """The next counter value, with a random suffix so two writers bumping the same counter still differ"""
+        try:
+            counter = int(self._read_stamp().split()[0])
+        except (IndexError, ValueError):
+            counter = 0
+        return f"{counter + 1} {uuid.uuid4().hex}\n"
+
+    def load(self):
+        """Loads the full rfid_cards table"""
+        try:
+            # Read the stamp first so a change made during the query triggers another reload
+            stamp = self._read_stamp()
+            cards = self.db.query(RFIDCard)
+            self._cards = {card.card_id: card for card in cards}
+            self._loaded_stamp = stamp
+            self._stale = False
+            logger.info(f"Card registry loaded {len(self._cards)} cards")
+        except Exception as e:
+            logger.error(f"Error loading card registry: {str(e)}")
+            raise
+
+    def get(self, card_id):
+        """Returns the registered RFIDCard for card_id, or None if the card is unknown"""
+        if self._loaded_stamp is None:
+            self.load()
+        elif self._stale or self._read_stamp() != self._loaded_stamp:
+            try:
+                self.load()
+            except Exception:
+                # Retried on the next lookup, taps are checked against the cards loaded before
+                logger.warning(f"Serving {len(self._cards)} previously loaded cards")
+        return self._cards.get(card_id)
+
+    def __len__(self):
+        return len(self._cards)
+
+    def invalidate(self):
+        """Marks rfid_cards as changed for every registry, in this and other processes"""
+        try:
+            stamp = self._next_stamp()
+            self.stamp_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.stamp_path, stamp)
+        except Exception as e:
+            logger.error(f"Error invalidating card registry: {str(e)}")
+        # Reload here on the next lookup even if the stamp could not be written
+        self._stale = True
@@ -0,0 +1,64 @@
+import time
+from collections import deque
+import RPi.GPIO as GPIO
+from app.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+class FeedbackDisplay:
+    """
+    LCD and LED feedback driven as timed states instead of blocking sleeps.
+    show() replaces the current message at once; tick() moves on to the next
+    queued message, or back to the idle prompt, when the current one expires.
+    """
+    IDLE_LINES = ("Ready to scan", "cards...")
+
+    def __init__(self, lcd, led_pin):
+        self.lcd = lcd
+        self.led_pin = led_pin
+        self._deadline = None
+        self._pending = deque()
+        self._show_idle()
+
+    @property
+    def busy(self):
+        """True while a message is on screen"""
+        return self._deadline is not None
+
+    def show(self, line1, line2, duration, led=False, then=()):
+        """
+        Shows a message for duration seconds, replacing whatever is displayed.
+        then is a sequence of (line1, line2, duration, led) messages shown afterwards.
+        """
+        self._pending.clear()
+        self._pending.extend(then)
+        self._display(line1, line2, duration, led)
+
+    def queue(self, line1, line2, duration, led=False):
+        """Shows a message after the current one, or right away if the display is idle"""
+        if self.busy:
+            self._pending.append((line1, line2, duration, led))
+        else:
+            self._display(line1, line2, duration, led)
+
+    def tick(self):
+        """Advances the state machine, call this from the reader loop"""
+        if self._deadline is None or time.monotonic() < self._deadline:
+            return
+        if self._pending:
+            self._display(*self._pending.popleft())
+        else:
+            self._show_idle()
+
+    def _display(self, line1, line2, duration, led):
+        try:
+            self.lcd.text(line1, 1)
+            self.lcd.text(line2, 2)
+            GPIO.output(self.led_pin, GPIO.HIGH if led else GPIO.LOW)
+        except Exception as e:
+            logger.error(f"Error updating feedback: {str(e)}")
+        self._deadline = time.monotonic() + duration
+
+    def _show_idle(self):
+        self._display(*self.IDLE_LINES, 0, False)
+        self._deadline = None
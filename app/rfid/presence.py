@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from datetime import timedelta
+from sqlalchemy import func, insert, not_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.config import RFID_CARD_COOLDOWN, RFID_PRESENCE_CACHE_SIZE
+from app.models.card_presence import CardPresence
+from app.models.rfid_record import RFIDRecord
+
+logger = get_logger(__name__)
+
+class PresenceStore:
+    """
+    Entry/exit state per card, persisted in the card_presence table.
+    Every accepted tap toggles the row with a single conditional UPDATE, so
+    several reader processes can share the state. A small LRU of recently
+    seen cards answers repeat reads within the cooldown without a query.
+    While the database is unavailable taps are toggled from that LRU instead,
+    and the card's next tap with the database back writes its state explicitly.
+    """
+
+    def __init__(self, db, capacity=RFID_PRESENCE_CACHE_SIZE):
+        self.db = db
+        self.capacity = capacity
+        self._cache = OrderedDict()  # card_id -> (is_present, last_seen)
+        self._unsynced = set()  # Cards toggled in memory only, while the database was down
+
+    def hydrate(self):
+        """Seeds card_presence from the latest RFIDRecord per card if empty, then warms the cache"""
+        try:
+            with self.db.session_scope() as session:
+                if session.query(CardPresence.card_id).first() is None:
+                    self._seed_from_records(session)
+
+            with self.db.session_scope() as session:
+                recent = (
+                    session.query(CardPresence.card_id, CardPresence.is_present, CardPresence.last_seen)
+                    .order_by(CardPresence.last_seen.desc())
+                    .limit(self.capacity)
+                    .all()
+                )
+            for card_id, is_present, last_seen in reversed(recent):
+                self._remember(card_id, is_present, last_seen)
+            logger.info(f"Presence state loaded for {len(recent)} cards")
+        except IntegrityError:
+            # Another reader seeded the table first
+            logger.info("Presence state already seeded by another process")
+        except Exception as e:
+            logger.error(f"Error loading presence state: {str(e)}")
+            raise
+
+    def _seed_from_records(self, session):
+        latest = (
+            session.query(RFIDRecord.card_id, func.max(RFIDRecord.timestamp).label('timestamp'))
+            .group_by(RFIDRecord.card_id)
+            .subquery()
+        )
+        rows = (
+            session.query(RFIDRecord.card_id, RFIDRecord.is_entry, RFIDRecord.timestamp)
+            .join(latest, (RFIDRecord.card_id == latest.c.card_id)
+                  & (RFIDRecord.timestamp == latest.c.timestamp))
+            .all()
+        )
+        # Two records with the same latest timestamp collapse to one row
+        state = {card_id: (is_entry, timestamp) for card_id, is_entry, timestamp in rows}
+        if state:
+            session.execute(insert(CardPresence), [
+                {'card_id': card_id, 'is_present': is_entry, 'last_seen': timestamp}
+                for card_id, (is_entry, timestamp) in state.items()
+            ])
+        logger.info(f"Seeded presence state for {len(state)} cards from RFID records")
+
+    def record_tap(self, card_id, timestamp, cooldown=RFID_CARD_COOLDOWN):
+        """
+        Toggles the card's presence for a tap at timestamp.
+        Returns True for an entry, False for an exit, or None if the card was
+        already seen within cooldown seconds, by this or another reader.
+        """
+        cached = self._cache.get(card_id)
+        if cached and (timestamp - cached[1]).total_seconds() < cooldown:
+            return None
+
+        cutoff = timestamp - timedelta(seconds=cooldown)
+        # A card toggled offline continues from its in-memory state, not the stale row
+        offline = card_id in self._unsynced and cached is not None
+        try:
+            with self.db.session_scope() as session:
+                row = session.execute(
+                    update(CardPresence)
+                    .where(CardPresence.card_id == card_id, CardPresence.last_seen <= cutoff)
+                    .values(is_present=(not cached[0]) if offline else not_(CardPresence.is_present),
+                            last_seen=timestamp)
+                    .returning(CardPresence.is_present)
+                    .execution_options(synchronize_session=False)
+                ).first()
+
+                if row is not None:
+                    is_entry = row[0]
+                else:
+                    existing = session.get(CardPresence, card_id)
+                    if existing is not None:
+                        # Seen within the cooldown, possibly by another reader
+                        self._remember(card_id, existing.is_present, existing.last_seen)
+                        return None
+                    is_entry = (not cached[0]) if offline else True
+                    session.add(CardPresence(card_id=card_id, is_present=is_entry, last_seen=timestamp))
+            self._unsynced.discard(card_id)
+        except IntegrityError:
+            # Another reader inserted the card's first tap at the same moment
+            return None
+        except SQLAlchemyError as e:
+            # Accept the tap anyway, the RFIDRecord is still queued by the caller
+            is_entry = (not cached[0]) if cached else True
+            self._unsynced.add(card_id)
+            get_metrics().increment("presence.offline_taps")
+            logger.error(f"Presence state unavailable, toggled card {card_id} in memory: {str(e)}")
+
+        self._remember(card_id, is_entry, timestamp)
+        return is_entry
+
+    def _remember(self, card_id, is_present, last_seen):
+        self._cache[card_id] = (is_present, last_seen)
+        self._cache.move_to_end(card_id)
+        while len(self._cache) > self.capacity:
+            evicted, _ = self._cache.popitem(last=False)
+            self._unsynced.discard(evicted)
@@ -1,4 +1,4 @@
-from mfrc522 import SimpleMFRC522
+from mfrc522 import SimpleMFRC522, MFRC522
 from rpi_lcd import LCD
 import RPi.GPIO as GPIO
 import time
@@ -6,37 +6,77 @@ from datetime import datetime
 import unicodedata
 from app.common.logger import get_logger
 from app.common.db import Database
+from app.config import RFID_POLL_INTERVAL, RFID_CARD_COOLDOWN, RFID_FEEDBACK_SECONDS
 from app.models.rfid_card import RFIDCard
 from app.models.rfid_record import RFIDRecord
-from app.analytics.report_generator import ReportGenerator
-from app.analytics.email_notifier import EmailNotifier
+from app.analytics.report_queue import ReportJobQueue, ReportWorker
+from .feedback import FeedbackDisplay
+from .presence import PresenceStore
+from .card_registry import CardRegistry
 
 logger = get_logger(__name__)
 
+class DeviceMFRC522(SimpleMFRC522):
+    """SimpleMFRC522 on a chosen SPI bus, chip select and reset pin, for several readers per board"""
+
+    def __init__(self, bus=0, device=0, pin_rst=-1):
+        self.READER = MFRC522(bus=bus, device=device, pin_rst=pin_rst)
+
 class MFRC522Service:
-    def __init__(self):
+    # LCD lines for each status posted back by the report worker
+    REPORT_STATUS_LINES = {
+        'running': ("Generating", "report..."),
+        'sent': ("Report sent", "successfully!"),
+        'failed': ("Report error!", "Try again later"),
+        'duplicate': ("Report already", "sent recently"),
+    }
+
+    def __init__(self, report_queue=None, device=None, activity=None):
         try:
+            # Device settings from DEVICES, the defaults match a single reader on SPI0 CE0
+            device = device or {}
+            self.device_id = device.get('id')
+            # Shared time of the last accepted tap, cameras sample sooner after one
+            self.activity = activity
+            
             # Initialize RFID reader
-            self.reader = SimpleMFRC522()
+            if any(key in device for key in ('spi_bus', 'spi_device', 'pin_rst')):
+                self.reader = DeviceMFRC522(
+                    device.get('spi_bus', 0), device.get('spi_device', 0), device.get('pin_rst', -1)
+                )
+            else:
+                self.reader = SimpleMFRC522()
             
             # Initialize LCD
-            self.lcd = LCD()
+            self.lcd = LCD(address=device.get('lcd_address', 0x27))
             
             # Initialize LED
-            self.led_pin = 18
+            self.led_pin = device.get('led_pin', 18)
             GPIO.setup(self.led_pin, GPIO.OUT, initial=GPIO.LOW)
             
             # Initialize database
             self.db = Database()
-            self.last_readings = {}
-            self.report_generator = ReportGenerator()
-            self.email_notifier = EmailNotifier()
+            self.writer = self.db.buffered_writer()
+            
+            # Registered cards, taps are validated against these without a query
+            self.cards = CardRegistry(self.db)
+            self.cards.load()
+            self._last_rejected = (None, 0)
+            
+            # Entry/exit state survives restarts and is shared with other readers
+            self.presence = PresenceStore(self.db)
+            self.presence.hydrate()
             
-            # Initial LCD message
-            self.lcd.text("Ready to scan", 1)
-            self.lcd.text("cards...", 2)
+            # Admin reports run elsewhere, standalone use gets a local worker thread
+            if report_queue is None:
+                report_queue = ReportJobQueue(channels=(self.device_id,))
+                ReportWorker(report_queue).start_background()
+            self.report_queue = report_queue
             
-            logger.info("MFRC522 service initialized successfully")
+            # LCD/LED feedback, starts on the "Ready to scan" prompt
+            self.display = FeedbackDisplay(self.lcd, self.led_pin)
+            
+            logger.info(f"MFRC522 service initialized successfully for device {self.device_id}")
             
         except Exception as e:
             logger.error(f"Error initializing MFRC522 service: {str(e)}")
@@ -81,8 +121,7 @@ class MFRC522Service:
             data = f"{name},{card_id},{'A' if is_admin else 'U'}"
             
             # Show instruction
-            self.lcd.text("Place card to", 1)
-            self.lcd.text("write...", 2)
+            self.display.show("Place card to", "write...", 10)
             
             # Write to card with timeout
             start_time = time.time()
@@ -104,125 +143,111 @@ class MFRC522Service:
                 created_at=datetime.now()
             )
             self.db.save(card)
+            self.cards.invalidate()
             
             # Success feedback
-            GPIO.output(self.led_pin, GPIO.HIGH)
-            self.lcd.text("Card written", 1)
-            self.lcd.text("successfully!", 2)
-            time.sleep(0.5)
-            GPIO.output(self.led_pin, GPIO.LOW)
+            self.display.show("Card written", "successfully!", 0.5, led=True)
             
             logger.info(f"Written new card for {name} (Admin: {is_admin})")
             return card_id
             
         except Exception as e:
             logger.error(f"Error writing card: {str(e)}")
-            self.lcd.text("Error writing", 1)
-            self.lcd.text("card!", 2)
-            time.sleep(0.5)
+            self.display.show("Error writing", "card!", 0.5)
             raise
-        finally:
-            self.lcd.text("Ready to scan", 1)
-            self.lcd.text("cards...", 2)
+
+    def run(self, stop_event=None):
+        """Reader event loop: polls for cards and advances the feedback state machine"""
+        logger.info("RFID reader loop started")
+        while stop_event is None or not stop_event.is_set():
+            card_id = self.read_card()
+            if card_id:
+                logger.info(f"Card detected: {card_id}")
+            else:
+                time.sleep(RFID_POLL_INTERVAL)
 
     def read_card(self):
-        """Read RFID card"""
+        """
+        Polls the reader once without blocking and handles a tap if a card is present.
+        Returns the card_id of an accepted tap, otherwise None.
+        """
         try:
-            # Use blocking read first to ensure card detection works
-            id, text = self.reader.read()
+            self.display.tick()
+            self._show_report_status()
+
+            id, text = self.reader.read_no_block()
             if not text or not text.strip():
                 return None
 
             # Parse card data
             try:
                 name, card_id, status = text.strip().split(',')
-                is_admin = (status == 'A')
             except ValueError:
                 logger.error(f"Invalid card data format: {text}")
                 return None
 
-            # Check for duplicate reads
+            # Only registered cards are accepted, name and admin status come from the registry
+            card = self.cards.get(card_id)
+            if card is None:
+                self._reject_card(card_id)
+                return None
+            name = card.name
+            is_admin = card.is_admin
+
+            # Toggle entry/exit, repeat reads of the same card within the cooldown are ignored
             timestamp = datetime.now()
-            last_reading = self.last_readings.get(card_id)
-            if last_reading:
-                time_diff = (timestamp - last_reading['timestamp']).total_seconds()
-                if time_diff < 3:  # 3-second cooldown
-                    return None
-                is_entry = not last_reading.get('is_entry', True)
-            else:
-                is_entry = True
+            is_entry = self.presence.record_tap(card_id, timestamp, RFID_CARD_COOLDOWN)
+            if is_entry is None:
+                return None
 
-            # Visual feedback
-            GPIO.output(self.led_pin, GPIO.HIGH)
-            self.lcd.text(f"{'Welcome' if is_entry else 'Goodbye'}", 1)
-            self.lcd.text(f"{name}", 2)
+            # Visual feedback, replaces any message still shown for a previous card
+            self.display.show(
+                f"{'Welcome' if is_entry else 'Goodbye'}", f"{name}",
+                RFID_FEEDBACK_SECONDS, led=True
+            )
 
             # Save to database
             try:
                 record = RFIDRecord(
                     card_id=card_id,
-                    name=name,
                     timestamp=timestamp,
-                    is_entry=is_entry
+                    is_entry=is_entry,
+                    device_id=self.device_id
                 )
-                self.db.save(record)
+                self.writer.add(record)
             except Exception as e:
                 logger.error(f"Database error: {str(e)}")
 
-            # Update last reading
-            self.last_readings[card_id] = {
-                'timestamp': timestamp,
-                'is_entry': is_entry
-            }
+            if self.activity is not None:
+                self.activity.value = time.time()
 
             # Log the action
             action = "entered" if is_entry else "exited"
             logger.info(f"Card {card_id} ({name}) {action}")
             print(f"\n{name} has {action}")
 
-            # If admin card, generate and send report
+            # If admin card, request a report without waiting for it
             if is_admin and is_entry:  # Only generate report on admin entry
-                try:
-                    report = self.report_generator.generate_daily_report()
-                    self.email_notifier.send_report(report)
-                    
-                    # Show report status on LCD
-                    time.sleep(1)  # Brief pause before showing report status
-                    self.lcd.text("Generating", 1)
-                    self.lcd.text("report...", 2)
-                    time.sleep(2)
-                    
-                    self.lcd.text("Report sent", 1)
-                    self.lcd.text("successfully!", 2)
-                    time.sleep(2)
-                    
-                    logger.info(f"Admin {name} triggered report generation")
-                except Exception as e:
-                    logger.error(f"Error generating admin report: {str(e)}")
-                    self.lcd.text("Report error!", 1)
-                    self.lcd.text("Try again later", 2)
-                    time.sleep(2)
-
-            else:
-                # Keep welcome/goodbye message for 3 seconds for non-admin cards
-                time.sleep(3)
-
-            # Reset visual feedback
-            GPIO.output(self.led_pin, GPIO.LOW)
-            self.lcd.text("Ready to scan", 1)
-            self.lcd.text("cards...", 2)
+                logger.info(f"Admin {name} triggered report generation")
+                self.generate_admin_report(name)
 
             return card_id
 
         except Exception as e:
             logger.error(f"Error reading card: {str(e)}")
-            self.lcd.text("Error reading", 1)
-            self.lcd.text("card!", 2)
-            time.sleep(3)  # Show error message for 3 seconds
-            self.lcd.text("Ready to scan", 1)
-            self.lcd.text("cards...", 2)
+            self.display.show("Error reading", "card!", 3)  # Show error message for 3 seconds
             return None
 
+    def _reject_card(self, card_id):
+        """Denies an unregistered card, once per cooldown while it stays on the reader"""
+        last_card_id, last_time = self._last_rejected
+        now = time.monotonic()
+        if card_id == last_card_id and now - last_time < RFID_CARD_COOLDOWN:
+            return
+        self._last_rejected = (card_id, now)
+        logger.warning(f"Rejected unregistered card {card_id}")
+        self.display.show("Unknown card", "Access denied", RFID_FEEDBACK_SECONDS)
+
     def flash_led(self, duration=0.1):
         """Flash LED for visual feedback"""
         try:
@@ -232,26 +257,29 @@ class MFRC522Service:
         except Exception as e:
             logger.error(f"Error flashing LED: {str(e)}")
 
-    def generate_admin_report(self):
-        """Generate and send report for admin"""
+    def generate_admin_report(self, requested_by="admin"):
+        """Queue a report for admin, progress is shown as the worker reports back"""
         try:
-            report = self.report_generator.generate_daily_report()
-            self.email_notifier.send_report(report)
-            
-            self.lcd.text("Report sent", 1)
-            self.lcd.text("successfully!", 2)
-            time.sleep(2)
-            
-            logger.info("Admin report generated and sent")
+            self.report_queue.submit(requested_by, channel=self.device_id)
+            self.display.queue("Report", "requested", 2)
         except Exception as e:
-            logger.error(f"Error generating admin report: {str(e)}")
-            self.lcd.text("Report error!", 1)
-            
-            time.sleep(2)
+            logger.error(f"Error requesting admin report: {str(e)}")
+            self.display.queue("Report error!", "Try again later", 2)
+
+    def _show_report_status(self):
+        """Shows the next status update from the report worker, if any"""
+        status = self.report_queue.poll_status(self.device_id)
+        if status is None:
+            return
+        lines = self.REPORT_STATUS_LINES.get(status['status'])
+        if lines:
+            self.display.queue(*lines, 2)
 
     def cleanup(self):
         """Clean up resources"""
         try:
+            if hasattr(self, 'writer'):
+                self.writer.close()
             GPIO.output(self.led_pin, GPIO.LOW)
             GPIO.cleanup()
             self.lcd.clear()
@@ -0,0 +1,254 @@
+import multiprocessing as mp
+import threading
+import time
+from app.common.logger import get_logger
+from app.common.metrics import get_metrics
+from app.image_processing.frame_ring import FrameRing
+from app.config import (
+    SUPERVISOR_POLL_INTERVAL, SUPERVISOR_RESTART_DELAY,
+    SUPERVISOR_MAX_RESTART_DELAY, SUPERVISOR_STABLE_SECONDS, SUPERVISOR_STOP_TIMEOUT
+)
+
+logger = get_logger(__name__)
+
+# Services are imported inside the device processes, so the supervisor itself never
+# loads OpenCV, the model or the hardware drivers. Each device process builds its own
+# engine (get_engine is per process). The model is loaded once, in the detection
+# process that serves every camera's frame ring, so adding a camera adds a capture
+# process and a ring but no second copy of the model.
+
+def run_rfid_device(device, stop_event, report_queue, rfid_activity):
+    """Worker process for one RFID reader"""
+    from app.rfid.service import MFRC522Service
+
+    rfid_service = None
+    try:
+        logger.info(f"Starting RFID monitoring process for {device['id']}")
+        rfid_service = MFRC522Service(report_queue, device, rfid_activity)
+
+        while not stop_event.is_set():
+            try:
+                # Poll cards until stopped
+                rfid_service.run(stop_event)
+
+            except Exception as e:
+                logger.error(f"Error in RFID monitoring on {device['id']}: {str(e)}")
+                time.sleep(0.5)
+
+    except Exception as e:
+        # Exit with an error so the supervisor restarts the device
+        logger.error(f"Fatal error in RFID process for {device['id']}: {str(e)}")
+        raise
+    finally:
+        if rfid_service:
+            rfid_service.cleanup()
+
+def run_capture_device(device, stop_event, report_queue, rfid_activity):
+    """Capture process for one camera, fills the camera's frame ring"""
+    from app.image_processing.camera import Camera
+    from app.image_processing.frame_ring import FrameRing, capture_into_ring
+
+    ring = camera = None
+    try:
+        logger.info(f"Starting capture process for {device['id']}")
+        ring = FrameRing.attach(device['ring'])
+        # The index is configured per device, never fall back to another device's camera
+        camera = Camera(device.get('camera_id', 0), scan_fallback=False)
+        capture_into_ring(camera, ring, stop_event)
+    except Exception as e:
+        logger.error(f"Fatal error in capture process for {device['id']}: {str(e)}")
+        raise
+    finally:
+        if camera:
+            camera.release()
+        if ring:
+            ring.close()
+
+def run_detection_device(device, stop_event, report_queue, rfid_activity):
+    """
+    Detection process for all cameras: one model shared by a pipeline per camera,
+    each reading its camera's frame ring, with preview and storage
+    """
+    import cv2
+    from app.common.db import Database
+    from app.image_processing.frame_ring import FrameRing
+    from app.image_processing.service import PersonDetectionService
+    from app.image_processing.cadence import AdaptiveCadence
+    from app.image_processing.yolo_inference import YOLODetector
+
+    services = []
+    try:
+        cameras = device['cameras']
+        logger.info(f"Starting detection process for {len(cameras)} cameras")
+        detector = YOLODetector()
+        db = Database()
+        for camera in cameras:
+            services.append((camera, PersonDetectionService(
+                device_id=camera['id'],
+                frame_ring=FrameRing.attach(camera['ring']),
+                detector=detector,
+                db=db,
+                cadence=AdaptiveCadence(rfid_activity)
+            )))
+
+        while not stop_event.is_set():
+            shown = 0
+            for camera, image_service in services:
+                try:
+                    frame = image_service.process_frame()
+                    if frame is None:
+                        continue
+                    shown += 1
+                    if camera.get('preview'):
+                        cv2.imshow(f"Security Feed - {camera['id']}", frame)
+                except Exception as e:
+                    logger.error(f"Error in image processing on {camera['id']}: {str(e)}")
+                    image_service.reset_camera()
+
+            if any(camera.get('preview') for camera, _ in services):
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    logger.info("Quit signal received")
+                    stop_event.set()
+                    break
+                elif key == ord('r'):
+                    for _, image_service in services:
+                        image_service.reset_camera()
+            if not shown:
+                # When no camera has a new frame, yield a bit of CPU time
+                time.sleep(0.01)
+
+    except Exception as e:
+        logger.error(f"Fatal error in detection process: {str(e)}")
+        raise
+    finally:
+        # Pipelines flush in parallel, so the grace period does not grow with the camera count
+        stoppers = [threading.Thread(target=image_service.stop) for _, image_service in services]
+        for stopper in stoppers:
+            stopper.start()
+        for stopper in stoppers:
+            stopper.join()
+        cv2.destroyAllWindows()
+
+DEVICE_TARGETS = {
+    'rfid': run_rfid_device,
+    'capture': run_capture_device,
+    'detection': run_detection_device,
+}
+
+class DeviceWorker:
+    """A supervised device process and its restart state"""
+
+    def __init__(self, device):
+        if device.get('type') not in DEVICE_TARGETS:
+            raise ValueError(f"Unknown device type for {device.get('id')}: {device.get('type')}")
+        self.device = device
+        self.device_id = device['id']
+        self.target = DEVICE_TARGETS[device['type']]
+        self.process = None
+        self.started_at = 0
+        self.next_start = 0
+        self.restart_delay = SUPERVISOR_RESTART_DELAY
+        self.restarts = 0
+
+class Supervisor:
+    """
+    Runs one worker process per configured device and restarts crashed ones.
+    Each camera gets a capture process, and one detection process serves them all.
+    Restarts back off exponentially per device, from SUPERVISOR_RESTART_DELAY up to
+    SUPERVISOR_MAX_RESTART_DELAY, and the delay resets once a process stays up for
+    SUPERVISOR_STABLE_SECONDS.
+    """
+
+    def __init__(self, devices, stop_event, report_queue):
+        self.stop_event = stop_event
+        self.report_queue = report_queue
+        # Time of the last accepted RFID tap, written by readers and read by every camera
+        self.rfid_activity = mp.Value('d', 0.0)
+        self.workers = []
+        # Each camera gets a frame ring owned here, so it outlives restarts of its
+        # capture process and of the detection process
+        self.rings = []
+        cameras = []
+        for device in devices:
+            if device.get('type') == 'camera':
+                ring = FrameRing.create()
+                self.rings.append(ring)
+                device = dict(device, ring=ring.name)
+                cameras.append(device)
+                self.workers.append(DeviceWorker(dict(device, id=f"{device['id']}-capture", type='capture')))
+            else:
+                self.workers.append(DeviceWorker(device))
+        if cameras:
+            self.workers.append(DeviceWorker({'id': 'detection', 'type': 'detection', 'cameras': cameras}))
+        ids = [worker.device_id for worker in self.workers]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Device ids must be unique: {ids}")
+
+    def start(self):
+        """Starts every device process"""
+        for worker in self.workers:
+            self._spawn(worker)
+        logger.info(f"Supervisor started {len(self.workers)} device processes")
+
+    def _spawn(self, worker):
+        worker.process = mp.Process(
+            target=worker.target,
+            args=(worker.device, self.stop_event, self.report_queue, self.rfid_activity),
+            name=f"device-{worker.device_id}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        logger.info(f"Started {worker.device['type']} device {worker.device_id} (pid {worker.process.pid})")
+
+    def poll(self):
+        """Restarts device processes that exited, once their backoff delay has passed"""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.process is None:
+                if now >= worker.next_start:
+                    self._spawn(worker)
+                continue
+            if worker.process.is_alive():
+                continue
+
+            exitcode = worker.process.exitcode
+            worker.process.join()
+            worker.process = None
+            if now - worker.started_at >= SUPERVISOR_STABLE_SECONDS:
+                worker.restart_delay = SUPERVISOR_RESTART_DELAY
+            worker.next_start = now + worker.restart_delay
+            worker.restarts += 1
+            get_metrics().increment(f"supervisor.restarts.{worker.device_id}")
+            logger.error(
+                f"Device {worker.device_id} exited with code {exitcode}, "
+                f"restart {worker.restarts} in {worker.restart_delay}s"
+            )
+            worker.restart_delay = min(worker.restart_delay * 2, SUPERVISOR_MAX_RESTART_DELAY)
+
+    def run(self):
+        """Supervises the devices until the stop event is set"""
+        while not self.stop_event.is_set():
+            self.poll()
+            self.stop_event.wait(SUPERVISOR_POLL_INTERVAL)
+
+    def stop(self, timeout=SUPERVISOR_STOP_TIMEOUT):
+        """
+        Stops every device process. They shut down in parallel and share one grace
+        period, so buffered records get flushed; only processes still running after
+        it are terminated.
+        """
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        running = [worker for worker in self.workers if worker.process is not None]
+        for worker in running:
+            worker.process.join(timeout=max(0, deadline - time.monotonic()))
+        for worker in running:
+            if worker.process.is_alive():
+                logger.warning(f"Device {worker.device_id} did not stop within {timeout}s, terminating")
+                worker.process.terminate()
+                worker.process.join(timeout=1)
+        for ring in self.rings:
+            ring.unlink()
+        logger.info("Supervisor stopped")
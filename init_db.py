@@ -1,11 +1,41 @@
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, text
+from app.common.db import get_engine
 from app.models.image_record import Base as ImageBase
 from app.models.rfid_card import Base as RFIDCardBase
 from app.models.rfid_record import Base as RFIDRecordBase
-from app.config import DATABASE_URL
+from app.models.card_presence import Base as CardPresenceBase
+from app.models.hourly_occupancy import Base as HourlyOccupancyBase
+from app.models.rollup_watermark import Base as RollupWatermarkBase
+from app.models.daily_summary import Base as DailySummaryBase
+
+def create_missing_indexes(engine):
+    """Creates indexes declared on the models that tables from older deployments are missing"""
+    inspector = inspect(engine)
+    for table in ImageBase.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                print(f"Creating index {index.name} on {table.name}...")
+                index.create(engine)
+
+def add_missing_columns(engine):
+    """Adds nullable columns declared on the models that tables from older deployments are missing"""
+    inspector = inspect(engine)
+    for table in ImageBase.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                print(f"Adding column {column.name} to {table.name}...")
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
 
 def init_db():
-    engine = create_engine(DATABASE_URL)
+    engine, _ = get_engine()
     
     # Create tables in the correct order
     # 1. Create image_records table
@@ -17,7 +47,19 @@ def init_db():
     # 3. Create rfid_records table (depends on rfid_cards)
     RFIDRecordBase.metadata.create_all(engine)
     
+    # 4. Create card_presence table
+    CardPresenceBase.metadata.create_all(engine)
+    
+    # 5. Create the hourly_occupancy rollup, rollup_watermarks and daily_summaries tables
+    HourlyOccupancyBase.metadata.create_all(engine)
+    RollupWatermarkBase.metadata.create_all(engine)
+    DailySummaryBase.metadata.create_all(engine)
+    
+    # 6. Add columns and indexes introduced after the tables were first created
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    
     print("Database tables created successfully")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db() 
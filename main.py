@@ -1,106 +1,39 @@
-import cv2
 import multiprocessing as mp
-import time
-from app.image_processing.service import PersonDetectionService
-from app.rfid.service import MFRC522Service
 from app.common.logger import get_logger
+from app.config import DEVICES
 from app.analytics.scheduler import setup_scheduler
+from app.analytics.report_queue import ReportJobQueue
+from app.supervisor import Supervisor
+from init_db import init_db
 
 logger = get_logger(__name__)
 
-def rfid_process(stop_event):
-    """Dedicated process for RFID monitoring"""
-    try:
-        logger.info("Starting RFID monitoring process")
-        rfid_service = MFRC522Service()
-        
-        while not stop_event.is_set():
-            try:
-                # Read card
-                card_id = rfid_service.read_card()
-                if card_id:
-                    logger.info(f"Card detected: {card_id}")
-                
-            except Exception as e:
-                logger.error(f"Error in RFID monitoring: {str(e)}")
-                time.sleep(0.5)
-                
-    except Exception as e:
-        logger.error(f"Fatal error in RFID process: {str(e)}")
-    finally:
-        if rfid_service:
-            rfid_service.cleanup()
-
-def image_process(stop_event):
-    """Dedicated process for image processing"""
-    try:
-        logger.info("Starting image processing process")
-        image_service = PersonDetectionService()
-        
-        while not stop_event.is_set():
-            try:
-                frame = image_service.process_frame()
-                if frame is not None:
-                    cv2.imshow("Security Feed", frame)
-
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == ord('q'):
-                        logger.info("Quit signal received")
-                        stop_event.set()
-                        break
-                    elif key == ord('r'):
-                        image_service.camera._initialize_camera()
-                else:
-                    # When no frame is captured, yield a bit of CPU time
-                    time.sleep(0.1)
-                    
-            except Exception as e:
-                logger.error(f"Error in image processing: {str(e)}")
-                try:
-                    image_service.camera._initialize_camera()
-                except:
-                    stop_event.set()
-                    break
-                
-    except Exception as e:
-        logger.error(f"Fatal error in image process: {str(e)}")
-    finally:
-        if image_service:
-            image_service.camera.release()
-        cv2.destroyAllWindows()
-
 def main():
     # Create a shared event for stopping processes
     stop_event = mp.Event()
+    supervisor = scheduler = None
     
     try:
-        # Start RFID process
-        rfid_proc = mp.Process(
-            target=rfid_process,
-            args=(stop_event,),
-            daemon=True
-        )
-        rfid_proc.start()
+        # Create missing tables, columns and indexes once, before any worker starts
+        init_db()
+        
+        # Admin report requests from the RFID readers are run by the scheduler,
+        # each reader gets its own status channel
+        reader_ids = [device['id'] for device in DEVICES if device['type'] == 'rfid']
+        report_queue = ReportJobQueue(channels=reader_ids)
         
-        # Start image processing process
-        image_proc = mp.Process(
-            target=image_process,
-            args=(stop_event,),
-            daemon=True
-        )
-        image_proc.start()
+        # Start a process per RFID reader and camera, plus one detection process for all cameras
+        supervisor = Supervisor(DEVICES, stop_event, report_queue)
+        supervisor.start()
         
         # Start scheduler in main process
-        scheduler = setup_scheduler()
+        scheduler = setup_scheduler(report_queue=report_queue)
         scheduler.start()
         
         logger.info("Main application running - Press Ctrl+C to quit")
         
-        # Wait for processes to finish
-        while True:
-            if stop_event.is_set() or not rfid_proc.is_alive() or not image_proc.is_alive():
-                break
-            time.sleep(0.1)
+        # Restart crashed devices until stopped
+        supervisor.run()
             
     except KeyboardInterrupt:
         logger.info("Application terminated by user")
@@ -110,15 +43,9 @@ def main():
         # Cleanup
         stop_event.set()
         
-        # Wait for processes to finish
-        rfid_proc.join(timeout=2)
-        image_proc.join(timeout=2)
-        
-        # Force terminate if necessary
-        if rfid_proc.is_alive():
-            rfid_proc.terminate()
-        if image_proc.is_alive():
-            image_proc.terminate()
+        # Wait for processes to finish, force terminate if necessary
+        if supervisor:
+            supervisor.stop()
             
         if scheduler:
             scheduler.shutdown()
@@ -126,4 +53,4 @@ def main():
 if __name__ == "__main__":
     # Required for Windows support
     mp.freeze_support()
-    main() 
\ No newline at end of file
+    main()
@@ -1,7 +1,9 @@
 from app.rfid.service import MFRC522Service
+from init_db import init_db
 import sys
 
 def main():
+    init_db()
     service = MFRC522Service()
     
     try:
@@ -33,8 +35,7 @@ def main():
                 print("\nStarting card reader...")
                 print("Place card on reader to read (Ctrl+C to stop)")
                 try:
-                    while True:
-                        service.read_card()
+                    service.run()
                 except KeyboardInterrupt:
                     print("\nStopping card reader...")
                     
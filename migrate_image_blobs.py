@@ -0,0 +1,48 @@
+import argparse
+from sqlalchemy import inspect, text
+from app.common.db import Database
+from app.common.blob_store import BlobStore
+from app.models.image_record import ImageRecord
+
+def add_image_key_column(db):
+    """Adds image_records.image_key to databases created before the blob store"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('image_records')}
+    if 'image_key' in columns:
+        return
+    with db.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE image_records ADD COLUMN image_key VARCHAR(64)"))
+
+def migrate_image_blobs(batch_size=100, db=None, store=None):
+    """Moves inline image_data into the blob store and keeps only the key in the row"""
+    db = db or Database()
+    store = store or BlobStore()
+    add_image_key_column(db)
+
+    migrated = 0
+    while True:
+        with db.session_scope() as session:
+            rows = session.query(ImageRecord.id, ImageRecord.image_data).filter(
+                ImageRecord.image_data.isnot(None),
+                ImageRecord.image_key.is_(None)
+            ).order_by(ImageRecord.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            for record_id, image_data in rows:
+                key = store.put(bytes(image_data))
+                session.query(ImageRecord).filter(ImageRecord.id == record_id).update(
+                    {'image_key': key, 'image_data': None},
+                    synchronize_session=False
+                )
+
+        migrated += len(rows)
+        print(f"Migrated {migrated} images")
+
+    print(f"Migration finished: {migrated} images moved to {store.root}")
+    print("Run VACUUM FULL image_records to return the freed space to the OS")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move image blobs out of image_records")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    migrate_image_blobs(args.batch_size)
@@ -0,0 +1,89 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.request
+from app.config import (
+    MODEL_DIR, MODEL_MANIFEST_PATH, YOLO_RELEASE, YOLO_REPO_URL, YOLO_WEIGHTS_URL,
+    YOLO_HUB_REPO_DIR, YOLO_WEIGHTS_PATH, YOLO_WEIGHTS_SHA256, YOLO_ONNX_MODEL_PATH, YOLO_ONNX_SHA256
+)
+from app.common.files import atomic_write
+from app.image_processing.model_registry import ModelIntegrityError, ModelRegistry
+
+def download(url, path):
+    """Downloads url to path through a temporary file, so an interrupted download leaves nothing behind"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f, urllib.request.urlopen(url, timeout=60) as response:
+            shutil.copyfileobj(response, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    print(f"Downloaded {url} to {path}")
+
+def clone_repo(repo_dir, release=YOLO_RELEASE):
+    """Shallow clone of ultralytics/yolov5 at the pinned release, for the model classes and export.py"""
+    if repo_dir.is_dir():
+        print(f"yolov5 repo already present at {repo_dir}")
+        return
+    subprocess.run(
+        ["git", "clone", "--depth", "1", "--branch", release, f"{YOLO_REPO_URL}.git", str(repo_dir)],
+        check=True
+    )
+
+def export_onnx(repo_dir, weights_path, onnx_path):
+    """Exports the weights to ONNX with the release's own export.py"""
+    subprocess.run(
+        [sys.executable, str(repo_dir / "export.py"), "--weights", str(weights_path),
+         "--include", "onnx", "--dynamic"],
+        check=True
+    )
+    exported = weights_path.with_suffix('.onnx')
+    if exported != onnx_path:
+        os.replace(exported, onnx_path)
+    print(f"Exported {onnx_path}")
+
+def verify(registry, manifest, path, expected):
+    """Checks path against the expected or previously recorded digest and records it"""
+    expected = expected or manifest.get(path.name)
+    digest = registry.checksum(path)
+    if expected and digest != expected.lower():
+        raise ModelIntegrityError(f"Checksum mismatch for {path}: expected {expected}, got {digest}")
+    manifest[path.name] = digest
+    print(f"{digest}  {path.name}" + (" (verified)" if expected else " (recorded)"))
+
+def write_manifest(manifest, manifest_path):
+    """Writes the digests in sha256sum format, so `sha256sum -c` works in the model directory"""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(manifest_path, "".join(f"{digest}  {name}\n" for name, digest in sorted(manifest.items())))
+
+def provision_models(onnx=False, force=False):
+    """Installs the pinned yolov5 files into the model directory and verifies them"""
+    registry = ModelRegistry(manifest_path=MODEL_MANIFEST_PATH)
+    manifest = registry.manifest()
+
+    if force or not YOLO_WEIGHTS_PATH.is_file():
+        download(YOLO_WEIGHTS_URL, YOLO_WEIGHTS_PATH)
+    verify(registry, manifest, YOLO_WEIGHTS_PATH, YOLO_WEIGHTS_SHA256)
+    clone_repo(YOLO_HUB_REPO_DIR)
+
+    if onnx:
+        if force or not YOLO_ONNX_MODEL_PATH.is_file():
+            export_onnx(YOLO_HUB_REPO_DIR, YOLO_WEIGHTS_PATH, YOLO_ONNX_MODEL_PATH)
+            # Exports are not byte-identical, so a fresh export is recorded anew
+            manifest.pop(YOLO_ONNX_MODEL_PATH.name, None)
+        verify(registry, manifest, YOLO_ONNX_MODEL_PATH, YOLO_ONNX_SHA256)
+
+    write_manifest(manifest, MODEL_MANIFEST_PATH)
+    print(f"Models ready in {MODEL_DIR}, checksums in {MODEL_MANIFEST_PATH}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, verify and pin the YOLO model files")
+    parser.add_argument("--onnx", action="store_true", help="also export yolov5n to ONNX for YOLO_BACKEND=onnx")
+    parser.add_argument("--force", action="store_true", help="download and export again even if the files exist")
+    args = parser.parse_args()
+    provision_models(args.onnx, args.force)
@@ -0,0 +1,40 @@
+import importlib
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from app.common.db import Database
+
+# Raspberry Pi-only modules imported by app.rfid
+RFID_HARDWARE_MODULES = ('RPi', 'RPi.GPIO', 'mfrc522', 'rpi_lcd')
+
+def mock_rfid_hardware():
+    """
+    Registers mocks for the RFID hardware modules that cannot be imported on
+    this machine, so app.rfid can be imported. Tests still patch the GPIO and
+    LCD objects they drive.
+    """
+    for name in RFID_HARDWARE_MODULES:
+        try:
+            importlib.import_module(name)
+        except (ImportError, RuntimeError):
+            # RPi.GPIO raises RuntimeError when imported off a Raspberry Pi
+            sys.modules[name] = MagicMock()
+
+class SQLiteTestCase(unittest.TestCase):
+    """
+    Gives each test a temporary directory in self.tmp_dir and a database with
+    the full schema in self.db, a SQLite file in that directory unless
+    database_url() is overridden. Both are removed after the test.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.db = Database(self.database_url())
+        self.addCleanup(self.db.engine.dispose)
+        self.db.create_schema()
+
+    def database_url(self):
+        return f"sqlite:///{self.tmp_dir}/test.db"
@@ -1,6 +1,7 @@
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, MagicMock, patch
 import datetime
+import time
 from app.analytics.chatgpt_client import ChatGPTClient
 from app.analytics.report_generator import ReportGenerator
 from app.analytics.email_notifier import EmailNotifier
@@ -10,9 +11,9 @@ from app.models.rfid_record import RFIDRecord
 class TestAnalytics(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures"""
-        self.mock_db = Mock()
+        self.mock_db = MagicMock()
         self.mock_session = Mock()
-        self.mock_db.Session.return_value = self.mock_session
+        self.mock_db.session_scope.return_value.__enter__.return_value = self.mock_session
 
     def test_chatgpt_client_analysis(self):
         """Test ChatGPT client's analysis functionality"""
@@ -60,48 +61,40 @@ class TestAnalytics(unittest.TestCase):
         """Test report generator functionality"""
         # Create mock data
         mock_image_records = [
-            Mock(
-                timestamp=datetime.datetime(2024, 2, 13, 14, 0),
-                person_count=5,
-                id=1
-            ),
-            Mock(
-                timestamp=datetime.datetime(2024, 2, 13, 15, 0),
-                person_count=3,
-                id=2
-            )
+            (datetime.datetime(2024, 2, 13, 14, 0), 5),
+            (datetime.datetime(2024, 2, 13, 15, 0), 3)
         ]
         
         mock_rfid_records = [
-            Mock(
-                timestamp=datetime.datetime(2024, 2, 13, 14, 0),
-                card_id='12345',
-                is_entry=True,
-                id=1
-            ),
-            Mock(
-                timestamp=datetime.datetime(2024, 2, 13, 15, 0),
-                card_id='12345',
-                is_entry=False,
-                id=2
-            )
+            (datetime.datetime(2024, 2, 13, 14, 0), '12345', True),
+            (datetime.datetime(2024, 2, 13, 15, 0), '12345', False)
+        ]
+        mock_hourly = [
+            Mock(hour=datetime.datetime(2024, 2, 13, 14, 0), detections=1, total_persons=5,
+                 max_persons=5, entries=1, exits=0),
+            Mock(hour=datetime.datetime(2024, 2, 13, 15, 0), detections=1, total_persons=3,
+                 max_persons=3, entries=0, exits=1)
         ]
         
         # Setup mock query results
-        self.mock_session.query.return_value.filter.return_value.order_by.return_value.all.side_effect = [
+        filtered = self.mock_session.query.return_value.filter.return_value
+        filtered.order_by.return_value.all.side_effect = [
             mock_image_records,
             mock_rfid_records
         ]
+        filtered.scalar.return_value = 1
         
-        # Create ReportGenerator with mock database
-        generator = ReportGenerator()
-        generator.db = self.mock_db
+        # Create ReportGenerator with mock database and rollups
+        generator = ReportGenerator(db=self.mock_db)
+        generator.rollups = Mock()
+        generator.rollups.hourly.return_value = mock_hourly
         
         # Test image data retrieval
         image_data = generator._get_image_data(datetime.date(2024, 2, 13))
         self.assertEqual(image_data['total_detections'], 2)
         self.assertEqual(image_data['total_persons'], 8)
         self.assertEqual(image_data['average_persons'], 4.0)
+        self.assertEqual(image_data['hourly_stats'][14]['max_persons'], 5)
         
         # Test RFID data retrieval
         rfid_data = generator._get_rfid_data(datetime.date(2024, 2, 13))
@@ -109,6 +102,7 @@ class TestAnalytics(unittest.TestCase):
         self.assertEqual(rfid_data['unique_cards'], 1)
         self.assertEqual(rfid_data['total_entries'], 1)
         self.assertEqual(rfid_data['total_exits'], 1)
+        self.assertEqual(rfid_data['hourly_stats'][15]['exits'], 1)
 
     @patch('smtplib.SMTP')
     def test_email_notifier(self, mock_smtp):
@@ -143,6 +137,115 @@ class TestAnalytics(unittest.TestCase):
         call_args = mock_scheduler.return_value.add_job.call_args[1]
         self.assertEqual(call_args['id'], 'daily_report_job')
 
+    def test_report_periods(self):
+        """Test that the monthly report covers the previous calendar month"""
+        generator = ReportGenerator(db=self.mock_db)
+        self.assertEqual(generator.report_period('monthly', datetime.date(2024, 3, 1)),
+                         (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)))
+        self.assertEqual(generator.report_period('monthly', datetime.date(2024, 1, 15)),
+                         (datetime.date(2023, 12, 1), datetime.date(2023, 12, 31)))
+        self.assertEqual(generator.report_period('weekly', datetime.date(2024, 3, 1)),
+                         (datetime.date(2024, 2, 24), datetime.date(2024, 3, 1)))
+
+        class FirstOfMarch(datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return cls(2024, 3, 1, 22, 0)
+
+        generator.rollups = Mock()
+        generator.rollups.watermarks.return_value = {}
+        generator.cache = Mock()
+        generator.cache.get.return_value = None
+        generator.summaries = Mock()
+        generator.summaries.summaries.return_value = [
+            {'date': '2024-02-01', 'detections': 1, 'total_persons': 2, 'entries': 1, 'exits': 1}
+        ] * 58
+        self.mock_session.query.return_value.filter.return_value.scalar.return_value = 3
+        generator.chatgpt = Mock()
+        generator.chatgpt.analyze_usage_patterns.return_value = "<html>March</html>"
+
+        with patch('app.analytics.report_generator.datetime', FirstOfMarch):
+            generator.generate_report('monthly')
+
+        generator.summaries.summaries.assert_called_once_with(
+            datetime.date(2024, 1, 3), datetime.date(2024, 2, 29), datetime.date(2024, 3, 1)
+        )
+        data = generator.chatgpt.analyze_usage_patterns.call_args[0][0]
+        self.assertEqual((data['period_start'], data['period_end']), ('2024-02-01', '2024-02-29'))
+        self.assertEqual(data['image_data']['total_detections'], 29)
+
+    def test_report_template_matches_the_mode(self):
+        """Test that weekly and monthly reports are not titled or worded as daily ones"""
+        client = ChatGPTClient()
+        client._complete = Mock(return_value="<html>report</html>")
+        expected = {
+            'daily': ("<h1>Daily Office Usage Report</h1>", "office today?", "from the previous day"),
+            'weekly': ("<h1>Weekly Office Usage Report</h1>", "office this week?", "from the previous week"),
+            'monthly': ("<h1>Monthly Office Usage Report</h1>", "office last month?", "from the month before"),
+        }
+        for mode, phrases in expected.items():
+            client.analyze_usage_patterns({
+                'mode': mode, 'period_start': '2024-02-01', 'period_end': '2024-02-29',
+                'image_data': None, 'rfid_data': None, 'daily_summaries': []
+            })
+            template = client._complete.call_args.kwargs['messages'][1]['content']
+            for phrase in phrases:
+                self.assertIn(phrase, template)
+            if mode != 'daily':
+                self.assertNotIn("today", template)
+                self.assertNotIn("Daily", template)
+
+    def test_fallback_report_without_data(self):
+        """Test that a failure before any data was read still produces the fallback report"""
+        generator = ReportGenerator(db=self.mock_db)
+        generator.rollups = Mock()
+        generator.rollups.watermarks.return_value = {}
+        generator.cache = Mock()
+        generator.cache.get.return_value = None
+        generator.summaries = Mock()
+        generator.summaries.summaries.side_effect = RuntimeError("database unavailable")
+        generator.chatgpt = Mock()
+
+        report = generator.generate_report('weekly')
+        self.assertIn("No image processing data available.", report)
+        self.assertIn("No RFID data available.", report)
+        generator.chatgpt.analyze_usage_patterns.assert_not_called()
+
+    def test_report_worker_deduplicates_requests(self):
+        """Test that queued admin requests produce one report and report status back"""
+        from app.analytics.report_queue import ReportJobQueue, ReportWorker
+
+        job_queue = ReportJobQueue()
+        generator = Mock()
+        generator.generate_report.return_value = "<html>report</html>"
+        notifier = Mock()
+        worker = ReportWorker(job_queue, generator, notifier, dedup_seconds=60)
+
+        job_queue.submit("admin")
+        job_queue.submit("admin")
+        sent, statuses = self._process_until(worker, job_queue, 3)
+        self.assertEqual(sent, 1)
+        self.assertEqual(statuses, ['running', 'sent', 'duplicate'])
+
+        # A request inside the dedup window is answered without a new report
+        job_queue.submit("admin")
+        self.assertEqual(self._process_until(worker, job_queue, 1), (0, ['duplicate']))
+
+        generator.generate_report.assert_called_once_with('daily')
+        notifier.send_report.assert_called_once_with("<html>report</html>", 'daily')
+
+    def _process_until(self, worker, job_queue, count, timeout=5):
+        """Runs the worker until count status updates arrive, as the queue feeder thread delivers asynchronously"""
+        sent, statuses = 0, []
+        deadline = time.monotonic() + timeout
+        while len(statuses) < count and time.monotonic() < deadline:
+            sent += worker.process_pending()
+            status = job_queue.poll_status(timeout=0.05)
+            while status is not None:
+                statuses.append(status['status'])
+                status = job_queue.poll_status()
+        return sent, statuses
+
     def test_full_analytics_pipeline(self):
         """Test the entire analytics pipeline integration"""
         with patch('openai.ChatCompletion.create') as mock_openai, \
@@ -155,17 +258,19 @@ class TestAnalytics(unittest.TestCase):
             
             # Setup mock database records
             mock_records = [
-                Mock(
-                    timestamp=datetime.datetime.now(),
-                    person_count=5,
-                    id=1
-                )
+                (datetime.datetime.now(), 5)
             ]
-            self.mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = mock_records
+            filtered = self.mock_session.query.return_value.filter.return_value
+            filtered.order_by.return_value.all.return_value = mock_records
+            filtered.scalar.return_value = 0
             
             # Create and test ReportGenerator
             generator = ReportGenerator()
             generator.db = self.mock_db
+            generator.rollups = Mock()
+            generator.rollups.hourly.return_value = []
+            generator.summaries = Mock()
+            generator.summaries.summaries.return_value = []
             
             # Generate and send report
             report = generator.generate_daily_report()
@@ -0,0 +1,65 @@
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from app.common.blob_store import BlobStore
+from app.models.image_record import ImageRecord
+from migrate_image_blobs import migrate_image_blobs
+from tests.helpers import SQLiteTestCase
+
+class TestBlobStore(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = BlobStore(Path(self.tmp_dir) / "blobs")
+
+    def stored_files(self):
+        return sorted(path for path in self.store.root.rglob('*') if path.is_file())
+
+    def test_put_is_idempotent_and_sharded(self):
+        """Test that identical content is stored once under root/ab/cd/<key>"""
+        key = self.store.put(b"jpeg bytes")
+        self.assertEqual(key, BlobStore.key_for(b"jpeg bytes"))
+        self.assertEqual(self.store.put(b"jpeg bytes"), key)
+        self.assertEqual(self.stored_files(), [self.store.root / key[:2] / key[2:4] / key])
+        self.assertEqual(self.store.get(key), b"jpeg bytes")
+
+        with self.assertRaises(ValueError):
+            self.store.path_for("../../etc/passwd")
+
+    def test_failed_write_leaves_no_partial_blob(self):
+        """Test that a blob only appears through the final rename"""
+        with patch('app.common.files.os.replace', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.put(b"half written")
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(self.store.exists(BlobStore.key_for(b"half written")))
+
+    def test_iter_chunks_streams_the_blob(self):
+        """Test that chunked reads return the content in chunk_size pieces"""
+        data = bytes(range(256)) * 10
+        key = self.store.put(data)
+        chunks = list(self.store.iter_chunks(key, chunk_size=1000))
+        self.assertEqual([len(chunk) for chunk in chunks], [1000, 1000, 560])
+        self.assertEqual(b"".join(chunks), data)
+
+    def test_migration_moves_inline_images_to_the_store(self):
+        """Test that migrate_image_blobs.py empties image_data and keeps only the key"""
+        self.db.save_all([
+            ImageRecord(person_count=1, image_data=b"first"),
+            ImageRecord(person_count=2, image_data=b"second"),
+            ImageRecord(person_count=3, image_data=b"first"),
+            ImageRecord(person_count=0),
+        ])
+        migrate_image_blobs(batch_size=2, db=self.db, store=self.store)
+
+        with self.db.session_scope() as session:
+            rows = session.query(ImageRecord.image_key, ImageRecord.image_data).order_by(ImageRecord.id).all()
+        keys = [key for key, _ in rows]
+        self.assertEqual(keys, [BlobStore.key_for(b"first"), BlobStore.key_for(b"second"),
+                                BlobStore.key_for(b"first"), None])
+        self.assertTrue(all(image_data is None for _, image_data in rows))
+        self.assertEqual(self.store.get(keys[1]), b"second")
+        self.assertEqual(len(self.stored_files()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
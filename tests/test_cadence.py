@@ -0,0 +1,61 @@
+import multiprocessing as mp
+import unittest
+from app.image_processing.cadence import AdaptiveCadence
+
+class TestAdaptiveCadence(unittest.TestCase):
+    def setUp(self):
+        self.activity = mp.Value('d', 0.0)
+        self.cadence = AdaptiveCadence(
+            self.activity, base_interval=30, min_interval=5, max_interval=300, backoff=2, adaptive=True
+        )
+
+    def run_burst(self, now, count):
+        self.assertTrue(self.cadence.due(now))
+        self.cadence.burst_started(now)
+        self.cadence.observe(count)
+
+    def test_backs_off_on_stable_scene_and_reports_savings(self):
+        """Test that unchanged counts stretch the interval up to the maximum"""
+        now = 0
+        intervals = []
+        for _ in range(8):
+            self.run_burst(now, 2)
+            intervals.append(self.cadence.interval)
+            now = self.cadence.next_due
+        self.assertEqual(intervals, [60, 120, 240, 300, 300, 300, 300, 300])
+        self.assertFalse(self.cadence.due(now - 1))
+
+        savings = self.cadence.savings(now)
+        self.assertEqual(savings['bursts'], 8)
+        self.assertEqual(savings['fixed_cadence_bursts'], now // 30 + 1)
+        self.assertGreater(savings['bursts_saved'], 50)
+
+    def test_count_change_and_rfid_activity_shorten_interval(self):
+        """Test that a new count or a card tap brings the next burst forward"""
+        self.run_burst(0, 2)
+        self.run_burst(60, 2)
+        self.assertEqual(self.cadence.interval, 120)
+
+        self.run_burst(180, 3)
+        self.assertEqual(self.cadence.interval, 5)
+        self.assertEqual(self.cadence.next_due, 185)
+
+        self.run_burst(185, 3)
+        self.run_burst(195, 3)
+        self.assertFalse(self.cadence.due(200))
+        self.activity.value = 200.0
+        self.assertTrue(self.cadence.due(200))
+        self.assertEqual(self.cadence.interval, 5)
+
+    def test_fixed_cadence_when_not_adaptive(self):
+        """Test that adaptive mode off keeps the base interval"""
+        cadence = AdaptiveCadence(self.activity, base_interval=30, adaptive=False)
+        cadence.due(0)
+        cadence.burst_started(0)
+        cadence.observe(1)
+        cadence.observe(4)
+        self.assertEqual(cadence.next_due, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
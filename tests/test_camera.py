@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch
+from app.image_processing.camera import Camera
+
+class TestCameraInitialization(unittest.TestCase):
+    def setUp(self):
+        """Every capture fails to open"""
+        system = patch('app.image_processing.camera.platform.system', return_value='Linux')
+        video_capture = patch('app.image_processing.camera.cv2.VideoCapture')
+        system.start()
+        self.video_capture = video_capture.start()
+        self.addCleanup(patch.stopall)
+        self.video_capture.return_value.isOpened.return_value = False
+
+    def opened_indices(self):
+        return [call.args[0] for call in self.video_capture.call_args_list]
+
+    def test_configured_camera_does_not_fall_back_to_other_indices(self):
+        """Test that a camera from DEVICES fails instead of opening another device's camera"""
+        with self.assertRaises(RuntimeError):
+            Camera(2, scan_fallback=False)
+        self.assertEqual(self.opened_indices(), [2])
+
+    def test_default_camera_scans_other_indices(self):
+        """Test that a standalone camera still tries indices 1-4"""
+        with self.assertRaises(RuntimeError):
+            Camera(0)
+        self.assertEqual(self.opened_indices(), [0, 1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
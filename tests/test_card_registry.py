@@ -0,0 +1,87 @@
+import datetime
+import os
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from sqlalchemy.exc import OperationalError
+from app.models.rfid_card import RFIDCard
+from app.models.rfid_record import RFIDRecord  # Mapped by RFIDCard.records
+from app.rfid.card_registry import CardRegistry
+from tests.helpers import SQLiteTestCase
+
+class TestCardRegistry(SQLiteTestCase):
+    def setUp(self):
+        """Use a throwaway SQLite file and stamp, shared by two registries as if in two processes"""
+        super().setUp()
+        self.stamp_path = Path(self.tmp_dir) / "stamps" / "rfid_cards"
+        self.add_card('1001', "Ayse")
+
+    def add_card(self, card_id, name, is_admin=False):
+        self.db.save(RFIDCard(card_id=card_id, name=name, is_admin=is_admin,
+                              created_at=datetime.datetime.now()))
+
+    def test_lookups_are_served_from_memory(self):
+        """Test that known cards resolve, unknown cards are rejected and taps do not query"""
+        registry = CardRegistry(self.db, self.stamp_path)
+        registry.load()
+
+        with patch.object(self.db, 'query', wraps=self.db.query) as query:
+            self.assertEqual(registry.get('1001').name, "Ayse")
+            self.assertIsNone(registry.get('9999'))
+            self.assertIsNone(registry.get(''))
+            query.assert_not_called()
+        self.assertEqual(len(registry), 1)
+
+    def test_stamp_invalidates_other_registries(self):
+        """Test that a card added elsewhere is only seen after the stamp is touched"""
+        reader = CardRegistry(self.db, self.stamp_path)
+        admin = CardRegistry(self.db, self.stamp_path)
+        reader.load()
+
+        self.add_card('1002', "Mehmet", is_admin=True)
+        self.assertIsNone(reader.get('1002'))
+
+        admin.invalidate()
+        self.assertTrue(self.stamp_path.exists())
+        self.assertTrue(reader.get('1002').is_admin)
+        self.assertEqual(len(reader), 2)
+
+        # Removing a card right after is picked up the same way, whatever the mtime resolution
+        self.assertEqual(reader.get('1001').name, "Ayse")
+        with self.db.session_scope() as session:
+            session.query(RFIDCard).filter(RFIDCard.card_id == '1001').delete()
+        admin.invalidate()
+        self.assertIsNone(reader.get('1001'))
+
+
+    def test_stamp_counter_increases(self):
+        """Test that every invalidation writes the next counter value into the stamp"""
+        registry = CardRegistry(self.db, self.stamp_path)
+        stamps = []
+        for _ in range(3):
+            registry.invalidate()
+            stamps.append(self.stamp_path.read_text())
+        self.assertEqual([int(stamp.split()[0]) for stamp in stamps], [1, 2, 3])
+        self.assertEqual(len(set(stamps)), 3)
+        self.assertEqual(os.listdir(self.stamp_path.parent), [self.stamp_path.name])
+
+    def test_failed_reload_keeps_the_loaded_cards(self):
+        """Test that a reload failing after an invalidation serves the previous cards and is retried"""
+        reader = CardRegistry(self.db, self.stamp_path)
+        reader.load()
+        self.add_card('1002', "Mehmet")
+        CardRegistry(self.db, self.stamp_path).invalidate()
+
+        error = OperationalError("SELECT rfid_cards", {}, Exception("server closed the connection"))
+        with patch.object(self.db, 'query', side_effect=error):
+            self.assertEqual(reader.get('1001').name, "Ayse")
+            self.assertIsNone(reader.get('1002'))
+        self.assertEqual(reader.get('1002').name, "Mehmet")
+
+        # Without any cards loaded yet there is nothing to fall back to
+        with patch.object(self.db, 'query', side_effect=error):
+            with self.assertRaises(OperationalError):
+                CardRegistry(self.db, self.stamp_path).get('1001')
+
+if __name__ == '__main__':
+    unittest.main()
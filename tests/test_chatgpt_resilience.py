@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+from app.analytics.chatgpt_client import ChatGPTClient
+from app.analytics.report_generator import ReportGenerator
+from app.common.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+MESSAGES = [{"role": "user", "content": "report"}]
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with the next scripted behaviour of the server"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+        behaviour = self.server.script.pop(0) if self.server.script else 'stream'
+        if behaviour == 'error':
+            self._send_json(500, {"error": {"message": "upstream failure", "type": "server_error"}})
+        elif behaviour == 'hang':
+            time.sleep(2)
+            self._send_json(500, {"error": {"message": "too late", "type": "server_error"}})
+        elif behaviour == 'stream':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i, text in enumerate(("<html>", "report", "</html>")):
+                chunk = {
+                    "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-3.5-turbo",
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@patch('app.analytics.chatgpt_client.OPENAI_RETRY_BASE_DELAY', 0.01)
+class TestChatGPTResilience(unittest.TestCase):
+    def setUp(self):
+        """Serve the OpenAI API from a local stub"""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenAIHandler)
+        self.server.daemon_threads = True
+        self.server.script = []
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, **options):
+        return ChatGPTClient(base_url=self.base_url, **options)
+
+    def test_streamed_response_is_assembled(self):
+        """Test that streamed chunks are joined into the report"""
+        self.assertEqual(self.client()._complete(MESSAGES, 0.3, 100), "<html>report</html>")
+
+    def test_transient_errors_are_retried(self):
+        """Test that server errors are retried until the stream succeeds"""
+        self.server.script = ['error', 'error']
+        client = self.client(max_retries=3)
+        self.assertEqual(client._complete(MESSAGES, 0.3, 100), "<html>report</html>")
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(client.breaker.failures, 0)
+
+    def test_hanging_api_times_out_and_opens_circuit(self):
+        """Test that a hanging API costs at most the timeout and then is not called at all"""
+        self.server.script = ['hang'] * 4
+        client = self.client(timeout=0.2, deadline=1, max_retries=1)
+        client.breaker = CircuitBreaker('openai-test', failure_threshold=2, reset_seconds=60)
+
+        for _ in range(2):
+            start = time.monotonic()
+            with self.assertRaises(Exception):
+                client._complete(MESSAGES, 0.3, 100)
+            self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(self.server.requests, 4)
+
+        start = time.monotonic()
+        with self.assertRaises(CircuitOpenError):
+            client._complete(MESSAGES, 0.3, 100)
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(self.server.requests, 4)
+
+    def test_report_falls_back_while_circuit_is_open(self):
+        """Test that the report generator returns the fallback report without waiting on the API"""
+        generator = ReportGenerator(db=Mock())
+        generator.chatgpt = self.client()
+        generator.chatgpt.breaker = CircuitBreaker('openai-test', failure_threshold=1, reset_seconds=60)
+        generator.chatgpt.breaker.record_failure()
+        generator.rollups = Mock()
+        generator.rollups.watermarks.return_value = {}
+        generator.cache = Mock()
+        generator.cache.get.return_value = None
+        generator.summaries = Mock()
+        generator.summaries.summaries.return_value = []
+        image_data = {'total_detections': 2, 'total_persons': 5, 'average_persons': 2.5,
+                      'hourly_stats': {}, 'detailed_records': []}
+        rfid_data = {'total_events': 1, 'unique_cards': 1, 'total_entries': 1, 'total_exits': 0,
+                     'hourly_stats': {}, 'detailed_records': []}
+        generator._get_image_data = Mock(return_value=image_data)
+        generator._get_rfid_data = Mock(return_value=rfid_data)
+
+        report = generator.generate_daily_report()
+        self.assertIn("Total Detections: 2", report)
+        self.assertEqual(self.server.requests, 0)
+        generator.cache.put.assert_not_called()
+
+    def test_successful_trial_call_closes_circuit(self):
+        """Test that the first call after the reset period goes to the API and closes the circuit"""
+        client = self.client()
+        client.breaker = CircuitBreaker('openai-test', failure_threshold=1, reset_seconds=0.1)
+        client.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            client._complete(MESSAGES, 0.3, 100)
+
+        time.sleep(0.1)
+        self.assertEqual(client._complete(MESSAGES, 0.3, 100), "<html>report</html>")
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.server.requests, 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        """Drive the breaker's clock by hand"""
+        self.now = 1000.0
+        clock = patch('app.common.circuit_breaker.time', Mock(monotonic=lambda: self.now))
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=2, reset_seconds=60)
+        for _ in range(2):
+            self.breaker.record_failure()
+
+    def half_open(self):
+        """Waits out the reset period and takes the single trial call"""
+        self.assertFalse(self.breaker.allow_request())
+        self.now += 60
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only one trial call at a time
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_trial_success_closes_circuit(self):
+        """Test that a successful trial call closes the circuit and resets the failure count"""
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.half_open()
+        self.breaker.record_success()
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CircuitBreaker.CLOSED, 0))
+        self.assertTrue(self.breaker.allow_request())
+
+        # A single failure is below the threshold again
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_trial_failure_reopens_circuit(self):
+        """Test that a failed trial call opens the circuit for another full reset period"""
+        self.half_open()
+        self.now += 5
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.now += 59
+        self.assertFalse(self.breaker.allow_request())
+        self.now += 1
+        self.assertTrue(self.breaker.allow_request())
+
+
+if __name__ == '__main__':
+    unittest.main()
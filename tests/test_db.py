@@ -0,0 +1,44 @@
+import datetime
+import unittest
+from app.models.image_record import ImageRecord
+from tests.helpers import SQLiteTestCase
+
+class TestSessionScope(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.datetime.now()
+
+    def _count(self):
+        with self.db.session_scope() as session:
+            return session.query(ImageRecord).count()
+
+    def test_nested_scope_keeps_the_outer_session_open(self):
+        """Test that a helper using its own scope does not commit or close the caller's session"""
+        with self.db.session_scope() as outer:
+            record = ImageRecord(timestamp=self.now, person_count=1)
+            outer.add(record)
+            # save() opens a scope of its own inside the caller's
+            self.db.save(ImageRecord(timestamp=self.now, person_count=2))
+            self.assertIn(record, outer)
+            with self.db.session_scope() as inner:
+                self.assertIs(inner, outer)
+            outer.flush()
+            self.assertIsNotNone(record.id)
+        self.assertEqual(self._count(), 2)
+
+    def test_error_after_nested_scope_rolls_back_everything(self):
+        """Test that the outermost scope decides, so work done in nested scopes is not committed early"""
+        with self.assertRaises(ValueError):
+            with self.db.session_scope() as session:
+                self.db.save_all([ImageRecord(timestamp=self.now, person_count=i) for i in range(3)])
+                session.add(ImageRecord(timestamp=self.now, person_count=4))
+                raise ValueError("caller failed")
+        self.assertEqual(self._count(), 0)
+
+        # A new scope starts a fresh transaction afterwards
+        self.db.save(ImageRecord(timestamp=self.now, person_count=5))
+        self.assertEqual(self._count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
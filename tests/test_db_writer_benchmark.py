@@ -0,0 +1,88 @@
+import datetime
+import os
+import time
+import unittest
+from app.models.image_record import ImageRecord
+from tests.helpers import SQLiteTestCase
+
+RECORDS = int(os.getenv("BENCHMARK_WRITE_RECORDS", "2000"))
+# Timings vary too much on shared CI runners, so the speed comparison is opt-in
+ASSERT_TIMINGS = os.getenv("BENCHMARK_ASSERT_TIMINGS")
+
+class TestBufferedWriterBenchmark(SQLiteTestCase):
+    def setUp(self):
+        """Start from an empty image table, also when BENCHMARK_DATABASE_URL points at a real server"""
+        super().setUp()
+        ImageRecord.__table__.drop(self.db.engine, checkfirst=True)
+        self.db.create_schema()
+        self.addCleanup(ImageRecord.__table__.drop, self.db.engine, checkfirst=True)
+
+    def database_url(self):
+        return os.getenv("BENCHMARK_DATABASE_URL") or super().database_url()
+
+    def _records(self):
+        now = datetime.datetime.now()
+        return [ImageRecord(timestamp=now, person_count=i % 7) for i in range(RECORDS)]
+
+    def _count(self):
+        with self.db.session_scope() as session:
+            return session.query(ImageRecord).count()
+
+    def test_buffered_writes_are_faster_and_durable(self):
+        """Compare per-record saves with the buffered writer and check nothing is lost on close"""
+        start = time.perf_counter()
+        for record in self._records():
+            self.db.save(record)
+        single_seconds = time.perf_counter() - start
+
+        writer = self.db.buffered_writer(batch_size=200, flush_interval=60)
+        start = time.perf_counter()
+        for record in self._records():
+            writer.add(record)
+        writer.close()
+        buffered_seconds = time.perf_counter() - start
+
+        print(f"\n{RECORDS} records: save() {RECORDS / single_seconds:.0f} rec/s, "
+              f"buffered {RECORDS / buffered_seconds:.0f} rec/s")
+
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self._count(), 2 * RECORDS)
+        if ASSERT_TIMINGS:
+            self.assertLess(buffered_seconds, single_seconds)
+
+    def test_pending_records_survive_failed_flush(self):
+        """Test that a failed flush keeps the batch and a later flush writes it"""
+        writer = self.db.buffered_writer(batch_size=1000, flush_interval=60)
+        for record in self._records()[:10]:
+            writer.add(record)
+        self.assertEqual(writer.pending, 10)
+
+        ImageRecord.__table__.drop(self.db.engine)
+        with self.assertRaises(Exception):
+            writer.flush()
+        self.assertEqual(writer.pending, 10)
+
+        self.db.create_schema()
+        writer.close()
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self._count(), 10)
+
+    def test_bad_record_is_dropped_without_blocking_the_batch(self):
+        """Test that a record the database rejects is dropped and the rest of the batch is written"""
+        writer = self.db.buffered_writer(batch_size=1000, flush_interval=60)
+        records = self._records()[:5]
+        records[2].person_count = None
+        for record in records:
+            writer.add(record)
+
+        self.assertEqual(writer.flush(), 4)
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self._count(), 4)
+
+        writer.add(self._records()[0])
+        writer.close()
+        self.assertEqual(self._count(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
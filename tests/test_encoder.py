@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from app.common.metrics import get_metrics
+from app.image_processing.encoder import FrameEncoder
+
+def gradient_frame(height=480, width=640):
+    """A gradient frame, so the encoded size depends on the quality"""
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    frame = np.repeat(row[np.newaxis, :, np.newaxis], 3, axis=2).repeat(height, axis=0)
+    frame[::7, ::5] = 255
+    return frame
+
+def decode(data):
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+class TestFrameEncoder(unittest.TestCase):
+    def test_wide_frames_are_downscaled_to_max_width(self):
+        """Test that frames wider than max_width keep their aspect ratio and narrower ones their size"""
+        encoder = FrameEncoder('jpeg', quality=80, max_width=320)
+        self.assertEqual(decode(encoder.encode(gradient_frame())).shape, (240, 320, 3))
+        self.assertEqual(decode(encoder.encode(gradient_frame(120, 160))).shape, (120, 160, 3))
+
+    def test_quality_is_passed_to_imencode(self):
+        """Test that the configured quality reaches cv2.imencode with the format's flag"""
+        encoder = FrameEncoder('jpeg', quality=42, max_width=640)
+        with patch('app.image_processing.encoder.cv2.imencode', wraps=cv2.imencode) as imencode:
+            encoder.encode(gradient_frame())
+        extension, _, params = imencode.call_args.args
+        self.assertEqual((extension, params), ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 42]))
+
+        low = FrameEncoder('jpeg', quality=10, max_width=640).encode(gradient_frame())
+        high = FrameEncoder('jpeg', quality=95, max_width=640).encode(gradient_frame())
+        self.assertLess(len(low), len(high))
+
+    def test_missing_writer_falls_back_to_jpeg(self):
+        """Test that a format the OpenCV build cannot write is stored as JPEG"""
+        with patch('app.image_processing.encoder.cv2.haveImageWriter', return_value=False):
+            encoder = FrameEncoder('webp', quality=60, max_width=640)
+        self.assertEqual((encoder.format, encoder.extension), ('jpeg', '.jpg'))
+        self.assertEqual(encoder.params, [cv2.IMWRITE_JPEG_QUALITY, 60])
+        self.assertEqual(encoder.encode(gradient_frame())[:2], b"\xff\xd8")
+
+        with self.assertRaises(ValueError):
+            FrameEncoder('gif')
+
+    def test_failed_encode_raises(self):
+        """Test that an encoder error is not stored as an empty image"""
+        encoder = FrameEncoder('jpeg', quality=80, max_width=640)
+        with patch('app.image_processing.encoder.cv2.imencode', return_value=(False, None)):
+            with self.assertRaises(RuntimeError):
+                encoder.encode(gradient_frame())
+
+    def test_size_and_time_metrics_are_recorded(self):
+        """Test that every encode records one encoder.bytes_per_sample and encoder.encode_ms sample"""
+        def samples(name):
+            return get_metrics().snapshot()['observations'].get(name, {'count': 0})
+
+        before = {name: samples(name)['count'] for name in ("encoder.bytes_per_sample", "encoder.encode_ms")}
+        data = FrameEncoder('jpeg', quality=80, max_width=640).encode(gradient_frame())
+
+        size = samples("encoder.bytes_per_sample")
+        timing = samples("encoder.encode_ms")
+        self.assertEqual(size['count'], before["encoder.bytes_per_sample"] + 1)
+        self.assertEqual(size['last'], len(data))
+        self.assertEqual(timing['count'], before["encoder.encode_ms"] + 1)
+        self.assertGreater(timing['last'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import datetime
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from tests.helpers import mock_rfid_hardware
+
+mock_rfid_hardware()
+
+from app.common.db import Database
+from app.config import RFID_CARD_COOLDOWN, RFID_FEEDBACK_SECONDS
+from app.rfid.feedback import FeedbackDisplay
+from app.rfid.presence import PresenceStore
+from app.rfid.service import MFRC522Service
+
+LED_PIN = 18
+
+class FeedbackTestCase(unittest.TestCase):
+    def setUp(self):
+        """Record LCD lines and LED levels, and drive the display's clock by hand"""
+        self.now = 1000.0
+        self.gpio = Mock(HIGH=1, LOW=0)
+        for patcher in (patch('app.rfid.feedback.GPIO', self.gpio),
+                        patch('app.rfid.feedback.time.monotonic', side_effect=lambda: self.now)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.lcd = Mock()
+
+    def screen(self):
+        """The two lines last written to the LCD and whether the LED is on"""
+        line1, line2 = [call.args[0] for call in self.lcd.text.call_args_list[-2:]]
+        led = self.gpio.output.call_args.args[1] == self.gpio.HIGH
+        return line1, line2, led
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class TestFeedbackDisplay(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.display = FeedbackDisplay(self.lcd, LED_PIN)
+
+    def test_message_returns_to_idle_after_its_duration(self):
+        """Test that a message stays up until its deadline and tick() then restores the prompt"""
+        self.assertEqual(self.screen(), (*FeedbackDisplay.IDLE_LINES, False))
+        self.assertFalse(self.display.busy)
+
+        self.display.show("Welcome", "Ayse", 3, led=True)
+        self.assertEqual(self.screen(), ("Welcome", "Ayse", True))
+        self.gpio.output.assert_called_with(LED_PIN, self.gpio.HIGH)
+
+        self.advance(2.9)
+        self.display.tick()
+        self.assertEqual(self.screen(), ("Welcome", "Ayse", True))
+        self.assertTrue(self.display.busy)
+
+        self.advance(0.1)
+        self.display.tick()
+        self.assertEqual(self.screen(), (*FeedbackDisplay.IDLE_LINES, False))
+        self.assertFalse(self.display.busy)
+
+    def test_show_replaces_the_current_and_pending_messages(self):
+        """Test that show() takes over at once and drops whatever was queued behind the old message"""
+        self.display.show("Welcome", "Ayse", 3, led=True)
+        self.display.queue("Report", "requested", 2)
+
+        self.advance(1)
+        self.display.show("Goodbye", "Mehmet", 3, led=True, then=[("Report sent", "successfully!", 2, False)])
+        self.assertEqual(self.screen(), ("Goodbye", "Mehmet", True))
+
+        # The new message gets its full duration, counted from when it was shown
+        self.advance(2.5)
+        self.display.tick()
+        self.assertEqual(self.screen(), ("Goodbye", "Mehmet", True))
+
+        self.advance(0.5)
+        self.display.tick()
+        self.assertEqual(self.screen(), ("Report sent", "successfully!", False))
+
+        self.advance(2)
+        self.display.tick()
+        self.assertEqual(self.screen(), (*FeedbackDisplay.IDLE_LINES, False))
+
+    def test_queue_waits_for_the_current_message(self):
+        """Test that queued messages follow each other in order, and show at once when idle"""
+        self.display.queue("Report", "requested", 2)
+        self.assertEqual(self.screen(), ("Report", "requested", False))
+
+        self.display.queue("Generating", "report...", 2)
+        self.display.queue("Report sent", "successfully!", 2)
+        self.assertEqual(self.screen(), ("Report", "requested", False))
+
+        shown = []
+        for _ in range(3):
+            self.advance(2)
+            self.display.tick()
+            shown.append(self.screen()[0])
+        self.assertEqual(shown, ["Generating", "Report sent", FeedbackDisplay.IDLE_LINES[0]])
+
+    def test_lcd_error_does_not_stop_the_state_machine(self):
+        """Test that a failing LCD write is logged and the message still expires"""
+        self.lcd.text.side_effect = OSError("I2C bus error")
+        self.display.show("Welcome", "Ayse", 3)
+        self.assertTrue(self.display.busy)
+        self.advance(3)
+        self.display.tick()
+        self.assertFalse(self.display.busy)
+
+class TestReaderFeedback(FeedbackTestCase):
+    def setUp(self):
+        """A reader service on mocked hardware, registry and storage, built without its __init__"""
+        super().setUp()
+        self.cards = {
+            '1001': SimpleNamespace(name="Ayse", is_admin=False),
+            '1002': SimpleNamespace(name="Mehmet", is_admin=False),
+        }
+        self.service = MFRC522Service.__new__(MFRC522Service)
+        self.service.device_id = 'reader-1'
+        self.service.activity = None
+        self.service.reader = Mock()
+        self.service.reader.read_no_block.return_value = (None, None)
+        self.service.cards = Mock()
+        self.service.cards.get.side_effect = self.cards.get
+        self.service.presence = PresenceStore(Mock())
+        self.service.writer = Mock()
+        self.service.report_queue = Mock()
+        self.service.report_queue.poll_status.return_value = None
+        self.service.display = FeedbackDisplay(self.lcd, LED_PIN)
+
+    def poll(self, card_id=None):
+        """One reader loop iteration, with card_id on the reader if given"""
+        if card_id is None:
+            self.service.reader.read_no_block.return_value = (None, None)
+        else:
+            name = self.cards[card_id].name
+            self.service.reader.read_no_block.return_value = (int(card_id), f"{name},{card_id},U")
+        return self.service.read_card()
+
+    def test_second_card_replaces_the_first_greeting(self):
+        """Test that a different card tapped within RFID_FEEDBACK_SECONDS is greeted at once"""
+        with patch.object(PresenceStore, 'record_tap', return_value=True):
+            self.assertEqual(self.poll('1001'), '1001')
+            self.assertEqual(self.screen(), ("Welcome", "Ayse", True))
+
+            self.advance(RFID_FEEDBACK_SECONDS / 3)
+            self.assertEqual(self.poll('1002'), '1002')
+            self.assertEqual(self.screen(), ("Welcome", "Mehmet", True))
+
+        # The second greeting keeps its full duration instead of the first one's remainder
+        self.advance(RFID_FEEDBACK_SECONDS * 2 / 3)
+        self.poll()
+        self.assertEqual(self.screen(), ("Welcome", "Mehmet", True))
+
+        self.advance(RFID_FEEDBACK_SECONDS / 3)
+        self.poll()
+        self.assertEqual(self.screen(), (*FeedbackDisplay.IDLE_LINES, False))
+        self.assertEqual([call.args[0].card_id for call in self.service.writer.add.call_args_list],
+                         ['1001', '1002'])
+
+    def test_repeat_read_keeps_the_greeting(self):
+        """Test that the same card left on the reader does not restart or change the message"""
+        with patch.object(PresenceStore, 'record_tap', side_effect=[True, None]):
+            self.assertEqual(self.poll('1001'), '1001')
+            self.advance(1)
+            self.assertIsNone(self.poll('1001'))
+        self.assertEqual(self.screen(), ("Welcome", "Ayse", True))
+        self.advance(RFID_FEEDBACK_SECONDS - 1)
+        self.poll()
+        self.assertEqual(self.screen(), (*FeedbackDisplay.IDLE_LINES, False))
+
+
+    def test_tap_is_accepted_while_the_database_is_unreachable(self):
+        """Test that a failing presence update still greets the card and queues its record"""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        db = Database(f"sqlite:///{tmp_dir}/missing/rfid.db")
+        self.addCleanup(db.engine.dispose)
+        self.service.presence = PresenceStore(db)
+        with patch('app.rfid.service.datetime') as clock:
+            clock.now.return_value = datetime.datetime(2024, 2, 13, 9, 0)
+            self.assertEqual(self.poll('1001'), '1001')
+            self.assertEqual(self.screen(), ("Welcome", "Ayse", True))
+            self.advance(RFID_FEEDBACK_SECONDS)
+            self.poll()
+            clock.now.return_value += datetime.timedelta(seconds=RFID_CARD_COOLDOWN + RFID_FEEDBACK_SECONDS)
+            self.assertEqual(self.poll('1001'), '1001')
+            self.assertEqual(self.screen(), ("Goodbye", "Ayse", True))
+        records = [call.args[0] for call in self.service.writer.add.call_args_list]
+        self.assertEqual([(record.card_id, record.is_entry) for record in records],
+                         [('1001', True), ('1001', False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
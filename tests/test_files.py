@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from app.common.files import atomic_write, check_hex_key
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_replaces_the_file_with_bytes_or_text(self):
+        """Test that bytes are written as is, text as UTF-8, and no temporary file is left behind"""
+        path = self.tmp_dir / "entry"
+        atomic_write(path, b"\x00\xff")
+        self.assertEqual(path.read_bytes(), b"\x00\xff")
+        atomic_write(path, "Ayşe")
+        self.assertEqual(path.read_bytes(), "Ayşe".encode('utf-8'))
+        self.assertEqual(os.listdir(self.tmp_dir), ["entry"])
+
+    def test_failed_write_keeps_the_old_file(self):
+        """Test that a failure before the rename leaves the old content and removes the temporary file"""
+        path = self.tmp_dir / "entry"
+        path.write_text("old")
+        with patch('app.common.files.os.replace', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                atomic_write(path, "new")
+        self.assertEqual(path.read_text(), "old")
+        self.assertEqual(os.listdir(self.tmp_dir), ["entry"])
+
+class TestCheckHexKey(unittest.TestCase):
+    def test_only_sha256_hex_digests_are_accepted(self):
+        key = "ab" * 32
+        self.assertEqual(check_hex_key(key), key)
+        for bad in ("AB" * 32, "ab" * 31, "../" + "a" * 61, "g" * 64):
+            with self.assertRaises(ValueError):
+                check_hex_key(bad, "blob key")
+
+
+if __name__ == '__main__':
+    unittest.main()
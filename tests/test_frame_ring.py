@@ -0,0 +1,111 @@
+import multiprocessing as mp
+import unittest
+import numpy as np
+from app.image_processing.frame_ring import FrameRing, RingFrameSource, capture_into_ring
+
+SHAPE = (4, 6, 3)
+
+def write_frames(name, count):
+    """Child process: attaches by name and writes count frames filled with their sequence number"""
+    ring = FrameRing.attach(name)
+    try:
+        # The consumer's reset request is visible across processes
+        if not ring.take_reset_request():
+            raise SystemExit(2)
+        for _ in range(count):
+            seq, slot = ring.begin_write()
+            slot[:] = seq
+            ring.commit(seq)
+    finally:
+        ring.close()
+
+class FakeCamera:
+    """Fills each slot with the number of frames read so far and stops the loop after limit frames"""
+
+    def __init__(self, stop_event, limit):
+        self.stop_event = stop_event
+        self.limit = limit
+        self.reads = 0
+
+    def read_frame(self, out):
+        self.reads += 1
+        out[:] = self.reads
+        if self.reads == self.limit:
+            self.stop_event.set()
+
+class TestFrameRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = FrameRing.create(slots=3, shape=SHAPE)
+
+    def tearDown(self):
+        self.ring.unlink()
+
+    def write(self, value):
+        seq, slot = self.ring.begin_write()
+        slot[:] = value
+        self.ring.commit(seq)
+        return seq
+
+    def test_write_latest_and_overwrite(self):
+        """Test that latest() returns the newest frame and wrapped slots are no longer current"""
+        self.assertEqual(self.ring.latest(), (0, None))
+        self.assertFalse(self.ring.is_current(0))
+
+        first = self.write(10)
+        seq, view = self.ring.latest()
+        self.assertEqual(seq, first)
+        self.assertEqual(view.shape, SHAPE)
+        self.assertTrue((view == 10).all())
+        self.assertTrue(self.ring.is_current(first))
+
+        for value in (11, 12):
+            self.write(value)
+        self.assertTrue(self.ring.is_current(first))
+
+        # The fourth frame reuses the first frame's slot, so its view now shows the new frame
+        fourth = self.write(13)
+        self.assertFalse(self.ring.is_current(first))
+        self.assertTrue(self.ring.is_current(fourth))
+        self.assertTrue((view == 13).all())
+
+    def test_slot_being_written_is_not_current(self):
+        """Test that a consumer never treats a half-written slot as a valid frame"""
+        first = self.write(1)
+        for value in (2, 3):
+            self.write(value)
+        seq, slot = self.ring.begin_write()
+        self.assertEqual(seq % 3, first % 3)
+        self.assertFalse(self.ring.is_current(first))
+        self.assertFalse(self.ring.is_current(seq))
+        self.ring.commit(seq)
+        self.assertTrue(self.ring.is_current(seq))
+
+    def test_child_process_attaches_by_name(self):
+        """Test that frames written by another process are read through the shared slots"""
+        RingFrameSource(self.ring).request_reset()
+        writer = mp.Process(target=write_frames, args=(self.ring.name, 5))
+        writer.start()
+        writer.join(timeout=10)
+        self.assertEqual(writer.exitcode, 0)
+
+        seq, view = self.ring.latest()
+        self.assertEqual(seq, 5)
+        self.assertTrue((view == 5).all())
+        self.assertFalse(self.ring.is_current(2))
+        self.assertEqual([int(self.ring.frames[s % 3][0, 0, 0]) for s in (3, 4, 5)], [3, 4, 5])
+        self.assertFalse(self.ring.take_reset_request())
+
+    def test_capture_loop_fills_the_ring(self):
+        """Test that capture_into_ring reads camera frames straight into the slots"""
+        stop_event = mp.Event()
+        camera = FakeCamera(stop_event, limit=4)
+        capture_into_ring(camera, self.ring, stop_event, fps=1000)
+
+        seq, view = self.ring.latest()
+        self.assertEqual(seq, 4)
+        self.assertTrue((view == 4).all())
+        self.assertTrue(np.array_equal(self.ring.frames[1], np.full(SHAPE, 4, dtype=np.uint8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
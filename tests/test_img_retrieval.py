@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 from sqlalchemy.orm import sessionmaker
 from app.common.db import Database
+from app.common.blob_store import BlobStore
 from app.models.image_record import ImageRecord
 
 class TestImageRetrieval(unittest.TestCase):
@@ -10,6 +11,7 @@ class TestImageRetrieval(unittest.TestCase):
         """Set up the database connection."""
         self.db = Database()
         self.session = self.db.Session()
+        self.store = BlobStore()
 
     def retrieve_image(self, image_id=None):
         """Retrieve an image by ID or get the latest if no ID is provided."""
@@ -23,13 +25,20 @@ class TestImageRetrieval(unittest.TestCase):
         result = query.first()
         return result
 
+    def read_image_data(self, record):
+        """Stream the image bytes from the blob store, falling back to legacy inline data."""
+        if record.image_key:
+            with self.store.open(record.image_key) as f:
+                return f.read()
+        return record.image_data
+
     def test_retrieve_specific_image(self):
         """Test if a specific image can be retrieved by ID."""
         image_id = 754 # change it according to img you want to retrieve
         result = self.retrieve_image(image_id)
 
         self.assertIsNotNone(result, f"No image found with ID {image_id}.")
-        image_data = result.image_data
+        image_data = self.read_image_data(result)
         
         # Convert binary data to a NumPy array
         image_array = np.frombuffer(image_data, dtype=np.uint8)
@@ -47,7 +56,7 @@ class TestImageRetrieval(unittest.TestCase):
         result = self.retrieve_image()  # No ID, so fetch latest
         
         self.assertIsNotNone(result, "No image found in the database.")
-        image_data = result.image_data
+        image_data = self.read_image_data(result)
         
         # Convert binary data to a NumPy array
         image_array = np.frombuffer(image_data, dtype=np.uint8)
@@ -0,0 +1,99 @@
+import os
+import time
+import unittest
+from sqlalchemy import create_engine, text
+from app.common.db import Base
+from app.models.image_record import ImageRecord
+from app.models.rfid_record import RFIDRecord
+
+# Point this at a scratch PostgreSQL database: the benchmark drops and recreates the record tables
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL")
+SEED_ROWS = int(os.getenv("BENCHMARK_SEED_ROWS", "1000000"))
+REPEATS = 5
+
+DAILY_RANGE_QUERIES = {
+    'image_records daily range': text(
+        "SELECT timestamp, person_count FROM image_records "
+        "WHERE timestamp >= :start AND timestamp < :start + interval '1 day' ORDER BY timestamp"
+    ),
+    'rfid_records daily range': text(
+        "SELECT timestamp, card_id, is_entry FROM rfid_records "
+        "WHERE timestamp >= :start AND timestamp < :start + interval '1 day' ORDER BY timestamp"
+    ),
+}
+CARD_HISTORY_QUERY = text(
+    "SELECT timestamp, is_entry FROM rfid_records "
+    "WHERE card_id = :card_id ORDER BY timestamp DESC LIMIT 50"
+)
+
+
+@unittest.skipUnless(BENCHMARK_DATABASE_URL, "BENCHMARK_DATABASE_URL not set")
+class TestIndexBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine(BENCHMARK_DATABASE_URL)
+        tables = [ImageRecord.__table__, RFIDRecord.__table__]
+        Base.metadata.drop_all(cls.engine, tables=tables)
+        Base.metadata.create_all(cls.engine, tables=tables)
+
+        # One row every 30 seconds going back from now, like the capture cadence
+        with cls.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO image_records (timestamp, person_count) "
+                "SELECT now() - i * interval '30 seconds', i % 7 FROM generate_series(:rows, 1, -1) i"
+            ), {'rows': SEED_ROWS})
+            conn.execute(text(
+                "INSERT INTO rfid_records (card_id, timestamp, is_entry) "
+                "SELECT 'card-' || (i % 500), now() - i * interval '30 seconds', i % 2 = 0 "
+                "FROM generate_series(:rows, 1, -1) i"
+            ), {'rows': SEED_ROWS})
+
+    @classmethod
+    def tearDownClass(cls):
+        Base.metadata.drop_all(cls.engine, tables=[ImageRecord.__table__, RFIDRecord.__table__])
+        cls.engine.dispose()
+
+    def _set_indexes(self, enabled):
+        for table in (ImageRecord.__table__, RFIDRecord.__table__):
+            for index in table.indexes:
+                index.drop(self.engine, checkfirst=True)
+                if enabled:
+                    index.create(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("ANALYZE image_records"))
+            conn.execute(text("ANALYZE rfid_records"))
+
+    def _best_latency(self, query, params):
+        best = float('inf')
+        with self.engine.connect() as conn:
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                conn.execute(query, params).fetchall()
+                best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def _measure(self):
+        with self.engine.connect() as conn:
+            start = conn.execute(text("SELECT date_trunc('day', now() - interval '3 days')")).scalar()
+        results = {name: self._best_latency(query, {'start': start})
+                   for name, query in DAILY_RANGE_QUERIES.items()}
+        results['rfid_records card history'] = self._best_latency(CARD_HISTORY_QUERY, {'card_id': 'card-42'})
+        return results
+
+    def test_indexes_reduce_query_latency(self):
+        """Compare report and card history query latency with and without the model indexes"""
+        self._set_indexes(False)
+        without_indexes = self._measure()
+        self._set_indexes(True)
+        with_indexes = self._measure()
+
+        print(f"\nQuery latency over {SEED_ROWS} rows per table (best of {REPEATS}):")
+        for name in without_indexes:
+            print(f"  {name}: {without_indexes[name]:.1f} ms -> {with_indexes[name]:.1f} ms")
+
+        for name in without_indexes:
+            self.assertLess(with_indexes[name], without_indexes[name], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
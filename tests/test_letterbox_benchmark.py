@@ -0,0 +1,155 @@
+import os
+import time
+import tracemalloc
+import unittest
+import cv2
+import numpy as np
+from app.image_processing.yolo_inference import (
+    InferenceBackend, YOLODetector, MODEL_INPUT_SIZE, PERSON_CLASS_ID
+)
+from app.config import YOLO_CONFIDENCE_THRESHOLD
+
+ITERATIONS = int(os.getenv("BENCHMARK_LETTERBOX_ITERATIONS", "50"))
+BURST_SIZE = 5
+TRUE_BOX = (100, 150, 300, 400)  # x1, y1, x2, y2 of the bright "person" in a 640x480 frame
+
+class BrightRegionBackend(InferenceBackend):
+    """Stands in for the model: reports the bright rectangle of each input image as a person"""
+    name = "bright-region"
+
+    def infer(self, images):
+        detections = []
+        for image in images:
+            ys, xs = np.nonzero(image[:, :, 0] > 200)
+            detections.append(np.array(
+                [[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, PERSON_CLASS_ID]], dtype=np.float32
+            ))
+        return detections
+
+class CannedBackend(InferenceBackend):
+    """Stands in for the model: returns the same detections for every input image"""
+    name = "canned"
+
+    def __init__(self, detections):
+        self.detections = detections
+
+    def infer(self, images):
+        return [self.detections] * len(images)
+
+def stretch_detect(backend, frames):
+    """The previous path: stretch to 640x640 and filter detections in a Python loop"""
+    resized_frames = [cv2.resize(frame, (MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)) for frame in frames]
+    batch_boxes = []
+    for detections in backend.infer(resized_frames):
+        person_boxes = []
+        for *box, score, cls in detections:
+            if int(cls) == PERSON_CLASS_ID and score > YOLO_CONFIDENCE_THRESHOLD:
+                person_boxes.append(box)
+        batch_boxes.append(person_boxes)
+    return batch_boxes
+
+def iou(a, b):
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+class TestLetterboxBenchmark(unittest.TestCase):
+    def setUp(self):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        x1, y1, x2, y2 = TRUE_BOX
+        frame[y1:y2, x1:x2] = 255
+        self.frames = [frame.copy() for _ in range(BURST_SIZE)]
+        self.backend = BrightRegionBackend()
+        self.detector = YOLODetector(backend=self.backend, warmup_runs=0)
+
+    def _measure(self, detect, preprocess):
+        """Returns the boxes, seconds per burst and peak bytes allocated by preprocessing"""
+        detect(self.frames)
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            batch_boxes = detect(self.frames)
+        seconds = (time.perf_counter() - start) / ITERATIONS
+        tracemalloc.start()
+        preprocess(self.frames)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return batch_boxes, seconds, peak
+
+    def test_letterbox_is_accurate_and_allocation_free(self):
+        """Compare box accuracy, latency and allocations of the stretch and letterbox paths"""
+        old_boxes, old_seconds, old_peak = self._measure(
+            lambda frames: stretch_detect(self.backend, frames),
+            lambda frames: [cv2.resize(frame, (MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)) for frame in frames]
+        )
+        new_boxes, new_seconds, new_peak = self._measure(
+            self.detector.detect_persons_batch, self.detector.letterbox
+        )
+
+        old_iou = iou(old_boxes[0][0], TRUE_BOX)
+        new_iou = iou(new_boxes[0][0], TRUE_BOX)
+        print(f"\nburst of {BURST_SIZE}: stretch {old_seconds * 1000:.2f} ms, IoU {old_iou:.2f}, "
+              f"preprocessing allocates {old_peak / 1e6:.2f} MB; letterbox {new_seconds * 1000:.2f} ms, "
+              f"IoU {new_iou:.2f}, preprocessing allocates {new_peak / 1e6:.2f} MB")
+
+        # Stretched boxes land in 640x640 space and miss the person on the 640x480 frame
+        self.assertLess(old_iou, 0.8)
+        self.assertGreater(new_iou, 0.98)
+        for boxes in new_boxes:
+            self.assertEqual(boxes.shape, (1, 5))
+            self.assertEqual(boxes.dtype, np.float32)
+            self.assertTrue(boxes.flags['C_CONTIGUOUS'])
+            np.testing.assert_allclose(boxes[0, :4], TRUE_BOX, atol=1)
+
+        # The input buffer is reused, only the stretch path allocates a 640x640 image per frame
+        self.assertGreaterEqual(old_peak, BURST_SIZE * MODEL_INPUT_SIZE * MODEL_INPUT_SIZE * 3)
+        self.assertLess(new_peak, 64 * 1024)
+
+    def test_boxes_map_back_for_other_frame_sizes(self):
+        """Test that a 1280x720 frame is padded vertically and its boxes scaled back"""
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        frame[200:600, 400:800] = 255
+        boxes = self.detector.detect_persons(frame)
+        np.testing.assert_allclose(boxes[0, :4], (400, 200, 800, 600), atol=2)
+
+    def test_crowded_frame_postprocessing(self):
+        """Compare the per-detection loop with the masked array on a crowded frame"""
+        rng = np.random.default_rng(0)
+        xy = rng.uniform(0, 500, (300, 2))
+        detections = np.hstack([
+            xy, xy + 100, rng.uniform(0, 1, (300, 1)), rng.integers(0, 3, (300, 1))
+        ]).astype(np.float32)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        def loop_path():
+            person_boxes = []
+            for *box, score, cls in detections:
+                if int(cls) == PERSON_CLASS_ID and score > YOLO_CONFIDENCE_THRESHOLD:
+                    person_boxes.append(box)
+            for box in person_boxes:
+                x1, y1, x2, y2 = map(int, box)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            return person_boxes
+
+        detector = YOLODetector(backend=CannedBackend(detections), warmup_runs=0)
+
+        def array_path():
+            boxes = detector.detect_persons_batch([frame])[0]
+            detector.draw_boxes(frame, boxes)
+            return boxes
+
+        timings = {}
+        for name, path in (("loop", loop_path), ("array", array_path)):
+            start = time.perf_counter()
+            for _ in range(ITERATIONS):
+                result = path()
+            timings[name] = (time.perf_counter() - start) / ITERATIONS
+            timings[name + "_count"] = len(result)
+
+        print(f"\n300 detections, {timings['array_count']} persons: loop {timings['loop'] * 1000:.2f} ms, "
+              f"array {timings['array'] * 1000:.2f} ms")
+        self.assertEqual(timings['loop_count'], timings['array_count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import hashlib
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from app.image_processing.model_registry import ModelIntegrityError, ModelRegistry
+from provision_models import download, verify, write_manifest
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.manifest_path = self.tmp_dir / "SHA256SUMS"
+        self.weights = self.tmp_dir / "yolov5n.pt"
+        self.weights.write_bytes(b"pinned weights")
+        self.digest = hashlib.sha256(b"pinned weights").hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def registry(self):
+        return ModelRegistry(require_checksum=True, manifest_path=self.manifest_path)
+
+    def test_unpinned_file_is_refused(self):
+        """Test that a model without a digest in the config or the manifest is not loaded"""
+        with self.assertRaises(ModelIntegrityError):
+            self.registry().resolve(self.weights)
+        self.assertEqual(self.registry().resolve(self.weights, self.digest), self.weights)
+
+    def test_provisioned_checksums_are_used_and_enforced(self):
+        """Test that provisioning records the digest and a later change to the file is rejected"""
+        source = self.tmp_dir / "release.pt"
+        source.write_bytes(b"pinned weights")
+        self.weights.unlink()
+        download(source.as_uri(), self.weights)
+
+        manifest = {}
+        verify(self.registry(), manifest, self.weights, None)
+        write_manifest(manifest, self.manifest_path)
+        self.assertEqual(self.manifest_path.read_text(), f"{self.digest}  yolov5n.pt\n")
+        self.assertEqual(self.registry().resolve(self.weights), self.weights)
+
+        self.weights.write_bytes(b"tampered weights")
+        with self.assertRaises(ModelIntegrityError):
+            self.registry().resolve(self.weights)
+        with self.assertRaises(ModelIntegrityError):
+            verify(self.registry(), self.registry().manifest(), self.weights, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
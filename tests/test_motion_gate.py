@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import Mock, patch
+import numpy as np
+from app.common.metrics import get_metrics
+from app.image_processing.motion_gate import MotionGate
+from app.image_processing.pipeline import DropOldestQueue, InferenceWorker
+
+def scene(brightness=100, patch_size=0, patch_brightness=255):
+    """Flat grey 320x240 frame with an optional bright square in the middle"""
+    frame = np.full((240, 320, 3), brightness, dtype=np.uint8)
+    if patch_size:
+        top, left = 120 - patch_size // 2, 160 - patch_size // 2
+        frame[top:top + patch_size, left:left + patch_size] = patch_brightness
+    return frame
+
+class TestMotionGate(unittest.TestCase):
+    def setUp(self):
+        self.gate = MotionGate(pixel_threshold=25, min_changed_ratio=0.01, max_static_seconds=600)
+
+    def test_first_frame_always_runs_detection(self):
+        """Test that there is nothing to compare against before the first update"""
+        self.assertTrue(self.gate.has_changed([scene()]))
+
+    def test_pixel_and_area_thresholds(self):
+        """Test that sensor noise and tiny changes are ignored but a person-sized change is not"""
+        self.gate.update(scene())
+        self.assertFalse(self.gate.has_changed([scene(brightness=110)]))
+        self.assertFalse(self.gate.has_changed([scene(patch_size=8)]))
+        self.assertFalse(self.gate.has_changed([scene(patch_size=60, patch_brightness=120)]))
+        self.assertTrue(self.gate.has_changed([scene(), scene(patch_size=60)]))
+
+    def test_static_scene_is_rechecked_after_max_static_seconds(self):
+        """Test that an unchanged scene still gets a full detection once the reference expires"""
+        with patch('app.image_processing.motion_gate.time.time', return_value=1000):
+            self.gate.update(scene())
+        with patch('app.image_processing.motion_gate.time.time', return_value=1599):
+            self.assertFalse(self.gate.has_changed([scene()]))
+        with patch('app.image_processing.motion_gate.time.time', return_value=1600):
+            self.assertTrue(self.gate.has_changed([scene()]))
+
+    def test_unchanged_bursts_skip_inference(self):
+        """Test that the worker reuses the last count and counts the saved inference"""
+        detector = Mock()
+        detector.detect_persons_batch.return_value = [[(0, 0, 10, 10)], []]
+        detector.draw_boxes.side_effect = lambda frame, boxes: frame
+        persist_queue = DropOldestQueue(maxsize=5)
+        worker = InferenceWorker(detector, DropOldestQueue(maxsize=1), persist_queue, motion_gate=self.gate)
+        saved = get_metrics().snapshot()['counters'].get("motion_gate.inferences_saved", 0)
+
+        worker._process_burst(1.0, [scene(), scene()])
+        worker._process_burst(2.0, [scene(), scene(brightness=105)])
+        worker._process_burst(3.0, [scene(patch_size=60)])
+
+        self.assertEqual(detector.detect_persons_batch.call_count, 2)
+        self.assertEqual(get_metrics().snapshot()['counters']["motion_gate.inferences_saved"], saved + 1)
+        count, frame, timestamp = persist_queue.queue[1]
+        self.assertEqual((count, frame, timestamp), (1, None, 2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
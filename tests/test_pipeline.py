@@ -0,0 +1,211 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+import numpy as np
+from app.image_processing.cadence import AdaptiveCadence
+from app.image_processing.frame_ring import FrameRing, capture_into_ring
+from app.image_processing.pipeline import BurstBuffers, DropOldestQueue, FrameGrabber, PersistenceWorker
+from app.image_processing.service import PersonDetectionService
+
+class FakeCamera:
+    """Returns 480x640 frames filled with the number of frames read so far"""
+
+    def __init__(self, frame_interval=0.005):
+        self.frame_interval = frame_interval
+        self.reads = 0
+
+    def read_frame(self, out=None):
+        time.sleep(self.frame_interval)
+        self.reads += 1
+        return np.full((480, 640, 3), self.reads % 256, dtype=np.uint8)
+
+    def _initialize_camera(self):
+        pass
+
+    def release(self):
+        pass
+
+class BlockingDetector:
+    """Holds every batch until released, like a slow model"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def detect_persons_batch(self, frames):
+        self.started.set()
+        self.release.wait(timeout=10)
+        return [np.zeros((1, 5), dtype=np.float32) for _ in frames]
+
+    def draw_boxes(self, frame, boxes):
+        return frame
+
+class RingCamera:
+    """Fills ring slots with the number of frames read so far, as fast as it is polled"""
+
+    def __init__(self):
+        self.reads = 0
+
+    def read_frame(self, out):
+        self.reads += 1
+        out[:] = self.reads % 256
+        return out
+
+class SlowDetector:
+    """Takes far longer per burst than the capture side needs to go round a small ring"""
+
+    def detect_persons_batch(self, frames):
+        time.sleep(0.1)
+        return [np.zeros((1, 5), dtype=np.float32) for _ in frames]
+
+    def draw_boxes(self, frame, boxes):
+        return frame
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.005)
+
+class TestDropOldestQueue(unittest.TestCase):
+    def test_stale_items_are_dropped(self):
+        """Test that a full queue keeps the newest items and counts the dropped ones"""
+        bursts = DropOldestQueue(maxsize=2)
+        for burst in ("first", "second", "third"):
+            bursts.put_latest(burst)
+        self.assertEqual(bursts.dropped, 1)
+        self.assertEqual([bursts.get_nowait(), bursts.get_nowait()], ["second", "third"])
+
+    def test_dropped_items_are_handed_back(self):
+        """Test that on_drop receives every item pushed out of a full queue"""
+        dropped = []
+        bursts = DropOldestQueue(maxsize=1, on_drop=dropped.append)
+        for burst in ("first", "second", "third"):
+            bursts.put_latest(burst)
+        self.assertEqual(dropped, ["first", "second"])
+
+class TestBurstBuffers(unittest.TestCase):
+    def test_buffers_are_reused_and_bounded(self):
+        """Test that buffers are allocated once for the frame size and handed out until all are in use"""
+        buffers = BurstBuffers(count=2, burst_size=5)
+        first = buffers.acquire((4, 6, 3))
+        second = buffers.acquire((4, 6, 3))
+        self.assertEqual(first.shape, (5, 4, 6, 3))
+        self.assertIsNone(buffers.acquire((4, 6, 3)))
+        buffers.release(first)
+        self.assertIs(buffers.acquire((4, 6, 3)), first)
+        self.assertIsNot(first, second)
+
+class TestFrameGrabber(unittest.TestCase):
+    def test_latest_frame_is_replaced(self):
+        """Test that the grabber keeps only the most recent frame with an increasing sequence number"""
+        grabber = FrameGrabber(FakeCamera())
+        self.assertEqual(grabber.latest(), (0, None))
+        grabber.start()
+        try:
+            wait_until(lambda: grabber.latest()[0] >= 3)
+            seq, frame = grabber.latest()
+            self.assertEqual(frame.shape, (480, 640, 3))
+            wait_until(lambda: grabber.latest()[0] > seq)
+        finally:
+            grabber.stop()
+            grabber.join(timeout=2)
+        self.assertFalse(grabber.is_alive())
+
+class TestPersistenceWorker(unittest.TestCase):
+    def test_stop_drains_pending_results(self):
+        """Test that results queued before stop() are still saved"""
+        results = DropOldestQueue(maxsize=10)
+        saved = []
+        for count in range(3):
+            results.put_latest((count, None, count))
+        worker = PersistenceWorker(results, lambda *item: saved.append(item))
+        worker.stop()
+        worker.start()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(saved, [(0, None, 0), (1, None, 1), (2, None, 2)])
+
+class TestPersonDetectionService(unittest.TestCase):
+    def setUp(self):
+        self.detector = BlockingDetector()
+        db = Mock()
+        self.writer = db.buffered_writer.return_value
+        self.service = PersonDetectionService(
+            camera=FakeCamera(), detector=self.detector, db=db, motion_gate=Mock(),
+            blob_store=Mock(), encoder=Mock(),
+            cadence=AdaptiveCadence(base_interval=60, min_interval=60, max_interval=60, adaptive=False)
+        )
+        self.service.CAPTURE_DELAY = 0
+        self.addCleanup(self.service.stop)
+        self.addCleanup(self.detector.release.set)
+
+    def test_display_loop_does_not_wait_for_inference(self):
+        """Test that process_frame keeps returning frames while a burst is being detected"""
+        deadline = time.monotonic() + 5
+        while not self.detector.started.is_set() and time.monotonic() < deadline:
+            self.service.process_frame()
+        self.assertTrue(self.detector.started.is_set())
+
+        shown = 0
+        slowest = 0
+        end = time.monotonic() + 0.3
+        while time.monotonic() < end:
+            start = time.monotonic()
+            if self.service.process_frame() is not None:
+                shown += 1
+            slowest = max(slowest, time.monotonic() - start)
+        self.assertGreater(shown, 5)
+        self.assertLess(slowest, 0.1)
+
+        # Once the model returns, the best frame reaches the writer
+        self.detector.release.set()
+        wait_until(lambda: self.writer.add.called)
+
+
+class TestRingOverrun(unittest.TestCase):
+    def setUp(self):
+        """A 3-slot ring refilled about every 3 ms, read by a detector taking 100 ms per burst"""
+        self.ring = FrameRing.create(slots=3, shape=(48, 64, 3))
+        self.addCleanup(self.ring.unlink)
+        stop_event = threading.Event()
+        capture = threading.Thread(target=capture_into_ring, args=(RingCamera(), self.ring, stop_event, 1000))
+        capture.start()
+        self.addCleanup(capture.join)
+        self.addCleanup(stop_event.set)
+
+        self.stored = []
+        encoder = Mock()
+        encoder.encode.side_effect = lambda frame: self.stored.append(frame.copy()) or b"jpeg"
+        self.service = PersonDetectionService(
+            detector=SlowDetector(), db=Mock(), motion_gate=Mock(), blob_store=Mock(), encoder=encoder,
+            frame_ring=self.ring,
+            cadence=AdaptiveCadence(base_interval=0.01, min_interval=0.01, max_interval=0.01, adaptive=False)
+        )
+        self.service.CAPTURE_DELAY = 0
+        self.addCleanup(self.service.stop)
+
+    def test_overrun_during_inference_does_not_starve_storage(self):
+        """Test that bursts outliving their ring slots are still stored, intact, and no buffer leaks"""
+        end = time.monotonic() + 1
+        while time.monotonic() < end:
+            self.service.process_frame()
+            time.sleep(0.001)
+        self.service.stop()
+
+        self.assertGreater(len(self.stored), 2)
+        # Every stored frame is one whole capture, not a slot overwritten halfway through
+        for frame in self.stored:
+            self.assertEqual(len(np.unique(frame)), 1)
+        self.assertGreater(self.service.burst_queue.dropped, 0)
+        # Buffers of dropped and detected bursts went back, only queued and collecting ones are out
+        in_use = self.service.burst_queue.qsize() + (self.service._burst is not None)
+        free = 0
+        while self.service.burst_buffers.acquire(None) is not None:
+            free += 1
+        self.assertEqual(free + in_use, self.service.BURST_QUEUE_SIZE + 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import datetime
+import unittest
+from unittest.mock import patch
+from sqlalchemy.exc import OperationalError
+from app.models.card_presence import CardPresence
+from app.models.rfid_record import RFIDRecord
+from app.common.db import Database
+from app.rfid.presence import PresenceStore
+from tests.helpers import SQLiteTestCase
+
+class TestPresenceStore(SQLiteTestCase):
+    def setUp(self):
+        """Use a throwaway SQLite file shared by several stores"""
+        super().setUp()
+        self.now = datetime.datetime(2024, 2, 13, 9, 0)
+
+    def at(self, seconds):
+        return self.now + datetime.timedelta(seconds=seconds)
+
+    def test_taps_toggle_and_respect_cooldown(self):
+        """Test entry/exit toggling and that repeat reads are ignored"""
+        store = PresenceStore(self.db)
+        self.assertTrue(store.record_tap('42', self.at(0), cooldown=3))
+        self.assertIsNone(store.record_tap('42', self.at(1), cooldown=3))
+        self.assertFalse(store.record_tap('42', self.at(5), cooldown=3))
+        self.assertTrue(store.record_tap('42', self.at(10), cooldown=3))
+
+    def test_state_is_shared_between_readers(self):
+        """Test that a second store sees taps made through the first"""
+        first, second = PresenceStore(self.db), PresenceStore(self.db)
+        self.assertTrue(first.record_tap('42', self.at(0), cooldown=3))
+        self.assertIsNone(second.record_tap('42', self.at(1), cooldown=3))
+        self.assertFalse(second.record_tap('42', self.at(5), cooldown=3))
+        self.assertTrue(first.record_tap('42', self.at(10), cooldown=3))
+
+    def test_hydrate_from_latest_records(self):
+        """Test that an empty table is seeded from each card's latest record"""
+        self.db.save_all([
+            RFIDRecord(card_id='1', timestamp=self.at(0), is_entry=True),
+            RFIDRecord(card_id='1', timestamp=self.at(60), is_entry=False),
+            RFIDRecord(card_id='2', timestamp=self.at(30), is_entry=True),
+        ])
+        store = PresenceStore(self.db, capacity=1)
+        store.hydrate()
+
+        states = {p.card_id: p.is_present for p in self.db.query(CardPresence)}
+        self.assertEqual(states, {'1': False, '2': True})
+        self.assertEqual(list(store._cache), ['1'])
+
+        # Card 1 exited last, so its next tap is an entry
+        self.assertTrue(store.record_tap('1', self.at(120), cooldown=3))
+        self.assertFalse(store.record_tap('2', self.at(120), cooldown=3))
+
+
+    def test_taps_are_toggled_in_memory_while_the_database_is_unreachable(self):
+        """Test that taps keep toggling without a database and the state is written once it is back"""
+        offline = PresenceStore(Database(f"sqlite:///{self.tmp_dir}/missing/presence.db"))
+        self.assertTrue(offline.record_tap('42', self.at(0), cooldown=3))
+        self.assertIsNone(offline.record_tap('42', self.at(1), cooldown=3))
+        self.assertFalse(offline.record_tap('42', self.at(5), cooldown=3))
+
+        store = PresenceStore(self.db)
+        self.assertTrue(store.record_tap('42', self.at(0), cooldown=3))
+        error = OperationalError("UPDATE card_presence", {}, Exception("server closed the connection"))
+        with patch.object(self.db, 'session_scope', side_effect=error):
+            self.assertFalse(store.record_tap('42', self.at(5), cooldown=3))
+            self.assertTrue(store.record_tap('42', self.at(10), cooldown=3))
+
+        # The row still says present from before the outage, the exit follows the in-memory entry
+        self.assertFalse(store.record_tap('42', self.at(15), cooldown=3))
+        self.assertEqual([p.is_present for p in self.db.query(CardPresence)], [False])
+        self.assertTrue(PresenceStore(self.db).record_tap('42', self.at(20), cooldown=3))
+
+if __name__ == '__main__':
+    unittest.main()
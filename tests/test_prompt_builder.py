@@ -0,0 +1,78 @@
+import datetime
+import unittest
+from app.analytics.prompt_builder import PromptBuilder
+
+def day_of_data(days=1):
+    """Detections every 30 s and two taps per card, like a busy office"""
+    start = datetime.datetime(2024, 2, 13, 0, 0)
+    image_records = []
+    for i in range(2880 * days):
+        timestamp = start + datetime.timedelta(seconds=30 * i)
+        image_records.append({
+            'timestamp': timestamp.isoformat(),
+            'person_count': 3 if 9 <= timestamp.hour < 17 else 0
+        })
+    rfid_records = []
+    for card in range(40):
+        for hour, is_entry in ((8, True), (17, False)):
+            rfid_records.append({
+                'timestamp': (start + datetime.timedelta(hours=hour, minutes=card)).isoformat(),
+                'card_id': str(1000 + card),
+                'is_entry': is_entry
+            })
+    rfid_records.sort(key=lambda record: record['timestamp'])
+    return {
+        'image_data': {
+            'total_detections': len(image_records),
+            'total_persons': 3 * 960,
+            'average_persons': 1.0,
+            'hourly_stats': {
+                hour: {'detections': 120, 'total_persons': 360 if 9 <= hour < 17 else 0,
+                       'max_persons': 3 if 9 <= hour < 17 else 0}
+                for hour in range(24)
+            },
+            'detailed_records': image_records
+        },
+        'rfid_data': {
+            'total_events': 80, 'unique_cards': 40, 'total_entries': 40, 'total_exits': 40,
+            'hourly_stats': {8: {'entries': 40, 'exits': 0}, 17: {'entries': 0, 'exits': 40}},
+            'detailed_records': rfid_records
+        }
+    }
+
+class TestPromptBuilder(unittest.TestCase):
+    def test_full_day_is_summarized_within_budget(self):
+        """Test that 2,880 detections collapse into hourly buckets and a few runs"""
+        builder = PromptBuilder(token_budget=3000)
+        prompt = builder.build(day_of_data())
+
+        self.assertLessEqual(builder.count_tokens(prompt), 3000)
+        self.assertIn("- 09:00-16:59: 120 detections, 360 persons (max 3), 0 entries, 0 exits each hour", prompt)
+        self.assertIn("- 08:00: 120 detections, 0 persons (max 0), 40 entries, 0 exits", prompt)
+        self.assertIn("- 00:00:00-08:59:30: 0 persons (1080 detections)", prompt)
+        self.assertIn("- Card 1000: 1 entries, 1 exits, first 08:00:00, last 17:00:00", prompt)
+        self.assertNotIn("Timestamp:", prompt)
+
+    def test_low_priority_details_are_truncated_first(self):
+        """Test that a tight budget keeps the summaries and notes what was left out"""
+        builder = PromptBuilder(token_budget=400)
+        prompt = builder.build(day_of_data())
+
+        self.assertLessEqual(builder.count_tokens(prompt), 400)
+        self.assertIn("Hourly Activity:", prompt)
+        self.assertIn("- 18:00-23:59: 120 detections", prompt)
+        self.assertIn("more lines omitted", prompt)
+        self.assertNotIn("RFID Events:", prompt)
+        self.assertTrue(prompt.endswith("notable observations."))
+
+    def test_prompt_size_does_not_grow_with_data(self):
+        """Test that a week of raw records yields the same budgeted prompt size"""
+        builder = PromptBuilder(token_budget=1500)
+        one_day = builder.count_tokens(builder.build(day_of_data()))
+        many_records = builder.count_tokens(builder.build(day_of_data(days=7)))
+        self.assertLessEqual(max(one_day, many_records), 1500)
+        self.assertLess(abs(one_day - many_records), 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
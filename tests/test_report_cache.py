@@ -0,0 +1,66 @@
+import datetime
+import os
+import time
+import unittest
+from unittest.mock import Mock
+from app.analytics.report_cache import ReportCache
+from app.analytics.report_generator import ReportGenerator
+from tests.helpers import SQLiteTestCase
+
+class TestReportCache(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = datetime.date(2024, 2, 13)
+
+    def test_key_depends_on_period_and_watermarks(self):
+        """Test that new records or another period give a different key"""
+        key = ReportCache.key_for('daily', self.day, self.day, {'image_records': 10, 'rfid_records': 3})
+        self.assertEqual(key, ReportCache.key_for('daily', self.day, self.day, {'rfid_records': 3, 'image_records': 10}))
+        self.assertNotEqual(key, ReportCache.key_for('daily', self.day, self.day, {'image_records': 11, 'rfid_records': 3}))
+        self.assertNotEqual(key, ReportCache.key_for('weekly', self.day, self.day, {'image_records': 10, 'rfid_records': 3}))
+
+    def test_expiry_and_least_recently_used_eviction(self):
+        """Test that entries expire after the TTL and the least recently read is evicted"""
+        cache = ReportCache(self.tmp_dir, ttl=60, max_entries=2)
+        keys = [ReportCache.key_for('daily', self.day, self.day, {'image_records': i}) for i in range(3)]
+        cache.put(keys[0], "<html>0</html>")
+        cache.put(keys[1], "<html>1</html>")
+        # The second entry was last read 30 s ago, the first one is read now
+        os.utime(cache.path_for(keys[1]), (time.time() - 30, time.time()))
+        self.assertEqual(cache.get(keys[0]), "<html>0</html>")
+
+        cache.put(keys[2], "<html>2</html>")
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[0]), "<html>0</html>")
+
+        written = time.time() - 120
+        os.utime(cache.path_for(keys[2]), (written, written))
+        self.assertIsNone(cache.get(keys[2]))
+
+    def test_generator_serves_repeat_requests_from_cache(self):
+        """Test that ChatGPT is only called again for new records or a forced refresh"""
+        generator = ReportGenerator(db=self.db)
+        generator.cache = ReportCache(self.tmp_dir)
+        generator.rollups = Mock()
+        generator.rollups.watermarks.return_value = {'image_records': 10, 'rfid_records': 3}
+        generator.summaries = Mock()
+        generator.summaries.summaries.return_value = []
+        generator._get_image_data = Mock(return_value={})
+        generator._get_rfid_data = Mock(return_value={})
+        generator.chatgpt = Mock()
+        generator.chatgpt.analyze_usage_patterns.side_effect = ["<html>1</html>", "<html>2</html>", "<html>3</html>"]
+
+        self.assertEqual(generator.generate_daily_report(), "<html>1</html>")
+        self.assertEqual(generator.generate_daily_report(), "<html>1</html>")
+        self.assertEqual(generator.chatgpt.analyze_usage_patterns.call_count, 1)
+
+        self.assertEqual(generator.generate_daily_report(force_refresh=True), "<html>2</html>")
+        self.assertEqual(generator.generate_daily_report(), "<html>2</html>")
+
+        generator.rollups.watermarks.return_value = {'image_records': 11, 'rfid_records': 3}
+        self.assertEqual(generator.generate_daily_report(), "<html>3</html>")
+        self.assertEqual(generator.chatgpt.analyze_usage_patterns.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
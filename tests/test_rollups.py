@@ -0,0 +1,130 @@
+import datetime
+import unittest
+import warnings
+from contextlib import contextmanager
+from unittest.mock import patch
+from app.analytics.rollups import OccupancyRollup
+from app.analytics.daily_summaries import DailySummaryCache
+from app.analytics.report_generator import ReportGenerator
+from app.models.daily_summary import DailySummary
+from app.models.hourly_occupancy import HourlyOccupancy
+from app.models.image_record import ImageRecord
+from app.models.rfid_record import RFIDRecord
+from tests.helpers import SQLiteTestCase
+
+class TestOccupancyRollup(SQLiteTestCase):
+    def setUp(self):
+        """Use a throwaway SQLite file for the raw records and their rollups"""
+        super().setUp()
+        self.rollup = OccupancyRollup(self.db, refresh_hours=0)
+        self.day = datetime.datetime(2024, 2, 13)
+
+    def at(self, hour, minute=0):
+        return self.day + datetime.timedelta(hours=hour, minutes=minute)
+
+    def test_compaction_aggregates_per_hour(self):
+        """Test that detections and taps are folded into one row per hour"""
+        self.db.save_all([
+            ImageRecord(timestamp=self.at(9, 5), person_count=2),
+            ImageRecord(timestamp=self.at(9, 40), person_count=4),
+            ImageRecord(timestamp=self.at(11, 0), person_count=1),
+            RFIDRecord(card_id='1', timestamp=self.at(9, 1), is_entry=True),
+            RFIDRecord(card_id='2', timestamp=self.at(9, 2), is_entry=True),
+            RFIDRecord(card_id='1', timestamp=self.at(9, 50), is_entry=False),
+        ])
+        self.assertEqual(self.rollup.compact(), 2)
+
+        nine, eleven = self.rollup.hourly(self.at(0), self.at(24))
+        self.assertEqual(nine.hour, self.at(9))
+        self.assertEqual((nine.detections, nine.total_persons, nine.max_persons), (2, 6, 4))
+        self.assertEqual((nine.entries, nine.exits, nine.unique_cards), (2, 1, 2))
+        self.assertEqual((eleven.hour, eleven.detections, eleven.entries), (self.at(11), 1, 0))
+
+    def test_compaction_query_does_not_warn(self):
+        """Test that the dirty hour scan is a plain SELECT DISTINCT SQLAlchemy accepts without warnings"""
+        self.db.save(ImageRecord(timestamp=self.at(9, 5), person_count=2))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.assertEqual(self.rollup.compact(), 1)
+
+    def test_report_data_reads_rollups_outside_its_session(self):
+        """Test that the daily report queries never open a session inside another one"""
+        self.db.save_all([
+            ImageRecord(timestamp=self.at(9, 5), person_count=2),
+            RFIDRecord(card_id='1', timestamp=self.at(9, 1), is_entry=True),
+        ])
+        self.rollup.compact()
+        generator = ReportGenerator(db=self.db)
+        generator.rollups = self.rollup
+
+        depth, max_depth = 0, 0
+        session_scope = self.db.session_scope
+
+        @contextmanager
+        def tracked_scope():
+            nonlocal depth, max_depth
+            depth += 1
+            max_depth = max(max_depth, depth)
+            try:
+                with session_scope() as session:
+                    yield session
+            finally:
+                depth -= 1
+
+        with patch.object(self.db, 'session_scope', tracked_scope):
+            image_data = generator._get_image_data(self.day.date())
+            rfid_data = generator._get_rfid_data(self.day.date())
+        self.assertEqual(max_depth, 1)
+        self.assertEqual(image_data['hourly_stats'][9]['total_persons'], 2)
+        self.assertEqual((rfid_data['total_entries'], rfid_data['unique_cards']), (1, 1))
+
+    def test_only_dirty_hours_are_recomputed(self):
+        """Test that late rows update their hour and untouched hours are left alone"""
+        self.db.save(ImageRecord(timestamp=self.at(9), person_count=2))
+        self.db.save(ImageRecord(timestamp=self.at(10), person_count=3))
+        self.rollup.compact()
+        self.assertEqual(self.rollup.compact(), 0)
+
+        # A late detection for 09:00 arrives after the hour was compacted
+        self.db.save(ImageRecord(timestamp=self.at(9, 30), person_count=5))
+        self.assertEqual(self.rollup.compact(), 1)
+        with self.db.session_scope() as session:
+            self.assertEqual(session.query(HourlyOccupancy).count(), 2)
+
+        trend = self.rollup.daily_trend(self.day.date(), self.day.date() + datetime.timedelta(days=1))
+        self.assertEqual([day['detections'] for day in trend], [3, 0])
+        self.assertEqual(trend[0]['total_persons'], 10)
+        self.assertEqual(trend[0]['max_persons'], 5)
+
+    def test_daily_summaries_are_cached_for_past_days(self):
+        """Test that finished days are stored once and invalidated by late records"""
+        for day in range(3):
+            self.db.save_all([
+                ImageRecord(timestamp=self.at(24 * day + 10), person_count=day + 1),
+                RFIDRecord(card_id='1', timestamp=self.at(24 * day + 9), is_entry=True),
+                RFIDRecord(card_id='2', timestamp=self.at(24 * day + 17), is_entry=False),
+            ])
+        self.rollup.compact()
+        cache = DailySummaryCache(self.db, self.rollup)
+        first, today = self.day.date(), self.day.date() + datetime.timedelta(days=2)
+
+        summaries = cache.summaries(first, today, today=today)
+        self.assertEqual([day['total_persons'] for day in summaries], [1, 2, 3])
+        self.assertEqual(summaries[0]['peak_hour'], 10)
+        self.assertEqual(summaries[0]['unique_cards'], 2)
+        with self.db.session_scope() as session:
+            # Today is still changing, so only the two finished days are stored
+            self.assertEqual(session.query(DailySummary).count(), 2)
+
+        with patch.object(self.rollup, 'daily_trend') as daily_trend:
+            self.assertEqual(cache.summaries(first, first, today=today)[0]['total_persons'], 1)
+            daily_trend.assert_not_called()
+
+        # A late record for the first day drops its cached summary
+        self.db.save(ImageRecord(timestamp=self.at(11), person_count=4))
+        self.rollup.compact()
+        self.assertEqual(cache.summaries(first, first, today=today)[0]['total_persons'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
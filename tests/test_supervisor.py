@@ -0,0 +1,132 @@
+import multiprocessing as mp
+import time
+import unittest
+from unittest.mock import patch
+from app.config import SUPERVISOR_RESTART_DELAY, SUPERVISOR_MAX_RESTART_DELAY, SUPERVISOR_STABLE_SECONDS
+from app.supervisor import DEVICE_TARGETS, Supervisor
+
+def crash(device, stop_event, report_queue, rfid_activity):
+    """Fake device that exits with an error as soon as it starts"""
+    raise SystemExit(3)
+
+def finish_after_stop(device, stop_event, report_queue, rfid_activity):
+    """Fake device that needs a moment to flush after being asked to stop"""
+    stop_event.wait()
+    time.sleep(0.5)
+
+def ignore_stop(device, stop_event, report_queue, rfid_activity):
+    """Fake device that hangs on shutdown"""
+    time.sleep(60)
+
+FAKE_TARGETS = {
+    'crash': crash,
+    'slow': finish_after_stop,
+    'hung': ignore_stop,
+}
+
+class TestSupervisorRestarts(unittest.TestCase):
+    def setUp(self):
+        """Drive the supervisor's clock by hand, the device crashes for real"""
+        self.now = 1000.0
+        for patcher in (patch.dict(DEVICE_TARGETS, FAKE_TARGETS),
+                        patch('app.supervisor.time.monotonic', side_effect=lambda: self.now)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.supervisor = Supervisor([{'id': 'flaky', 'type': 'crash'}], mp.Event(), None)
+        self.worker = self.supervisor.workers[0]
+        self.addCleanup(self.supervisor.stop, 1)
+
+    def crash_and_poll(self):
+        """Waits for the running device to exit and lets the supervisor notice"""
+        self.worker.process.join(timeout=5)
+        self.assertEqual(self.worker.process.exitcode, 3)
+        self.supervisor.poll()
+        self.assertIsNone(self.worker.process)
+
+    def restart_at(self, now):
+        self.now = now
+        self.supervisor.poll()
+        self.assertIsNotNone(self.worker.process)
+
+    def test_crashed_device_restarts_with_backoff(self):
+        """Test that each crash doubles the wait before the next restart"""
+        self.supervisor.start()
+        waits = []
+        for _ in range(8):
+            crashed_at = self.now
+            self.crash_and_poll()
+            waits.append(self.worker.next_start - crashed_at)
+
+            # Not restarted before the delay has passed
+            self.now = self.worker.next_start - 0.1
+            self.supervisor.poll()
+            self.assertIsNone(self.worker.process)
+            self.restart_at(self.worker.next_start)
+
+        expected = [min(SUPERVISOR_RESTART_DELAY * 2 ** i, SUPERVISOR_MAX_RESTART_DELAY) for i in range(8)]
+        self.assertEqual(waits, expected)
+        self.assertEqual(self.worker.restarts, 8)
+
+    def test_stable_run_resets_the_backoff(self):
+        """Test that a device that ran for SUPERVISOR_STABLE_SECONDS restarts after the first delay again"""
+        self.supervisor.start()
+        for _ in range(3):
+            self.crash_and_poll()
+            self.restart_at(self.worker.next_start)
+        self.assertEqual(self.worker.restart_delay, SUPERVISOR_RESTART_DELAY * 8)
+
+        self.now += SUPERVISOR_STABLE_SECONDS
+        self.crash_and_poll()
+        self.assertEqual(self.worker.next_start, self.now + SUPERVISOR_RESTART_DELAY)
+        self.assertEqual(self.worker.restart_delay, SUPERVISOR_RESTART_DELAY * 2)
+
+
+@patch.dict(DEVICE_TARGETS, FAKE_TARGETS)
+class TestSupervisorStop(unittest.TestCase):
+    def test_slow_shutdown_is_not_terminated(self):
+        """Test that devices finishing within the grace period exit on their own"""
+        supervisor = Supervisor([{'id': 'a', 'type': 'slow'}, {'id': 'b', 'type': 'slow'}], mp.Event(), None)
+        supervisor.start()
+        processes = [worker.process for worker in supervisor.workers]
+
+        start = time.monotonic()
+        supervisor.stop(timeout=5)
+        # Both devices shut down in parallel within one grace period
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([process.exitcode for process in processes], [0, 0])
+
+    def test_hung_device_is_terminated_after_the_grace_period(self):
+        """Test that a device ignoring the stop event is only terminated once the timeout passed"""
+        supervisor = Supervisor([{'id': 'stuck', 'type': 'hung'}], mp.Event(), None)
+        supervisor.start()
+        process = supervisor.workers[0].process
+
+        start = time.monotonic()
+        supervisor.stop(timeout=0.5)
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+        self.assertFalse(process.is_alive())
+        self.assertLess(process.exitcode, 0)
+
+
+class TestSupervisorDevices(unittest.TestCase):
+    def test_cameras_share_one_detection_process(self):
+        """Test that every camera gets a capture process and a ring, and one detection process reads them all"""
+        devices = [
+            {'id': 'door-1', 'type': 'rfid'},
+            {'id': 'lobby', 'type': 'camera', 'camera_id': 0},
+            {'id': 'hall', 'type': 'camera', 'camera_id': 2, 'preview': True},
+        ]
+        supervisor = Supervisor(devices, mp.Event(), None)
+        self.addCleanup(supervisor.stop, 1)
+
+        self.assertEqual([(worker.device_id, worker.device['type']) for worker in supervisor.workers], [
+            ('door-1', 'rfid'), ('lobby-capture', 'capture'), ('hall-capture', 'capture'), ('detection', 'detection'),
+        ])
+        cameras = supervisor.workers[-1].device['cameras']
+        self.assertEqual([camera['id'] for camera in cameras], ['lobby', 'hall'])
+        self.assertEqual([camera['ring'] for camera in cameras], [ring.name for ring in supervisor.rings])
+        self.assertEqual(supervisor.workers[2].device['ring'], cameras[1]['ring'])
+        self.assertEqual(supervisor.workers[2].device['camera_id'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import glob
+import importlib.util
+import os
+import threading
+import time
+import unittest
+import numpy as np
+from app.config import YOLO_ONNX_MODEL_PATH
+from app.image_processing.yolo_inference import (
+    non_max_suppression, InferenceBackend, OnnxRuntimeBackend, TorchHubBackend, YOLODetector, MODEL_INPUT_SIZE
+)
+
+HAS_TORCH = importlib.util.find_spec("torch") is not None
+HAS_ONNXRUNTIME = importlib.util.find_spec("onnxruntime") is not None
+
+
+def _parity_images():
+    """Fixed test images: PARITY_IMAGE_DIR or the sample images shipped with the yolov5 hub repo"""
+    image_dir = os.getenv("PARITY_IMAGE_DIR")
+    if not image_dir and HAS_TORCH:
+        import torch
+        image_dir = os.path.join(torch.hub.get_dir(), "ultralytics_yolov5_master", "data", "images")
+    if not image_dir:
+        return []
+    return sorted(glob.glob(os.path.join(image_dir, "*.jpg")))
+
+
+class TestNonMaxSuppression(unittest.TestCase):
+    def _prediction(self, cx, cy, w, h, obj, class_scores):
+        return np.array([cx, cy, w, h, obj, *class_scores], dtype=np.float32)
+
+    def test_suppresses_overlapping_boxes(self):
+        """Test that the lower scoring of two overlapping person boxes is removed"""
+        prediction = np.stack([
+            self._prediction(100, 100, 50, 100, 0.9, [0.9, 0.1]),
+            self._prediction(102, 101, 50, 100, 0.8, [0.9, 0.1]),
+            self._prediction(400, 300, 60, 120, 0.7, [0.8, 0.2]),
+        ])
+        detections = non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45)
+
+        self.assertEqual(detections.shape, (2, 6))
+        np.testing.assert_allclose(detections[0, :4], [75, 50, 125, 150])
+        self.assertAlmostEqual(float(detections[0, 4]), 0.81, places=5)
+
+    def test_filters_other_classes_and_low_scores(self):
+        """Test that non-person and low confidence candidates are dropped"""
+        prediction = np.stack([
+            self._prediction(100, 100, 50, 100, 0.9, [0.1, 0.9]),
+            self._prediction(300, 300, 50, 100, 0.3, [0.5, 0.1]),
+        ])
+        detections = non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45)
+
+        self.assertEqual(detections.shape, (0, 6))
+
+
+class OverlapBackend(InferenceBackend):
+    """Fake model that records how many forward passes run at the same time"""
+    name = "overlap"
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    def infer(self, images):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        self.running -= 1
+        return [np.zeros((0, 6), dtype=np.float32) for _ in images]
+
+
+class TestSharedDetector(unittest.TestCase):
+    def test_cameras_sharing_a_detector_run_one_pass_at_a_time(self):
+        """Test that inference threads of several cameras never use the letterbox buffer concurrently"""
+        backend = OverlapBackend()
+        detector = YOLODetector(backend=backend, warmup_runs=0)
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * 2
+        results = []
+
+        def camera_thread():
+            for _ in range(5):
+                results.append(detector.detect_persons_batch(frames))
+
+        threads = [threading.Thread(target=camera_thread) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(backend.max_running, 1)
+        self.assertEqual(len(results), 15)
+
+
+@unittest.skipUnless(HAS_TORCH and HAS_ONNXRUNTIME, "torch and onnxruntime are required")
+@unittest.skipUnless(os.path.exists(YOLO_ONNX_MODEL_PATH), "exported ONNX model not found")
+class TestBackendParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.images = _parity_images()
+        if not cls.images:
+            raise unittest.SkipTest("no parity images available")
+        cls.torch_backend = TorchHubBackend()
+        cls.onnx_backend = OnnxRuntimeBackend()
+
+    def test_backends_return_identical_detections(self):
+        """Test that the ONNX backend reproduces the torch.hub detections on fixed images"""
+        import cv2
+
+        frames = [cv2.resize(cv2.imread(path), (MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)) for path in self.images]
+        torch_results = self.torch_backend.infer(frames)
+        onnx_results = self.onnx_backend.infer(frames)
+
+        for path, expected, actual in zip(self.images, torch_results, onnx_results):
+            with self.subTest(image=os.path.basename(path)):
+                self.assertEqual(len(expected), len(actual))
+                np.testing.assert_allclose(actual[:, :4], expected[:, :4], atol=1.0)
+                np.testing.assert_allclose(actual[:, 4], expected[:, 4], atol=1e-2)
+                np.testing.assert_array_equal(actual[:, 5], expected[:, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()